@@ -1,28 +1,43 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import (
+    Flask,
+    Response,
+    request,
+    jsonify,
+    redirect,
+    send_from_directory,
+    stream_with_context,
+    url_for,
+)
 from flask_cors import CORS
-import sys
+import atexit
+import gzip
+import hashlib
+import os
 import json
 import logging
+import mimetypes
 from pathlib import Path
-import threading
-import queue
-
-# Ensure the src directory is in the Python path for workflow.py imports
-sys.path.append(str(Path(__file__).parent / "src"))
 
-# Import the main workflow function
-from workflow import main as run_workflow_main
+from worker import workflow_runner
+from src.job_manager import JobManager, JobQueueFullError
+from src.job_store import JobStore
+from src.llm_cache import get_llm_cache
+from src.llm_scheduler import DEFAULT_PRIORITY, PRIORITIES, get_llm_scheduler
+from src.preview import PreviewError, get_bundle
+from src.repo_cache import CLONE_MODES, DEFAULT_CLONE_MODE
+from src.results_store import ResultsStore
+from utils import telemetry
+from utils.workspace import Workspace
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 
 # --- Configuration ---
 PROJECT_ROOT = Path(__file__).parent.parent
-DATA_DIR = PROJECT_ROOT / "data"
 LOGS_DIR = PROJECT_ROOT / "logs"
+WORKSPACES_DIR = PROJECT_ROOT / "workspaces"
 
 # Ensure directories exist
-DATA_DIR.mkdir(parents=True, exist_ok=True)
 LOGS_DIR.mkdir(parents=True, exist_ok=True)
 
 # Setup basic logging for app.py
@@ -32,168 +47,329 @@ logging.basicConfig(
     handlers=[logging.FileHandler(LOGS_DIR / "app.log"), logging.StreamHandler()],
 )
 
-# Global variable to store workflow results and messages
-workflow_results = {}
-workflow_messages_queue = queue.Queue()
-
+# Concurrency limits for the job engine
+MAX_CONCURRENT_JOBS = int(os.environ.get("FRONTFREND_MAX_WORKERS", "4"))
+MAX_PENDING_JOBS = int(os.environ.get("FRONTFREND_MAX_PENDING", "32"))
+# Seconds between keep-alive comments on idle event streams
+SSE_HEARTBEAT_SECONDS = 15
+# Responses smaller than this are not worth compressing
+GZIP_MIN_BYTES = 1024
+
+if os.environ.get("FRONTFREND_JOB_STORE"):
+    # Production (see wsgi.py): this process only queues jobs and serves their
+    # state from the shared store; worker.py processes run them
+    job_manager = JobStore(
+        os.environ["FRONTFREND_JOB_STORE"], max_pending=MAX_PENDING_JOBS
+    )
+else:
+    # Development: jobs run on threads of this process and live in memory, so
+    # workspaces from a previous process have no job attached any more
+    Workspace.sweep(WORKSPACES_DIR)
+    job_manager = JobManager(
+        workflow_runner, max_workers=MAX_CONCURRENT_JOBS, max_pending=MAX_PENDING_JOBS
+    )
+    atexit.register(job_manager.shutdown, wait=False)
 
-def workflow_runner(repo_url, user_preferences):
-    """Runs the workflow.main in a separate thread and captures its output."""
-    global workflow_results
-    try:
-        # Call the main workflow function directly
-        run_workflow_main(repo_url, user_preferences)
-
-        # After workflow completes, read the results from the data directory
-        results_file = DATA_DIR / "workflow_results.json"
-        if results_file.exists():
-            with open(results_file, "r", encoding="utf-8") as f:
-                workflow_results = json.load(f)
-            workflow_results["status"] = "completed"
-            workflow_results["message"] = "Workflow finished successfully."
-        else:
-            workflow_results = {
-                "status": "completed",
-                "message": "Workflow finished, but results file not found.",
-            }
+telemetry.register_gauge(
+    "frontfrend_jobs_queued", "Jobs waiting for a worker.", job_manager.pending_count
+)
 
-        workflow_messages_queue.put("FRONTEND_WORKFLOW_COMPLETE")  # Signal for frontend
-        logging.info("Workflow execution completed successfully.")
 
-    except Exception as e:
-        logging.error(f"Error during workflow execution: {e}", exc_info=True)
-        workflow_results = {"status": "error", "message": str(e)}
-        workflow_messages_queue.put(f"ERROR: {e}")
-        workflow_messages_queue.put(
-            "FRONTEND_WORKFLOW_COMPLETE" 
-        )  # Signal for frontend even on error
+def _resolve_job(job_id=None):
+    """Looks up a job by id, falling back to the most recent job."""
+    job_id = job_id or request.args.get("job_id")
+    if job_id:
+        return job_manager.get(job_id)
+    return job_manager.latest()
 
 
 @app.route("/api/workflow/start", methods=["POST"])
 def start_workflow():
-    global workflow_results
     data = request.json
     repo_url = data.get("repo_url")
     user_preferences = data.get("user_preferences")
 
+    clone_mode = data.get("clone_mode", DEFAULT_CLONE_MODE)
+    # Forces fresh answers from the model, e.g. to re-roll a disappointing result
+    use_llm_cache = not data.get("bypass_llm_cache", False)
+    # Batch jobs only get model quota that interactive ones leave unused
+    priority = data.get("priority", DEFAULT_PRIORITY)
+
     if not repo_url:
         return jsonify({"error": "Repository URL is required"}), 400
+    if clone_mode not in CLONE_MODES:
+        return jsonify({"error": f"clone_mode must be one of {list(CLONE_MODES)}"}), 400
+    if priority not in PRIORITIES:
+        return jsonify({"error": f"priority must be one of {list(PRIORITIES)}"}), 400
 
     logging.info(
         f"Starting workflow for repo: {repo_url} with preferences: {user_preferences}"
     )
 
-    # Clear previous results and messages
-    workflow_results = {}
-    while not workflow_messages_queue.empty():
-        try:
-            workflow_messages_queue.get_nowait()
-        except queue.Empty:
-            break
+    try:
+        job = job_manager.submit(
+            repo_url,
+            user_preferences,
+            clone_mode=clone_mode,
+            use_llm_cache=use_llm_cache,
+            priority=priority,
+        )
+    except JobQueueFullError as e:
+        return jsonify({"error": str(e)}), 429
+
+    return (
+        jsonify(
+            {"message": "Workflow started", "status": "processing", "job_id": job.id}
+        ),
+        202,
+    )
+
+
+@app.route("/api/workflow/jobs", methods=["GET"])
+def list_jobs():
+    return jsonify({"jobs": [job.to_dict() for job in job_manager.list_jobs()]}), 200
+
+
+@app.route("/api/llm/cache", methods=["GET"])
+def llm_cache_stats():
+    return jsonify(get_llm_cache().stats()), 200
 
-    # Run workflow in a separate thread to avoid blocking the API
-    thread = threading.Thread(target=workflow_runner, args=(repo_url, user_preferences))
-    thread.start()
 
-    return jsonify({"message": "Workflow started", "status": "processing"}), 202
+@app.route("/api/llm/queue", methods=["GET"])
+def llm_queue_stats():
+    return jsonify(get_llm_scheduler().stats()), 200
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """
+    Spans and counters of the pipelines run by this process, in the Prometheus
+    text format. In production the pipelines run in worker.py processes, which
+    serve their own metrics (see `--metrics-port`).
+    """
+    return Response(
+        telemetry.render_prometheus(), content_type=telemetry.PROMETHEUS_CONTENT_TYPE
+    )
 
 
 @app.route("/api/workflow/status", methods=["GET"])
-def get_workflow_status():
-    messages = []
-    while not workflow_messages_queue.empty():
-        try:
-            messages.append(workflow_messages_queue.get_nowait())
-        except queue.Empty:
-            break
+@app.route("/api/workflow/<job_id>/status", methods=["GET"])
+def get_workflow_status(job_id=None):
+    job = _resolve_job(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+
+    # Clients pass back the returned cursor as `since` to only get newer messages
+    cursor = request.args.get("since", 0, type=int)
+    status = "processing" if job.status == "queued" else job.status
+    return (
+        jsonify(
+            {
+                "job_id": job.id,
+                "status": status,
+                "message": job.message,
+                "messages": job.messages_since(cursor),
+                "cursor": job.events.last_seq,
+            }
+        ),
+        200,
+    )
 
-    status = workflow_results.get("status", "processing")
-    return jsonify({"status": status, "messages": messages}), 200
 
+@app.route("/api/workflow/<job_id>/events", methods=["GET"])
+def stream_workflow_events(job_id):
+    """
+    Streams the job's events as Server-Sent Events. Reconnecting clients send
+    Last-Event-ID (or `since`) and get every buffered event after it replayed.
+    The stream ends after the terminal "done" event.
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+
+    cursor = request.headers.get("Last-Event-ID", type=int)
+    if cursor is None:
+        cursor = request.args.get("since", 0, type=int)
+
+    def generate(cursor):
+        yield "retry: 3000\n\n"
+        while True:
+            events = job.events.wait(cursor, timeout=SSE_HEARTBEAT_SECONDS)
+            if not events:
+                if job.events.closed:
+                    return
+                yield ": keep-alive\n\n"
+                continue
+            for event in events:
+                cursor = event["seq"]
+                yield f"id: {cursor}\ndata: {json.dumps(event)}\n\n"
+                if event["type"] == "done":
+                    return
+
+    return Response(
+        stream_with_context(generate(cursor)),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-@app.route("/api/workflow/results", methods=["GET"])
-def get_workflow_results():
-    global workflow_results
-    if workflow_results:
-        return jsonify(workflow_results), 200
-    return jsonify({"message": "Workflow results not available yet."}), 204
 
+def _encoded_etag(etag: str, compressed: bool) -> str:
+    """Strong validators must differ between encodings, so gzip bodies get their own."""
+    return f"{etag}-gz" if compressed else etag
 
-@app.route("/api/live_preview", methods=["GET"])
-def get_live_preview():
-    ui_detection_file = DATA_DIR / "ui_detection_output.json"
-    if not ui_detection_file.exists():
+
+def _conditional_response(body: bytes, etag: str, mimetype: str = "application/json"):
+    """
+    Returns `body` with an ETag, answering 304 when the client already has it
+    and gzip-compressing larger bodies for clients that accept it.
+    """
+    compress = len(body) >= GZIP_MIN_BYTES and "gzip" in request.accept_encodings
+    response = Response(body, mimetype=mimetype)
+    response.set_etag(_encoded_etag(etag, compress))
+    # Clients may keep a copy but must revalidate it
+    response.headers["Cache-Control"] = "no-cache"
+    response.vary.add("Accept-Encoding")
+    response = response.make_conditional(request)
+    if response.status_code == 200 and compress:
+        response.set_data(gzip.compress(body, compresslevel=6))
+        response.headers["Content-Encoding"] = "gzip"
+    return response
+
+
+@app.route("/api/workflow/results", methods=["GET"])
+@app.route("/api/workflow/<job_id>/results", methods=["GET"])
+def get_workflow_results(job_id=None):
+    """
+    Returns the job's results. File entries only carry hashes and sizes; their
+    contents come from the per-file endpoint. `offset` and `limit` page the
+    "files" list, whose full length is given in "total_files".
+    """
+    job = _resolve_job(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    if not job.results:
+        return jsonify({"message": "Workflow results not available yet."}), 204
+
+    files = job.results.get("files", [])
+    offset = max(0, request.args.get("offset", 0, type=int))
+    limit = request.args.get("limit", len(files), type=int)
+    results = dict(job.results)
+    results["files"] = files[offset : offset + max(0, limit)]
+    results["total_files"] = len(files)
+    results["offset"] = offset
+    body = json.dumps(results, separators=(",", ":")).encode("utf-8")
+    return _conditional_response(body, hashlib.sha256(body).hexdigest())
+
+
+@app.route("/api/workflow/<job_id>/files/<int:index>", methods=["GET"])
+def get_workflow_file(job_id, index):
+    """Returns one changed file's entry with its before and after contents."""
+    job = job_manager.get(job_id)
+    if job is None or job.workspace is None:
+        return jsonify({"error": "Job not found"}), 404
+    files = (job.results or {}).get("files", [])
+    if not 0 <= index < len(files):
+        return jsonify({"error": "File not found"}), 404
+
+    entry = files[index]
+    # Contents are addressed by hash, so the pair of hashes identifies the response
+    etag = f"{entry['before_sha256']}-{entry['after_sha256']}"
+    for cached in (etag, _encoded_etag(etag, True)):
+        if request.if_none_match.contains(cached):
+            return _conditional_response(b"", cached)
+
+    store = ResultsStore(job.workspace.blobs_dir)
+    try:
+        payload = {
+            **entry,
+            "before": store.get(entry["before_sha256"]),
+            "after": store.get(entry["after_sha256"]),
+        }
+    except FileNotFoundError:
+        return jsonify({"error": "File contents are no longer available"}), 410
+    body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return _conditional_response(body, etag)
+
+
+def _blob_response(
+    store: ResultsStore, digest: str, mimetype: str, last_modified: float
+):
+    """
+    Serves a stored blob, answering conditional requests with 304 before the
+    blob is read. Blobs are kept gzip-compressed, so gzip clients get the
+    stored bytes as they are.
+    """
+    compress = "gzip" in request.accept_encodings
+    response = Response(mimetype=mimetype)
+    response.set_etag(_encoded_etag(digest, compress))
+    response.last_modified = last_modified
+    response.headers["Cache-Control"] = "no-cache"
+    response.vary.add("Accept-Encoding")
+    response = response.make_conditional(request)
+    if response.status_code == 304:
+        return response
+    try:
+        compressed = store.get_compressed(digest)
+    except FileNotFoundError:
+        return jsonify({"error": "Preview asset is no longer available"}), 410
+    if compress:
+        response.set_data(compressed)
+        response.headers["Content-Encoding"] = "gzip"
+    else:
+        response.set_data(gzip.decompress(compressed))
+    return response
+
+
+@app.route("/api/workflow/<job_id>/preview/<revision>/", methods=["GET"])
+@app.route("/api/workflow/<job_id>/preview/<revision>/<path:asset>", methods=["GET"])
+def get_preview(job_id, revision, asset=None):
+    """
+    Serves the "before" or "after" preview of a finished job. The bundle is
+    built on the first request; its entry page and every UI file are then served
+    individually under their repository paths, so relative links between them work.
+    """
+    job = job_manager.get(job_id)
+    if job is None or job.workspace is None:
+        return jsonify({"error": "Job not found"}), 404
+    if job.status != "completed":
         return (
-            "<h1>Live Preview Not Available</h1><p>UI detection output file not found.</p>",
+            jsonify({"message": "Live preview is available once the job completed."}),
             204,
         )
-
     try:
-        with open(ui_detection_file, "r", encoding="utf-8") as f:
-            ui_detection_data = json.load(f)
-    except Exception as e:
-        logging.error(f"Error reading ui_detection_output.json: {e}")
-        return (
-            "<h1>Live Preview Error</h1><p>Could not read UI detection output.</p>",
-            500,
+        bundle = get_bundle(job.workspace, job.results, revision)
+    except PreviewError as e:
+        return jsonify({"message": f"Live Preview Not Available: {e}"}), 404
+
+    if asset is None:
+        return redirect(
+            url_for(
+                "get_preview", job_id=job_id, revision=revision, asset=bundle["entry"]
+            )
         )
+    digest = bundle["assets"].get(asset)
+    if digest is None:
+        return jsonify({"error": "Preview asset not found"}), 404
+    mimetype = mimetypes.guess_type(asset)[0] or "application/octet-stream"
+    return _blob_response(
+        ResultsStore(job.workspace.blobs_dir), digest, mimetype, bundle["built_at"]
+    )
 
-    example_files = ui_detection_data.get("examples", [])
-    if not example_files:
-        return (
-            "<h1>Live Preview Not Available</h1><p>No example UI files found in detection output.</p>",
-            204,
-        )
 
-    combined_html = ""
-    css_content = ""
-    js_content = ""
-
-    # Assuming REPO_DIR is accessible here, or passed as an app config
-    # For now, let's assume PROJECT_ROOT is the base for repo
-    repo_root = (
-        PROJECT_ROOT / "repo" 
-    )  # Go up one level from backend to FrontFrEND, then into repo
-
-    for relative_path in example_files:
-        file_path = repo_root / relative_path
-        if not file_path.exists():
-            logging.warning(f"Live Preview: File not found in repo: {file_path}")
-            continue
-
-        try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                content = f.read()
-                if relative_path.endswith(".html"):
-                    combined_html = content
-                elif relative_path.endswith(".css"):
-                    css_content += content + "\n"
-                elif relative_path.endswith(".js"):
-                    js_content += content + "\n"
-        except Exception as e:
-            logging.error(f"Error reading file {file_path} for live preview: {e}")
-            continue
-
-    if not combined_html:
+@app.route("/api/live_preview", methods=["GET"])
+@app.route("/api/workflow/<job_id>/live_preview", methods=["GET"])
+def get_live_preview(job_id=None):
+    """Redirects to the job's "after" preview; kept for existing clients."""
+    job = _resolve_job(job_id)
+    if job is None or job.workspace is None:
         return (
-            "<h1>Live Preview Not Available</h1><p>No HTML file found in example UI files.</p>",
+            "<h1>Live Preview Not Available</h1><p>No workspace found for this job.</p>",
             204,
         )
-
-    # Embed CSS and JS into the HTML
-    if css_content:
-        combined_html = combined_html.replace(
-            "</head>", f"<style>{css_content}</style></head>"
-        )
-    if js_content:
-        combined_html = combined_html.replace(
-            "</body>", f"<script>{js_content}</script></body>"
-        )
-
-    return combined_html, 200
+    return redirect(url_for("get_preview", job_id=job.id, revision="after"))
 
 
 if __name__ == "__main__":
     # This is a simple way to run Flask for development.
-    # For production, use a WSGI server like Gunicorn or uWSGI.
+    # For production, serve wsgi.py with Gunicorn and run worker.py.
     app.run(debug=True, use_reloader=False, host="127.0.0.1", port=5001)
@@ -0,0 +1,285 @@
+"""
+End-to-end pipeline benchmark. Runs the whole workflow offline on synthetic
+repositories (bench/synthetic.py), with a stub in place of the model
+(bench/stub_llm.py), and reports wall time, CPU time, peak memory and model
+calls per phase. Run it from backend/:
+
+    python -m bench.pipeline
+    python -m bench.pipeline --files 50,2000 --mix html --mix react+flask --latency 0.5 --json before.json
+
+Caches, mirrors and workspaces live in a temporary directory, so runs neither
+read nor pollute the real ones. Phase 4/5 runs per UI file and concurrently, so
+it is reported as one "integrate" phase from its first event to the end of the
+run, export and flush included.
+"""
+
+import argparse
+import contextlib
+import json
+import logging
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+DEFAULT_FILES = (50, 1000)
+DEFAULT_MIXES = ("html", "react+flask", "vue")
+PREFERENCES = {"improvements": ["Modern look"], "theme": "dark", "priority": "readability"}
+
+# Phase 5 runs inside each file's Phase 4 task, so both count as one phase
+PHASE_NAMES = {"validate": "integrate"}
+METRICS = (
+    "wall_s",
+    "cpu_s",
+    "rss_peak_mb",
+    "heap_peak_mb",
+    "llm_calls",
+    "prompt_tokens",
+    "completion_tokens",
+)
+
+
+def _cpu_seconds() -> float:
+    """CPU time of this process and its finished children (the git processes)."""
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+
+def _rss_peak_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class PhaseRecorder:
+    """
+    Splits a workflow run into phases at the events it emits and measures each
+    one. The RSS peak is the process high-water mark when the phase ended; the
+    heap peak (with tracemalloc on) is the most Python memory in use during it.
+    """
+
+    def __init__(self, stats):
+        self.stats = stats
+        self.phases = {}
+        self._current = None
+        self._start = None
+
+    def _snapshot(self) -> dict:
+        llm = self.stats.snapshot()
+        return {
+            "wall_s": time.perf_counter(),
+            "cpu_s": _cpu_seconds(),
+            "llm_calls": llm["calls"],
+            "prompt_tokens": llm["prompt_tokens"],
+            "completion_tokens": llm["completion_tokens"],
+        }
+
+    def start(self, phase: str) -> None:
+        self.stop()
+        self._current, self._start = phase, self._snapshot()
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+
+    def stop(self) -> None:
+        if self._current is None:
+            return
+        end = self._snapshot()
+        measured = {metric: end[metric] - self._start[metric] for metric in end}
+        measured["rss_peak_mb"] = _rss_peak_mb()
+        measured["heap_peak_mb"] = (
+            tracemalloc.get_traced_memory()[1] / 1024**2 if tracemalloc.is_tracing() else None
+        )
+        self.phases[self._current] = measured
+        self._current = None
+
+    def on_event(self, event_type: str, phase: str | None = None, **_data) -> None:
+        phase = PHASE_NAMES.get(phase, phase)
+        if phase == "done":
+            self.stop()
+        elif phase is not None and phase != self._current and phase not in self.phases:
+            self.start(phase)
+
+
+def _isolate(work_dir: Path, rpm: int) -> None:
+    """Points every cache at `work_dir` and keeps the libraries offline; runs before src is imported."""
+    os.environ["FRONTFREND_LLM_CACHE"] = str(work_dir / "cache" / "llm.sqlite")
+    os.environ["FRONTFREND_REPO_CACHE"] = str(work_dir / "cache" / "mirrors")
+    os.environ["FRONTFREND_INDEX_DIR"] = str(work_dir / "cache" / "index")
+    os.environ["FRONTFREND_LLM_RPM"] = str(rpm)
+    os.environ.setdefault("LITELLM_LOCAL_MODEL_COST_MAP", "True")
+    os.environ.setdefault("CREWAI_DISABLE_TELEMETRY", "true")
+    os.environ.setdefault("CREWAI_TRACING_ENABLED", "false")
+    os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+
+
+def _median(runs: list[dict]) -> dict:
+    """The per-phase median of each metric over repeated runs."""
+    phases = {}
+    for phase in dict.fromkeys(p for run in runs for p in run):
+        phases[phase] = {}
+        for metric in METRICS:
+            values = [run[phase][metric] for run in runs if phase in run and run[phase][metric] is not None]
+            phases[phase][metric] = statistics.median(values) if values else None
+    return phases
+
+
+def _print_report(results: list[dict]) -> None:
+    header = f"{'scenario':<22} {'phase':<10} {'wall s':>8} {'cpu s':>8} {'rss MB':>8} {'heap MB':>8} {'calls':>6} {'tok in':>8} {'tok out':>8}"
+    print(header)
+    print("-" * len(header))
+    for result in results:
+        rows = list(result["phases"].items())
+        rows.append(("total", result["total"]))
+        for phase, m in rows:
+            heap = f"{m['heap_peak_mb']:>8.1f}" if m["heap_peak_mb"] is not None else f"{'-':>8}"
+            print(
+                f"{result['scenario']:<22} {phase:<10} {m['wall_s']:>8.2f} {m['cpu_s']:>8.2f} {m['rss_peak_mb']:>8.0f} "
+                f"{heap} {m['llm_calls']:>6.0f} {m['prompt_tokens']:>8.0f} {m['completion_tokens']:>8.0f}"
+            )
+        print(
+            f"{result['scenario']:<22} changed {result['changed_files']} files, "
+            f"{result['errors']} errors, calls by role {result['calls_by_role']}"
+        )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--files", default=",".join(map(str, DEFAULT_FILES)), help="comma-separated repository sizes in files"
+    )
+    parser.add_argument(
+        "--mix",
+        action="append",
+        help="frameworks of a repository joined with '+', e.g. react+flask (repeatable)",
+    )
+    parser.add_argument("--warmup", type=int, default=1, help="unmeasured runs of the first scenario")
+    parser.add_argument(
+        "--repeat", type=int, default=1, help="runs per scenario; the median of each metric is reported"
+    )
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds every stub model call takes")
+    parser.add_argument(
+        "--tokens-per-second", type=float, default=0.0, help="stub generation speed; 0 answers instantly"
+    )
+    parser.add_argument(
+        "--output-tokens", type=int, default=300, help="length of the advisor's and generator's answers"
+    )
+    parser.add_argument(
+        "--no-tool-reads", action="store_true", help="answer without reading the task's files first"
+    )
+    parser.add_argument(
+        "--rpm", type=int, default=0, help="scheduler requests per minute; 0 disables the limit"
+    )
+    parser.add_argument("--clone-mode", default="full", help="full, shallow, blobless or sparse")
+    parser.add_argument("--max-ui-files", type=int, default=None, help="UI files sent to the crews")
+    parser.add_argument(
+        "--trace-memory", action="store_true", help="measure each phase's Python heap peak (slower)"
+    )
+    parser.add_argument(
+        "--work-dir", type=Path, help="keep repositories and workspaces here instead of a temporary directory"
+    )
+    parser.add_argument("--json", type=Path, help="also write the results to this file")
+    parser.add_argument("--verbose", action="store_true", help="show the workflow's log")
+    args = parser.parse_args()
+
+    work_dir = args.work_dir or Path(tempfile.mkdtemp(prefix="frontfrend-bench-"))
+    _isolate(work_dir, args.rpm)
+    # The workflow's own logging setup is skipped once the root logger is configured
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, stream=sys.stderr)
+
+    import src.llm_cache
+    import workflow
+    from bench.stub_llm import CallStats, StubLLM
+    from bench.synthetic import generate_repo
+    from src.ui_ranker import MAX_UI_FILES
+    from utils.workspace import Workspace
+
+    stats = CallStats()
+    stub = StubLLM(
+        model="stub/benchmark",
+        latency_seconds=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        output_tokens=args.output_tokens,
+        read_files=not args.no_tool_reads,
+        stats=stats,
+    )
+    # Every crew gets a copy of the pooled model (see create_llm), so the stub replaces the pool
+    src.llm_cache.get_base_llm = lambda config: stub
+    devnull = open(os.devnull, "w", encoding="utf-8")
+
+    def run(repo: Path) -> tuple[dict, dict]:
+        """Runs the workflow once on `repo`; returns the measured phases and a summary of the run."""
+        recorder = PhaseRecorder(stats)
+        before = stats.snapshot()
+        started, cpu_started = time.perf_counter(), _cpu_seconds()
+        # The phases print their intermediate results; keep the report readable
+        with contextlib.redirect_stdout(sys.stderr if args.verbose else devnull):
+            output = workflow.main(
+                repo.as_uri(),
+                PREFERENCES,
+                Workspace(base_dir=work_dir / "workspaces").create(),
+                clone_mode=args.clone_mode,
+                max_ui_files=args.max_ui_files or MAX_UI_FILES,
+                use_llm_cache=False,
+                on_event=recorder.on_event,
+                resume=False,
+            )
+        recorder.stop()
+        after = stats.snapshot()
+        recorder.phases["total"] = {
+            "wall_s": time.perf_counter() - started,
+            "cpu_s": _cpu_seconds() - cpu_started,
+            "rss_peak_mb": _rss_peak_mb(),
+            "heap_peak_mb": None,
+            "llm_calls": after["calls"] - before["calls"],
+            "prompt_tokens": after["prompt_tokens"] - before["prompt_tokens"],
+            "completion_tokens": after["completion_tokens"] - before["completion_tokens"],
+        }
+        summary = {
+            "changed_files": len((output or {}).get("files", [])),
+            "errors": len((output or {}).get("errors", [])),
+            "calls_by_role": {
+                role: count - before["by_role"].get(role, 0) for role, count in after["by_role"].items()
+            },
+        }
+        return recorder.phases, summary
+
+    scenarios = [
+        (files, mix)
+        for files in (int(size) for size in args.files.split(","))
+        for mix in args.mix or DEFAULT_MIXES
+    ]
+    repos = {
+        (files, mix): generate_repo(work_dir / "repos" / f"{mix}-{files}", files, mix.split("+"))
+        for files, mix in scenarios
+    }
+    # The crew stacks finish loading during the first crew run; keep that out of the numbers
+    for _ in range(args.warmup):
+        run(repos[scenarios[0]])
+    if args.trace_memory:
+        tracemalloc.start()
+
+    results = []
+    for files, mix in scenarios:
+        runs, summary = [], {}
+        for _ in range(args.repeat):
+            phases, summary = run(repos[files, mix])
+            runs.append(phases)
+        phases = _median(runs)
+        results.append(
+            {"scenario": f"{mix}/{files}", "total": phases.pop("total"), "phases": phases, **summary}
+        )
+
+    _print_report(results)
+    if args.json:
+        settings = {key: value for key, value in vars(args).items() if key not in ("json", "work_dir")}
+        args.json.write_text(json.dumps({"settings": settings, "results": results}, indent=2, default=str))
+    print(f"Repositories and workspaces: {work_dir}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
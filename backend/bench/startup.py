@@ -0,0 +1,100 @@
+"""
+Cold-start check. Imports each entry point in a fresh interpreter and reports
+how long it took and whether it pulled in the crew stacks, which only the
+workflow's UI phase needs, or GitPython, which only fetching needs:
+
+    python bench/startup.py
+    python bench/startup.py --budget app=0.5 --budget worker=0.5
+
+Exits non-zero when a module loads a heavy package it should not, or exceeds
+its budget (seconds), so it can guard startup time in CI.
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Packages that are slow to import; only crews, LLM calls and fetching need them
+HEAVY_PACKAGES = ("crewai", "litellm", "git")
+
+# Module -> the HEAVY_PACKAGES it may import at import time
+MODULES = {
+    "app": (),
+    "worker": (),
+    "workflow": ("git",),
+    "src.ui_detector": (),
+    "src.git_details": ("git",),
+    "src.ui_advisor": HEAVY_PACKAGES,
+}
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "loaded": [p for p in {heavy!r} if p in sys.modules]}}))
+"""
+
+
+def measure(module: str, runs: int) -> dict:
+    """Imports `module` in `runs` fresh interpreters; returns the best time and the heavy packages loaded."""
+    best, loaded = None, []
+    for _ in range(runs):
+        completed = subprocess.run(
+            [sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY_PACKAGES)],
+            cwd=BACKEND_DIR,
+            capture_output=True,
+            text=True,
+        )
+        if completed.returncode != 0:
+            raise RuntimeError(f"importing {module} failed:\n{completed.stderr.strip()}")
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        best = result["seconds"] if best is None else min(best, result["seconds"])
+        loaded = result["loaded"]
+    return {"seconds": best, "loaded": loaded}
+
+
+def parse_budget(value: str) -> tuple[str, float]:
+    module, _, seconds = value.partition("=")
+    try:
+        return module, float(seconds)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected MODULE=SECONDS, got {value!r}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3, help="fresh interpreters per module; the best time counts")
+    parser.add_argument(
+        "--budget",
+        type=parse_budget,
+        action="append",
+        default=[],
+        metavar="MODULE=SECONDS",
+        help="fail when MODULE takes longer than SECONDS to import",
+    )
+    args = parser.parse_args()
+    budgets = dict(args.budget)
+
+    failures = []
+    print(f"{'module':<20} {'seconds':>8}  heavy packages")
+    for module, allowed in MODULES.items():
+        result = measure(module, args.runs)
+        print(f"{module:<20} {result['seconds']:>8.3f}  {', '.join(result['loaded']) or '-'}")
+        unexpected = [package for package in result["loaded"] if package not in allowed]
+        if unexpected:
+            failures.append(f"{module} imports {', '.join(unexpected)}")
+        if module in budgets and result["seconds"] > budgets[module]:
+            failures.append(f"{module} took {result['seconds']:.3f}s, budget {budgets[module]:.3f}s")
+
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,192 @@
+"""
+A deterministic stand-in for the model, so the pipeline can be measured offline.
+It follows the ReAct protocol of the crews: it first reads every file a task
+names with the `file_reader` tool, then answers the way the agent would, with
+edits that apply to the files it read. Latency and answer length are settings.
+"""
+
+import json
+import re
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+from crewai.llms.base_llm import BaseLLM
+from pydantic import Field
+
+from src.llm_scheduler import estimate_tokens
+
+# Agent role (as it appears in the prompt) -> the kind of answer it gets
+ROLES = {
+    "Expert UI/UX and Accessibility Consultant": "advisor",
+    "Senior Frontend Developer": "generator",
+    "Frontend-Backend Change Validator": "validator",
+    "Backend Code Adjuster": "backend",
+}
+
+# Comment syntax per suffix for the line the stub inserts; other files are returned unchanged
+COMMENTS = {
+    ".css": "/* {} */",
+    ".scss": "/* {} */",
+    ".less": "/* {} */",
+    ".js": "// {}",
+    ".jsx": "// {}",
+    ".ts": "// {}",
+    ".tsx": "// {}",
+    ".html": "<!-- {} -->",
+    ".vue": "<!-- {} -->",
+    ".svelte": "<!-- {} -->",
+    ".jinja": "{{# {} #}}",
+    ".jinja2": "{{# {} #}}",
+    ".j2": "{{# {} #}}",
+    ".py": "# {}",
+}
+MARKER = "restyled by the benchmark stub"
+
+QUOTED_PATH_PATTERN = re.compile(r"'(/[^'\n]+)'")
+FILLER_WORDS = "consistent spacing improves the visual rhythm of the layout".split()
+
+
+class CallStats:
+    """Model calls made through the stub, counted per agent role; shared by its copies."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = Counter()
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def record(self, role: str, prompt_tokens: int, completion_tokens: int) -> None:
+        with self._lock:
+            self.calls[role] += 1
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "calls": sum(self.calls.values()),
+                "by_role": dict(self.calls),
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+            }
+
+
+def _text(message) -> str:
+    content = message.get("content") if isinstance(message, dict) else message
+    if isinstance(content, list):
+        return "\n".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content or ""
+
+
+def _filler(tokens: int) -> str:
+    """About `tokens` tokens of prose (four characters per token)."""
+    words, length = [], 0
+    while length < tokens * 4:
+        word = FILLER_WORDS[len(words) % len(FILLER_WORDS)]
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words)
+
+
+def _edit_section(path: Path, full_file: bool) -> str:
+    """The generator's answer for one file: an edit block, or the whole file."""
+    try:
+        content = path.read_text(encoding="utf-8")
+    except OSError:
+        content = ""
+    comment = COMMENTS.get(path.suffix.lower())
+    if comment is None or full_file:
+        if comment is not None:
+            content = comment.format(MARKER) + "\n" + content
+        return f"FILE: {path}\n```\n{content}```\n"
+
+    # Insert the comment above the first line that occurs only once, or append it
+    lines = content.splitlines(keepends=True)
+    anchor = next((line for line in lines if line.strip() and content.count(line) == 1), None)
+    if anchor is None:
+        search, replace = "", comment.format(MARKER) + "\n"
+    else:
+        anchor = anchor if anchor.endswith("\n") else anchor + "\n"
+        search, replace = anchor, comment.format(MARKER) + "\n" + anchor
+    return f"FILE: {path}\n<<<<<<< SEARCH\n{search}=======\n{replace}>>>>>>> REPLACE\n"
+
+
+class StubLLM(BaseLLM):
+    """
+    Answers crew prompts without a model. Every call takes `latency_seconds`, plus
+    the answer's length at `tokens_per_second` when that is set; the advisor's and
+    generator's answers are padded to about `output_tokens`. With `read_files`
+    False it answers right away instead of reading the task's files first.
+    """
+
+    llm_type: str = "stub"
+    latency_seconds: float = 0.0
+    tokens_per_second: float = 0.0
+    output_tokens: int = 300
+    read_files: bool = True
+    stats: CallStats = Field(default_factory=CallStats, exclude=True)
+
+    def call(
+        self,
+        messages,
+        tools=None,
+        callbacks=None,
+        available_functions=None,
+        from_task=None,
+        from_agent=None,
+        response_model=None,
+    ) -> str:
+        messages = [{"role": "user", "content": messages}] if isinstance(messages, str) else messages
+        # The first message introduces the agent by its role; the second holds the task
+        prompt = "\n".join(_text(m) for m in messages[:2])
+        role = next((kind for name, kind in ROLES.items() if name in _text(messages[0])), "other")
+        paths = [Path(p) for p in dict.fromkeys(QUOTED_PATH_PATTERN.findall(prompt)) if Path(p).is_file()]
+        reads = sum(_text(m).count("Action: file_reader") for m in messages[2:])
+
+        if self.read_files and role != "backend" and reads < len(paths):
+            path = paths[reads]
+            response = (
+                f"Thought: I need to read {path.name} first.\n"
+                f"Action: file_reader\n"
+                f"Action Input: {json.dumps({'file_path': str(path)})}"
+            )
+        else:
+            response = "Thought: I now know the final answer\nFinal Answer: " + self._answer(
+                role, prompt, paths
+            )
+
+        completion_tokens = estimate_tokens(response)
+        delay = self.latency_seconds
+        if self.tokens_per_second > 0:
+            delay += completion_tokens / self.tokens_per_second
+        if delay > 0:
+            time.sleep(delay)
+        self.stats.record(role, estimate_tokens(messages), completion_tokens)
+        return response
+
+    def _answer(self, role: str, prompt: str, paths: list[Path]) -> str:
+        if role == "advisor":
+            suggestions = "\n".join(
+                f"{i}. {path.name}: refine the color palette and spacing."
+                for i, path in enumerate(paths * 5, 1)
+            )
+            return f"## Summary\n{_filler(self.output_tokens)}\n\n## Suggestions\n{suggestions}\n"
+        if role == "generator":
+            full_file = "Output Entire Modified Files" in prompt
+            sections = "".join(_edit_section(path, full_file) for path in paths)
+            return f"{_filler(self.output_tokens)}\n{sections}"
+        if role == "validator":
+            return json.dumps({"changes_required": False, "message": "No backend changes required."})
+        if role == "backend":
+            return json.dumps(
+                {"changes_required": False, "files": [], "message": "No backend changes required."}
+            )
+        return "Done."
+
+    def supports_function_calling(self) -> bool:
+        return False
+
+    def get_context_window_size(self) -> int:
+        return 1_000_000
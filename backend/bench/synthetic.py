@@ -0,0 +1,181 @@
+"""
+Synthetic repositories for the benchmarks: a UI in one or more frameworks plus
+filler modules up to a total file count. The same arguments always produce the
+same files and commit, so runs are comparable across changes.
+"""
+
+import os
+import random
+import subprocess
+from pathlib import Path
+
+FILLER_KINDS = ("py", "md", "json")
+
+
+def _component(name: str, rng: random.Random) -> str:
+    items = "\n".join(
+        f'        <li className="item">{name} entry {i}</li>' for i in range(rng.randint(3, 12))
+    )
+    return (
+        f"import React from 'react';\nimport './{name}.css';\n\n"
+        f'export default function {name}({{ title }}) {{\n  return (\n    <section className="{name.lower()}">\n'
+        f"      <h2>{{title}}</h2>\n      <ul>\n{items}\n      </ul>\n    </section>\n  );\n}}\n"
+    )
+
+
+def _stylesheet(selector: str, rng: random.Random) -> str:
+    rules = [
+        f".{selector} .part-{i} {{\n  margin: {rng.randint(0, 24)}px;\n  color: #{rng.randrange(0x1000000):06x};\n}}\n"
+        for i in range(rng.randint(4, 20))
+    ]
+    return f".{selector} {{\n  display: flex;\n  padding: 16px;\n}}\n\n" + "\n".join(rules)
+
+
+def _page(title: str, links: list[str], rng: random.Random) -> str:
+    paragraphs = "\n".join(f"    <p>{title} paragraph {i}.</p>" for i in range(rng.randint(3, 15)))
+    head = "\n".join(f'  <link rel="stylesheet" href="{link}">' for link in links if link.endswith(".css"))
+    scripts = "\n".join(f'  <script src="{link}"></script>' for link in links if link.endswith(".js"))
+    return (
+        f'<!DOCTYPE html>\n<html lang="en">\n<head>\n  <meta charset="utf-8">\n  <title>{title}</title>\n{head}\n</head>\n'
+        f"<body>\n  <main>\n    <h1>{title}</h1>\n{paragraphs}\n  </main>\n{scripts}\n</body>\n</html>\n"
+    )
+
+
+def _html(rng: random.Random) -> dict[str, str]:
+    files = {
+        "static/css/style.css": _stylesheet("site", rng),
+        "static/js/main.js": "document.addEventListener('DOMContentLoaded', () => {\n  console.log('ready');\n});\n",
+    }
+    for name in ("index", "about", "contact"):
+        files[f"{name}.html"] = _page(name.title(), ["static/css/style.css", "static/js/main.js"], rng)
+    return files
+
+
+def _react(rng: random.Random) -> dict[str, str]:
+    names = [f"Widget{i}" for i in range(rng.randint(3, 6))]
+    imports = "\n".join(f"import {name} from './components/{name}';" for name in names)
+    body = "\n".join(f'      <{name} title="{name}" />' for name in names)
+    files = {
+        "frontend/package.json": (
+            '{\n  "name": "frontend",\n  "dependencies": {"react": "^18.2.0", "react-dom": "^18.2.0"}\n}\n'
+        ),
+        "frontend/public/index.html": _page("App", [], rng),
+        "frontend/src/index.js": (
+            "import React from 'react';\nimport { createRoot } from 'react-dom/client';\nimport App from './App';\n\n"
+            "createRoot(document.getElementById('root')).render(<App />);\n"
+        ),
+        "frontend/src/App.jsx": (
+            f"import React from 'react';\nimport './App.css';\n{imports}\n\n"
+            f'export default function App() {{\n  return (\n    <div className="app">\n{body}\n    </div>\n  );\n}}\n'
+        ),
+        "frontend/src/App.css": _stylesheet("app", rng),
+    }
+    for name in names:
+        files[f"frontend/src/components/{name}.jsx"] = _component(name, rng)
+        files[f"frontend/src/components/{name}.css"] = _stylesheet(name.lower(), rng)
+    return files
+
+
+def _vue(rng: random.Random) -> dict[str, str]:
+    names = [f"Panel{i}" for i in range(rng.randint(3, 6))]
+    files = {
+        "client/package.json": '{\n  "name": "client",\n  "dependencies": {"vue": "^3.4.0"}\n}\n',
+        "client/vite.config.js": (
+            "import { defineConfig } from 'vite';\nimport vue from '@vitejs/plugin-vue';\n\n"
+            "export default defineConfig({ plugins: [vue()] });\n"
+        ),
+        "client/src/main.js": "import { createApp } from 'vue';\nimport App from './App.vue';\n\ncreateApp(App).mount('#app');\n",
+        "client/src/App.vue": '<template>\n  <div id="app">\n'
+        + "".join(f"    <{name} />\n" for name in names)
+        + "  </div>\n</template>\n\n<script>\n"
+        + "".join(f"import {name} from './components/{name}.vue';\n" for name in names)
+        + f"export default {{ components: {{ {', '.join(names)} }} }};\n</script>\n",
+    }
+    for name in names:
+        files[f"client/src/components/{name}.vue"] = (
+            f'<template>\n  <section class="{name.lower()}">\n    <h2>{name}</h2>\n  </section>\n</template>\n\n'
+            f"<style scoped>\n{_stylesheet(name.lower(), rng)}</style>\n"
+        )
+    return files
+
+
+def _flask(rng: random.Random) -> dict[str, str]:
+    pages = [f"page{i}" for i in range(rng.randint(2, 5))]
+    routes = "".join(
+        f'\n\n@app.route("/{page}")\ndef {page}():\n    return render_template("{page}.html", items=ITEMS)\n'
+        for page in pages
+    )
+    files = {
+        "server/app.py": 'from flask import Flask, render_template\n\napp = Flask(__name__)\nITEMS = ["alpha", "beta"]\n'
+        + routes,
+        "server/static/style.css": _stylesheet("server", rng),
+        "server/templates/base.html": _page("Base", ["/static/style.css"], rng).replace(
+            "  </main>", "  {% block content %}{% endblock %}\n  </main>"
+        ),
+    }
+    for page in pages:
+        files[f"server/templates/{page}.html"] = (
+            '{% extends "base.html" %}\n{% block content %}\n<ul>\n{% for item in items %}\n'
+            f'  <li class="{page}">{{{{ item }}}}</li>\n{{% endfor %}}\n</ul>\n{{% endblock %}}\n'
+        )
+    return files
+
+
+FRAMEWORKS = {"html": _html, "react": _react, "vue": _vue, "flask": _flask}
+
+
+def _filler(index: int, rng: random.Random) -> tuple[str, str]:
+    kind = FILLER_KINDS[index % len(FILLER_KINDS)]
+    package = f"pkg{index // 50}"
+    if kind == "py":
+        functions = "".join(
+            f"\n\ndef handler_{index}_{i}(value):\n    return value * {rng.randint(1, 9)} + {i}\n"
+            for i in range(rng.randint(2, 12))
+        )
+        return f"lib/{package}/module_{index}.py", f'"""Module {index}."""' + functions
+    if kind == "md":
+        lines = "\n".join(f"- Note {i} about module {index}." for i in range(rng.randint(3, 20)))
+        return f"docs/{package}/note_{index}.md", f"# Note {index}\n\n{lines}\n"
+    return f"config/{package}/settings_{index}.json", f'{{"id": {index}, "weight": {rng.randint(1, 100)}}}\n'
+
+
+def generate_repo(root: Path, files: int, frameworks: list[str], seed: int = 0) -> Path:
+    """
+    Writes a repository with the UI files of `frameworks` (keys of FRAMEWORKS)
+    and filler modules up to `files` files in total, commits it and returns its
+    path. An existing repository at `root` is reused as it is.
+    """
+    root = Path(root)
+    if (root / ".git").is_dir():
+        return root
+    unknown = [name for name in frameworks if name not in FRAMEWORKS]
+    if unknown:
+        raise ValueError(f"Unknown frameworks {unknown}; choose from {sorted(FRAMEWORKS)}")
+
+    rng = random.Random(f"{seed}:{files}:{'+'.join(frameworks)}")
+    contents = {}
+    for name in frameworks:
+        contents.update(FRAMEWORKS[name](rng))
+    contents["README.md"] = f"# Synthetic {' + '.join(frameworks)} repository\n"
+    for index in range(max(0, files - len(contents))):
+        path, content = _filler(index, rng)
+        contents[path] = content
+
+    for path, content in contents.items():
+        target = root / path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text(content, encoding="utf-8")
+
+    # A fixed identity and date keep the commit hash stable
+    env = dict(
+        os.environ,
+        GIT_AUTHOR_NAME="bench",
+        GIT_AUTHOR_EMAIL="bench@example.com",
+        GIT_COMMITTER_NAME="bench",
+        GIT_COMMITTER_EMAIL="bench@example.com",
+        GIT_AUTHOR_DATE="2024-01-01T00:00:00Z",
+        GIT_COMMITTER_DATE="2024-01-01T00:00:00Z",
+    )
+    for args in (["init", "-q", "-b", "main"], ["add", "-A"], ["commit", "-q", "-m", "Synthetic repository"]):
+        subprocess.run(["git", *args], cwd=root, env=env, check=True)
+    return root
@@ -1 +1 @@
-from .models import LLMConfig
+from .models import ChangeSet, FileChange, LLMConfig, default_llm_config
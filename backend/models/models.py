@@ -1,3 +1,5 @@
+from functools import lru_cache
+
 from pydantic import BaseModel
 # "http://localhost:11434"
 
@@ -6,3 +8,25 @@ class LLMConfig(BaseModel):
     model_name: str = "gemini/gemini-2.5-pro"
     temperature: float = 0.7
     base_url: str = None
+
+
+@lru_cache(maxsize=None)
+def default_llm_config() -> LLMConfig:
+    """The LLMConfig every crew uses, built once per process; treat it as read-only."""
+    return LLMConfig()
+
+
+class FileChange(BaseModel):
+    """One file in a change set: either its new `content` or a SEARCH/REPLACE `patch`."""
+
+    path: str
+    content: str | None = None
+    patch: str | None = None
+
+
+class ChangeSet(BaseModel):
+    """The structured final answer of crews that modify files."""
+
+    changes_required: bool = False
+    files: list[FileChange] = []
+    message: str = ""
@@ -1,8 +1,24 @@
-from crewai import Agent, Task, Crew, Process, LLM
-from tools.tools import read_file, write_file
+from crewai import Agent, Task, Crew, Process
+from tools.tools import make_context_tools, make_file_tools
+from functools import lru_cache
 from pathlib import Path
 import json
-from models import LLMConfig
+from models import default_llm_config
+from src.change_writer import parse_change_set, write_change_set
+from src.context_packer import summarize_repo
+from src.llm_cache import create_llm, fingerprint_files
+from src.llm_scheduler import DEFAULT_PRIORITY
+
+
+@lru_cache(maxsize=16)
+def _repo_summary(file_tree_path: str, mtime_ns: int, size: int) -> str:
+    """
+    Summarizes the file tree at `file_tree_path` once for all UI files of a run;
+    the modification time and size are part of the key, so a rewritten tree is read again.
+    """
+    with open(file_tree_path, "r") as f:
+        file_tree_data = json.load(f)
+    return summarize_repo([f["path"] for f in file_tree_data.get("files", [])])
 
 
 class BackendIntegration:
@@ -12,11 +28,19 @@ class BackendIntegration:
         frontend_changes_output_path: str,
         file_tree_path: Path,
         user_preferences: str,
+        materialize=None,
+        use_llm_cache: bool = True,
+        write_tracker=None,
+        priority: str = DEFAULT_PRIORITY,
+        overlay=None,
     ):
         self.repo_path = repo_path
         self.frontend_changes_output_path = frontend_changes_output_path
         self.file_tree_path = file_tree_path
         self.user_preferences = user_preferences
+        self.materialize = materialize
+        self.write_tracker = write_tracker
+        self.overlay = overlay
 
         formatted_preferences = []
         if self.user_preferences.get("improvements"):
@@ -35,19 +59,45 @@ class BackendIntegration:
             )
 
         self.formatted_preferences = "\n".join(formatted_preferences)
-        self.llm = LLM(
-            model=LLMConfig().model_name,
-            temperature=LLMConfig().temperature,
-            base_url=LLMConfig().base_url,
+        # The frontend file and the tree it is checked against decide the answers;
+        # the agents read the file with this run's staged edits, so hash those
+        file_tree_path = Path(self.file_tree_path)
+        self.llm = create_llm(
+            default_llm_config(),
+            fingerprint=fingerprint_files(
+                self.repo_path,
+                [self.frontend_changes_output_path],
+                read=overlay.read if overlay is not None else None,
+            )
+            + fingerprint_files(file_tree_path.parent, [file_tree_path.name]),
+            root=self.repo_path,
+            use_cache=use_llm_cache,
+            priority=priority,
+        )
+        # Several integrations run concurrently; the tracker keeps their writes apart.
+        # Changes are written locally from the final answer, so the agent only reads.
+        self.file_read_tool = make_file_tools(
+            self.repo_path,
+            on_missing=materialize,
+            tracker=write_tracker,
+            overlay=overlay,
+            owner=frontend_changes_output_path,
+        )[0]
+        # The validator only analyzes, so it reads large files in packed form
+        self.context_tools = make_context_tools(
+            self.repo_path, on_missing=materialize, overlay=overlay
         )
-        self.file_read_tool = read_file
-        self.file_write_tool = write_file
 
     def run(self):
-        # Load the file tree to get all file paths
-        with open(self.file_tree_path, "r") as f:
-            file_tree_data = json.load(f)
-        all_repo_files = [f["path"] for f in file_tree_data.get("files", [])]
+        """
+        Runs the validator and backend crews and writes the backend change set.
+        Returns the manifest of written files (see `write_change_set`).
+        """
+        # Summarize the file tree; shared by the integrations of every UI file
+        stat = Path(self.file_tree_path).stat()
+        repo_summary = _repo_summary(
+            str(self.file_tree_path), stat.st_mtime_ns, stat.st_size
+        )
 
         # Resolve the full path to the frontend changes file
         full_frontend_changes_path = self.repo_path.joinpath(
@@ -71,7 +121,7 @@ class BackendIntegration:
             ),
             verbose=False,
             llm=self.llm,
-            tools=[self.file_read_tool],
+            tools=list(self.context_tools),
             allow_delegation=False,
         )
 
@@ -92,7 +142,7 @@ class BackendIntegration:
             ),
             verbose=False,
             llm=self.llm,
-            tools=[self.file_read_tool, self.file_write_tool],
+            tools=[self.file_read_tool],
             allow_delegation=False,
         )
 
@@ -102,31 +152,33 @@ class BackendIntegration:
             1.  **Read Frontend Changes:** Read the content of the file at '{full_frontend_changes_path}' to understand the frontend modifications.
             2.  **Analyze Backend Impact:** Based on the frontend changes, and considering the user's preferences (\n{self.formatted_preferences}), identify any necessary backend changes.
                 Look for new data fields, modified API endpoints, or any other changes that require a corresponding update in the backend.
-            3.  **Consult File List:** You have access to a list of all repository files in the `all_repo_files` variable. Use this to identify potential backend files that may need changes.
+            3.  **Consult File List:** Use this summary of the repository's files to identify potential backend files that may need changes.
+                Inspect candidates with the 'file_outline', 'file_reader' and 'file_range_reader' tools.
+{repo_summary}
             4.  **Output Required Changes:** Produce a JSON report detailing the required backend changes. If no changes are needed, your report should indicate that.
             """,
             expected_output="""A JSON object detailing the required backend changes, or a string "No backend changes required.".
             Example for changes:
             ```json
-            {{
+            {
                 "changes_required": true,
                 "files_to_modify": [
-                    {{
+                    {
                         "path": "src/api/items.py",
                         "modifications": [
                             "Add 'new_field' to ItemCreate Pydantic model.",
                             "Update '/items/' POST endpoint to handle 'new_field'."
                         ]
-                    }}
+                    }
                 ]
-            }}
+            }
             ```
             Example for no changes:
             ```json
-            {{
+            {
                 "changes_required": false,
                 "message": "No backend changes required."
-            }}
+            }
             ```
             """,
             agent=validator_agent,
@@ -137,17 +189,40 @@ class BackendIntegration:
             description="""
             **Your task is to act as a backend developer and implement the changes specified by the validator.**
             1.  **Parse Validator's Report:** Carefully analyze the JSON output from the 'Frontend-Backend Change Validator'.
-            2.  **Check for Required Changes:** If the report indicates that no changes are required (`"changes_required": false`), you must output the message from the report and stop.
-            3.  **Implement Changes:** If changes are required, you must iterate through the `files_to_modify` list. For each file:
+            2.  **Check for Required Changes:** If the report indicates that no changes are required (`"changes_required": false`), answer with a change set that has no files and stop.
+            3.  **Prepare Changes:** If changes are required, you must iterate through the `files_to_modify` list. For each file:
                 a.  Use the `file_reader` tool to read the file's content.
-                b.  Apply the specified modifications to the content.
-                c.  Use the `file_writer` tool to write the modified content back to the file.
-            4.  **Confirm Your Work:** After successfully modifying all the files, you must output a confirmation message that lists the paths of the files you have changed.
+                b.  Express the specified modifications as SEARCH/REPLACE blocks in the file's "patch" field:
+                    <<<<<<< SEARCH
+                    (lines copied exactly from the file, including indentation)
+                    =======
+                    (the lines that replace them)
+                    >>>>>>> REPLACE
+                    Each SEARCH section must match exactly one place in the file. For a new file, give its full text in "content" instead.
+            4.  **Answer With the Change Set:** Your final answer is the JSON change set only. You do not write files yourself; it is applied for you.
             """,
-            expected_output="""A confirmation message stating which backend files were modified (listing their paths),
-            or a message stating that no backend changes were required.
-            Example for changes: "Successfully modified: src/api/items.py, src/models/user.py"
-            Example for no changes: "No backend changes required."
+            expected_output="""A JSON change set, and nothing else.
+            Example for changes:
+            ```json
+            {
+                "changes_required": true,
+                "files": [
+                    {
+                        "path": "src/api/items.py",
+                        "patch": "<<<<<<< SEARCH\\nclass ItemCreate(BaseModel):\\n    name: str\\n=======\\nclass ItemCreate(BaseModel):\\n    name: str\\n    new_field: str | None = None\\n>>>>>>> REPLACE\\n"
+                    }
+                ],
+                "message": "Added 'new_field' to ItemCreate."
+            }
+            ```
+            Example for no changes:
+            ```json
+            {
+                "changes_required": false,
+                "files": [],
+                "message": "No backend changes required."
+            }
+            ```
             """,
             agent=backend_agent,
             context=[validator_task],
@@ -160,8 +235,16 @@ class BackendIntegration:
             verbose=False,
         )
 
-        result = crew.kickoff()
-        return result
+        crew.kickoff()
+        change_set = parse_change_set(backend_task.output.raw)
+        return write_change_set(
+            self.repo_path,
+            change_set.files,
+            tracker=self.write_tracker,
+            owner=self.frontend_changes_output_path,
+            on_missing=self.materialize,
+            overlay=self.overlay,
+        )
 
 
 if __name__ == "__main__":
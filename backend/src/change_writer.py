@@ -0,0 +1,139 @@
+import hashlib
+import json
+import re
+from contextlib import ExitStack
+from pathlib import Path
+
+from models import ChangeSet, FileChange
+from src.overlay import replace_atomically
+from src.patching import CODE_BLOCK_PATTERN, PatchError, apply_generation, validate
+from utils import telemetry
+
+
+class ChangeSetError(Exception):
+    """Raised when a change set cannot be parsed or written as a whole."""
+
+
+def _sha256(content: str | None) -> str | None:
+    if content is None:
+        return None
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def parse_change_set(output: str) -> ChangeSet:
+    """
+    Parses a crew's final answer into a ChangeSet. The JSON object may be bare
+    or fenced; an answer without one only counts as "no changes" if it says so.
+    """
+    candidates = CODE_BLOCK_PATTERN.findall(output)
+    start, end = output.find("{"), output.rfind("}")
+    if start != -1 and end > start:
+        candidates.append(output[start : end + 1])
+    for candidate in candidates:
+        try:
+            return ChangeSet.model_validate(json.loads(candidate))
+        except ValueError:
+            continue
+    if re.search(r"no backend changes", output, re.IGNORECASE):
+        return ChangeSet(changes_required=False, message=output.strip())
+    raise ChangeSetError(f"The answer is not a valid change set: {output[:300]}")
+
+
+def _resolve(repo_root: Path, file_path: str) -> Path:
+    full_path = repo_root.joinpath(file_path).resolve()
+    if repo_root not in full_path.parents:
+        raise ChangeSetError(f"Access denied. {file_path} is outside of the repository root.")
+    return full_path
+
+
+def write_change_set(
+    repo_root: Path,
+    changes: list[FileChange],
+    tracker=None,
+    owner: str = "",
+    on_missing=None,
+    overlay=None,
+) -> list[dict]:
+    """
+    Writes a batch of file changes under `repo_root`. Every change is resolved,
+    patched and validated before the first file is touched, so a bad change
+    leaves the checkout as it was; each file is then replaced atomically.
+    With a `tracker`, the paths are locked for the whole batch and a cancelled
+    `owner` is refused, as is full content based on a stale read; patches are
+    applied to the latest content, so changes by other tasks are kept. With an
+    `overlay` the files are read from and written to it instead of the checkout.
+    Returns a manifest of the files that changed.
+    """
+    repo_root = Path(repo_root).resolve()
+    targets = {}
+    for change in changes:
+        full_path = _resolve(repo_root, change.path)
+        relative_path = full_path.relative_to(repo_root).as_posix()
+        if relative_path in targets:
+            raise ChangeSetError(f"{relative_path} appears twice in one change set.")
+        if (change.content is None) == (change.patch is None):
+            raise ChangeSetError(f"{relative_path} needs exactly one of 'content' or 'patch'.")
+        targets[relative_path] = (full_path, change)
+
+    if overlay is None:
+        missing = [path for path, (full_path, _change) in targets.items() if not full_path.is_file()]
+        if missing and on_missing is not None:
+            on_missing(missing)
+
+    with ExitStack() as stack:
+        # Locks are taken in path order so overlapping batches cannot deadlock
+        if tracker is not None:
+            for relative_path in sorted(targets):
+                stack.enter_context(tracker.path_lock(relative_path))
+
+        planned = []
+        for relative_path, (full_path, change) in targets.items():
+            if overlay is not None:
+                current = overlay.read(relative_path)
+            else:
+                current = full_path.read_text(encoding="utf-8") if full_path.is_file() else None
+            try:
+                if change.patch is not None:
+                    if current is None:
+                        raise PatchError(f"Cannot patch {relative_path}; it does not exist.")
+                    content, _mode = apply_generation(
+                        relative_path, current, change.patch, allow_full_file=False
+                    )
+                    # The patch applied cleanly on top of any other task's changes
+                    if tracker is not None:
+                        tracker.saw(owner, relative_path, current)
+                else:
+                    content = change.content
+                    validate(relative_path, content)
+            except PatchError as e:
+                raise ChangeSetError(str(e)) from e
+            if content != current:
+                planned.append((relative_path, full_path, current, content))
+
+        if tracker is not None:
+            for relative_path, _full_path, current, _content in planned:
+                other = tracker.check_write(owner, relative_path, current)
+                if other == owner:
+                    raise ChangeSetError(f"This task was cancelled; {relative_path} was not written.")
+                if other is not None:
+                    raise ChangeSetError(f"{relative_path} was changed by another task ({other}).")
+
+        manifest = []
+        for relative_path, full_path, current, content in planned:
+            if overlay is not None:
+                overlay.write(relative_path, content)
+            else:
+                replace_atomically(full_path, content)
+            if tracker is not None:
+                tracker.wrote(owner, relative_path, content)
+            manifest.append(
+                {
+                    "path": relative_path,
+                    "action": "modified" if current is not None else "created",
+                    "before_sha256": _sha256(current),
+                    "after_sha256": _sha256(content),
+                    "bytes": len(content.encode("utf-8")),
+                }
+            )
+            telemetry.add("bytes_written", manifest[-1]["bytes"])
+    return manifest
@@ -0,0 +1,70 @@
+import hashlib
+import json
+import threading
+import time
+from pathlib import Path
+
+from src.overlay import replace_atomically
+
+
+def input_key(*parts) -> str:
+    """Hashes the inputs of a unit of work; JSON-serializable parts, order matters."""
+    encoded = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class Checkpoints:
+    """
+    The completed units of work of one workflow run (a phase, or one UI file of
+    a per-file phase), kept in the workspace so a retried or restarted run can
+    skip them. Each unit is recorded with the hash of its inputs and a small,
+    JSON-serializable output; it only counts as done while that hash matches.
+    Keys of later phases include the keys of earlier ones, so rerunning a phase
+    invalidates everything after it.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        try:
+            self._units = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            self._units = {}
+
+    def _save(self) -> None:
+        replace_atomically(self.path, json.dumps(self._units, separators=(",", ":")))
+
+    def get(self, unit: str, key: str) -> dict | None:
+        """Returns the output recorded for `unit`, or None unless it completed with inputs `key`."""
+        with self._lock:
+            entry = self._units.get(unit)
+            if entry is None or entry["key"] != key:
+                return None
+            return entry["output"]
+
+    def completed(self, keys: dict[str, str]) -> list[tuple[str, dict]]:
+        """Returns (unit, output) for the units of `keys` that completed with their key, oldest first."""
+        with self._lock:
+            entries = [
+                (unit, self._units[unit])
+                for unit, key in keys.items()
+                if unit in self._units and self._units[unit]["key"] == key
+            ]
+        return [(unit, entry["output"]) for unit, entry in sorted(entries, key=lambda e: e[1]["seq"])]
+
+    def record(self, unit: str, key: str, output: dict | None = None) -> None:
+        """Marks `unit` as completed for inputs `key`; later records sort after earlier ones."""
+        with self._lock:
+            seq = max((entry["seq"] for entry in self._units.values()), default=0) + 1
+            self._units[unit] = {
+                "key": key,
+                "seq": seq,
+                "completed_at": time.time(),
+                "output": output or {},
+            }
+            self._save()
+
+    def invalidate(self, unit: str) -> None:
+        with self._lock:
+            if self._units.pop(unit, None) is not None:
+                self._save()
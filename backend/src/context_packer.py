@@ -0,0 +1,256 @@
+import ast
+import logging
+import os
+import posixpath
+import re
+from collections import Counter
+from functools import lru_cache
+
+from models import default_llm_config
+
+# Files above this many tokens are served as an outline plus leading sections.
+READ_TOKEN_BUDGET = int(os.environ.get("FRONTFREND_READ_TOKEN_BUDGET", "6000"))
+# Size of the repository summary handed to the frontend-backend validator.
+REPO_SUMMARY_TOKENS = int(os.environ.get("FRONTFREND_REPO_SUMMARY_TOKENS", "1500"))
+
+JS_SUFFIXES = (".js", ".jsx", ".ts", ".tsx", ".mjs", ".vue", ".svelte")
+CSS_SUFFIXES = (".css", ".scss", ".sass", ".less")
+HTML_SUFFIXES = (".html", ".htm", ".jinja", ".jinja2", ".j2")
+
+JS_UNIT_PATTERN = re.compile(
+    r"^(?:export\s+(?:default\s+)?)?(?:async\s+)?"
+    r"(?:function\s*\*?\s*(?P<function>\w+)|class\s+(?P<class>\w+)"
+    r"|(?:const|let|var)\s+(?P<binding>\w+)\s*[=:]"
+    r"|(?:interface|type|enum)\s+(?P<type>\w+))",
+    re.MULTILINE,
+)
+HTML_UNIT_PATTERN = re.compile(
+    r"^\s{0,8}<(head|body|header|nav|main|section|article|aside|footer|form|script|style|template)\b",
+    re.IGNORECASE | re.MULTILINE,
+)
+# Paths that usually hold server code a frontend change can affect.
+BACKEND_HINT_PATTERN = re.compile(
+    r"(^|/)(api|routes?|server|backend|views?|controllers?|models?|schemas?|handlers?|app|main|wsgi|asgi|urls)([./]|$)",
+    re.IGNORECASE,
+)
+
+
+@lru_cache(maxsize=16)
+def _litellm_counter(model: str):
+    try:
+        from litellm import token_counter
+    except ImportError:
+        return None
+    return lambda text: token_counter(model=model, text=text)
+
+
+def count_tokens(text: str, model: str | None = None) -> int:
+    """Counts tokens with the model's tokenizer when litellm knows it, else estimates."""
+    model = model or default_llm_config().model_name
+    counter = _litellm_counter(model)
+    if counter is not None:
+        try:
+            return counter(text)
+        except Exception as e:
+            logging.debug(f"Token counting for {model} failed ({e}); estimating.")
+    return max(1, len(text) // 4)
+
+
+def _python_units(content: str) -> list[tuple[str, int, int]]:
+    try:
+        tree = ast.parse(content)
+    except SyntaxError:
+        return []
+    units = []
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            kind = "class" if isinstance(node, ast.ClassDef) else "def"
+            start = min([node.lineno] + [d.lineno for d in node.decorator_list])
+            units.append((f"{kind} {node.name}", start, node.end_lineno))
+    return units
+
+
+def _brace_end(lines: list[str], start: int) -> int:
+    """Returns the index of the line closing the first brace block opened at or after `start`."""
+    depth = 0
+    opened = False
+    for i in range(start, len(lines)):
+        for char in lines[i]:
+            if char == "{":
+                depth += 1
+                opened = True
+            elif char == "}":
+                depth -= 1
+        if opened and depth <= 0:
+            return i
+        if not opened and i > start and lines[i].rstrip().endswith(";"):
+            return i
+    return len(lines) - 1
+
+
+def _js_units(content: str) -> list[tuple[str, int, int]]:
+    lines = content.splitlines()
+    line_starts = [0]
+    for line in lines:
+        line_starts.append(line_starts[-1] + len(line) + 1)
+    units = []
+    last_end = -1
+    for match in JS_UNIT_PATTERN.finditer(content):
+        start = _line_index(line_starts, match.start())
+        if start <= last_end:
+            continue  # Nested inside the previous unit
+        name = next(value for value in match.groupdict().values() if value)
+        end = _brace_end(lines, start)
+        units.append((name, start + 1, end + 1))
+        last_end = end
+    return units
+
+
+def _css_units(content: str) -> list[tuple[str, int, int]]:
+    lines = content.splitlines()
+    units = []
+    i = 0
+    while i < len(lines):
+        line = lines[i].strip()
+        if line and not line.startswith(("/*", "*", "}")) and "{" in lines[i]:
+            end = _brace_end(lines, i)
+            units.append((line.split("{")[0].strip()[:80], i + 1, end + 1))
+            i = end + 1
+        else:
+            i += 1
+    return units
+
+
+def _html_units(content: str) -> list[tuple[str, int, int]]:
+    lines = content.splitlines()
+    line_starts = [0]
+    for line in lines:
+        line_starts.append(line_starts[-1] + len(line) + 1)
+    starts = [
+        (match.group(1).lower(), _line_index(line_starts, match.start()))
+        for match in HTML_UNIT_PATTERN.finditer(content)
+    ]
+    units = []
+    for i, (tag, start) in enumerate(starts):
+        end = starts[i + 1][1] - 1 if i + 1 < len(starts) else len(lines) - 1
+        units.append((f"<{tag}>", start + 1, max(start, end) + 1))
+    return units
+
+
+def _line_index(line_starts: list[int], offset: int) -> int:
+    low, high = 0, len(line_starts) - 1
+    while low < high:
+        mid = (low + high + 1) // 2
+        if line_starts[mid] <= offset:
+            low = mid
+        else:
+            high = mid - 1
+    return low
+
+
+def chunk_source(path: str, content: str) -> list[tuple[str, int, int]]:
+    """
+    Splits a source file into syntactic units (functions, classes, components,
+    CSS rules, top-level HTML sections). Returns (name, first_line, last_line)
+    tuples with 1-based, inclusive line numbers; unknown file types have none.
+    """
+    suffix = posixpath.splitext(path)[1].lower()
+    if suffix == ".py":
+        return _python_units(content)
+    if suffix in JS_SUFFIXES:
+        return _js_units(content)
+    if suffix in CSS_SUFFIXES:
+        return _css_units(content)
+    if suffix in HTML_SUFFIXES:
+        return _html_units(content)
+    return []
+
+
+def outline(path: str, content: str, model: str | None = None) -> str:
+    """Lists a file's units with their line ranges and token sizes."""
+    lines = content.splitlines()
+    units = chunk_source(path, content)
+    header = f"Outline of {path} ({len(lines)} lines, ~{count_tokens(content, model)} tokens):"
+    if not units:
+        return header + "\n(no recognizable sections; use file_range_reader with line numbers)"
+    rows = [
+        f"  lines {start}-{end}: {name} (~{count_tokens(chr(10).join(lines[start - 1:end]), model)} tokens)"
+        for name, start, end in units
+    ]
+    return "\n".join([header] + rows)
+
+
+def read_range(content: str, start: int, end: int) -> str:
+    """Returns lines `start` to `end` (1-based, inclusive), each prefixed with its number."""
+    lines = content.splitlines()
+    start = max(1, start)
+    end = min(len(lines), end)
+    if start > end:
+        return f"Error: the file has {len(lines)} lines; requested {start}-{end}."
+    return "\n".join(f"{n}: {lines[n - 1]}" for n in range(start, end + 1))
+
+
+def pack_file(path: str, content: str, budget: int = READ_TOKEN_BUDGET, model: str | None = None) -> str:
+    """
+    Returns `content` unchanged when it fits in `budget` tokens. Larger files are
+    packed as their outline followed by whole leading units that still fit, with
+    a note on reading the rest through the range tool.
+    """
+    total = count_tokens(content, model)
+    if total <= budget:
+        return content
+
+    packed = [outline(path, content, model)]
+    # Spend what the outline leaves on leading lines, at the file's chars-per-token ratio
+    chars_left = (budget - count_tokens(packed[0], model)) * len(content) // total
+    lines = content.splitlines()
+    shown_until = 0
+    for line in lines:
+        chars_left -= len(line) + 1
+        if chars_left < 0:
+            break
+        shown_until += 1
+    # Cut at the end of the last unit that fits completely, so no unit is shown half
+    unit_ends = [end for _name, _start, end in chunk_source(path, content) if end <= shown_until]
+    if unit_ends:
+        shown_until = max(unit_ends)
+    packed.append(f"\n--- lines 1-{shown_until} of {len(lines)} ---")
+    packed.append("\n".join(lines[:shown_until]))
+    packed.append(
+        f"--- truncated: {len(lines) - shown_until} more lines. Use file_range_reader "
+        f"with the line ranges from the outline above to read them. ---"
+    )
+    return "\n".join(packed)
+
+
+def summarize_repo(paths: list[str], budget: int = REPO_SUMMARY_TOKENS, model: str | None = None) -> str:
+    """
+    Builds a compact overview of the repository for prompts: file counts per
+    top-level directory and extension, then the likely backend and config files,
+    then everything else, until `budget` tokens are used.
+    """
+    top_dirs = Counter(p.split("/", 1)[0] if "/" in p else "." for p in paths)
+    suffixes = Counter(posixpath.splitext(p)[1] or "(none)" for p in paths)
+    lines = [
+        f"{len(paths)} files.",
+        "Directories: " + ", ".join(f"{d}/ ({n})" for d, n in top_dirs.most_common(15)),
+        "File types: " + ", ".join(f"{s} ({n})" for s, n in suffixes.most_common(10)),
+        "Files (likely backend first):",
+    ]
+    used = count_tokens("\n".join(lines), model)
+
+    def rank(path: str) -> tuple:
+        backend = bool(BACKEND_HINT_PATTERN.search(path)) or path.endswith(".py")
+        return (not backend, path.count("/"), path)
+
+    listed = 0
+    for path in sorted(paths, key=rank):
+        cost = max(1, len(path) // 4) + 1
+        if used + cost > budget:
+            break
+        lines.append(f"- {path}")
+        used += cost
+        listed += 1
+    if listed < len(paths):
+        lines.append(f"... and {len(paths) - listed} more files (use file_reader to inspect any path).")
+    return "\n".join(lines)
@@ -0,0 +1,180 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Iterator
+
+import git
+
+from src.file_scanner import is_ignored_path, scan_files
+
+INDEX_DIR = Path(
+    os.environ.get(
+        "FRONTFREND_INDEX_DIR", Path(__file__).parent.parent.parent / "cache" / "index"
+    )
+)
+# Number of commits per repository whose file trees are kept around.
+SNAPSHOTS_TO_KEEP = 5
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    commit_sha TEXT PRIMARY KEY,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS files (
+    commit_sha TEXT NOT NULL,
+    path TEXT NOT NULL,
+    size INTEGER,
+    type TEXT NOT NULL,
+    PRIMARY KEY (commit_sha, path)
+) WITHOUT ROWID;
+"""
+
+
+class FileIndex:
+    """A persistent per-repository file tree index, keyed by commit SHA."""
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def has(self, commit: str) -> bool:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT 1 FROM snapshots WHERE commit_sha = ?", (commit,)
+            ).fetchone()
+        return row is not None
+
+    def latest_commit(self) -> str | None:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT commit_sha FROM snapshots ORDER BY created_at DESC LIMIT 1"
+            ).fetchone()
+        return row[0] if row else None
+
+    def files(self, commit: str) -> Iterator[dict]:
+        """Streams the indexed file entries of `commit` in path order."""
+        conn = self._connect()
+        try:
+            cursor = conn.execute(
+                "SELECT path, size, type FROM files WHERE commit_sha = ? ORDER BY path",
+                (commit,),
+            )
+            for path, size, file_type in cursor:
+                yield {"path": path, "size": size, "type": file_type}
+        finally:
+            conn.close()
+
+    def store(self, commit: str, entries) -> None:
+        """Records a full file tree for `commit`."""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM files WHERE commit_sha = ?", (commit,))
+            conn.executemany(
+                "INSERT INTO files VALUES (?, ?, ?, ?)",
+                ((commit, e["path"], e["size"], e["type"]) for e in entries),
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO snapshots VALUES (?, ?)", (commit, time.time())
+            )
+        self.prune()
+
+    def update(self, base: str, commit: str, changes: list[tuple[str, str]], repo_dir: Path, sparse: bool) -> None:
+        """
+        Derives the tree of `commit` from the indexed tree of `base` and a list of
+        (status, path) pairs as reported by `git diff --name-status --no-renames`.
+        """
+        with self._connect() as conn:
+            conn.execute("DELETE FROM files WHERE commit_sha = ?", (commit,))
+            conn.execute(
+                "INSERT INTO files SELECT ?, path, size, type FROM files WHERE commit_sha = ?",
+                (commit, base),
+            )
+            for status, path in changes:
+                if status == "D" or is_ignored_path(path):
+                    conn.execute(
+                        "DELETE FROM files WHERE commit_sha = ? AND path = ?", (commit, path)
+                    )
+                    continue
+                size = None
+                if not sparse:
+                    try:
+                        size = os.lstat(Path(repo_dir) / path).st_size
+                    except OSError:
+                        continue
+                conn.execute(
+                    "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)",
+                    (commit, path, size, os.path.splitext(path)[1]),
+                )
+            conn.execute(
+                "INSERT OR REPLACE INTO snapshots VALUES (?, ?)", (commit, time.time())
+            )
+        self.prune()
+
+    def touch(self, commit: str) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE snapshots SET created_at = ? WHERE commit_sha = ?", (time.time(), commit)
+            )
+
+    def prune(self, keep: int = SNAPSHOTS_TO_KEEP) -> None:
+        with self._connect() as conn:
+            stale = conn.execute(
+                "SELECT commit_sha FROM snapshots ORDER BY created_at DESC LIMIT -1 OFFSET ?",
+                (keep,),
+            ).fetchall()
+            for (commit,) in stale:
+                conn.execute("DELETE FROM files WHERE commit_sha = ?", (commit,))
+                conn.execute("DELETE FROM snapshots WHERE commit_sha = ?", (commit,))
+
+
+def index_for(url: str, sparse: bool = False, index_dir: Path = INDEX_DIR) -> FileIndex:
+    key = hashlib.sha256(url.encode("utf-8")).hexdigest()[:16]
+    return FileIndex(Path(index_dir) / f"{key}{'-sparse' if sparse else ''}.sqlite")
+
+
+def _diff(repo: git.Repo, base: str, commit: str) -> list[tuple[str, str]]:
+    output = repo.git.diff("--name-status", "--no-renames", "-z", base, commit)
+    fields = [field for field in output.split("\0") if field]
+    return [(fields[i][0], fields[i + 1]) for i in range(0, len(fields) - 1, 2)]
+
+
+def indexed_files(url: str, repo_dir: Path, sparse: bool = False, full_scan=None) -> Iterator[dict]:
+    """
+    Returns the file tree of the checkout at `repo_dir`, reusing the index for its
+    HEAD commit, deriving it from the last indexed commit with `git diff`, or
+    falling back to `full_scan(repo_dir)` (a full directory scan by default).
+    """
+    repo = git.Repo(repo_dir)
+    commit = repo.head.commit.hexsha
+    index = index_for(url, sparse)
+
+    if index.has(commit):
+        logging.info(f"File index hit for {url} at {commit}")
+        index.touch(commit)
+        return index.files(commit)
+
+    base = index.latest_commit()
+    if base:
+        try:
+            changes = _diff(repo, base, commit)
+        except git.exc.GitCommandError as e:
+            logging.info(f"Cannot diff {base}..{commit} ({e.stderr.strip()}); rescanning.")
+        else:
+            logging.info(
+                f"Updating file index for {url} from {base[:12]} to {commit[:12]} ({len(changes)} changes)"
+            )
+            index.update(base, commit, changes, repo_dir, sparse)
+            return index.files(commit)
+
+    logging.info(f"Building file index for {url} at {commit}")
+    index.store(commit, (full_scan or scan_files)(repo_dir))
+    return index.files(commit)
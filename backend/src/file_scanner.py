@@ -0,0 +1,230 @@
+import fnmatch
+import logging
+import os
+import queue
+import shutil
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterator
+
+# Directories that never contain UI sources worth analyzing.
+IGNORED_DIRS = frozenset(
+    {
+        ".git",
+        "node_modules",
+        "bower_components",
+        "dist",
+        "build",
+        "venv",
+        ".venv",
+        "__pycache__",
+        ".next",
+        ".nuxt",
+        ".svelte-kit",
+        ".cache",
+        ".tox",
+        ".mypy_cache",
+        ".pytest_cache",
+        "coverage",
+    }
+)
+
+SCAN_WORKERS = int(os.environ.get("FRONTFREND_SCAN_WORKERS", min(8, os.cpu_count() or 1)))
+# A parallel walk hands entries over in batches and buffers a few batches per subtree
+SCAN_BATCH = 256
+SCAN_BUFFER = 4
+_DONE = object()
+
+
+def _entry(path: str, size: int | None) -> dict:
+    return {"path": path, "size": size, "type": os.path.splitext(path)[1]}
+
+
+def is_ignored_path(path: str) -> bool:
+    """Returns True if any directory component of a relative path is ignored."""
+    return any(part in IGNORED_DIRS for part in path.split("/")[:-1])
+
+
+class GitIgnore:
+    """A minimal .gitignore matcher: globs, anchored and directory-only patterns, negation."""
+
+    def __init__(self, rules: tuple = ()):
+        self.rules = rules
+
+    def extend(self, directory: str, gitignore_path: str) -> "GitIgnore":
+        """Returns a matcher with the patterns of `gitignore_path` (found in `directory`) added."""
+        try:
+            with open(gitignore_path, "r", encoding="utf-8", errors="ignore") as f:
+                lines = f.read().splitlines()
+        except OSError:
+            return self
+
+        rules = list(self.rules)
+        for line in lines:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            negate = line.startswith("!")
+            if negate:
+                line = line[1:]
+            dir_only = line.endswith("/")
+            line = line.rstrip("/")
+            # A slash at the start or in the middle anchors the pattern to `directory`
+            anchored = "/" in line
+            rules.append((directory, line.lstrip("/"), negate, dir_only, anchored))
+        return GitIgnore(tuple(rules))
+
+    def ignored(self, path: str, is_dir: bool) -> bool:
+        ignored = False
+        name = path.rsplit("/", 1)[-1]
+        for base, pattern, negate, dir_only, anchored in self.rules:
+            if dir_only and not is_dir:
+                continue
+            if base:
+                if not path.startswith(base + "/"):
+                    continue
+                relative = path[len(base) + 1 :]
+            else:
+                relative = path
+            target = relative if anchored else name
+            if fnmatch.fnmatchcase(target, pattern):
+                ignored = not negate
+        return ignored
+
+
+def _walk(root: str, prefix: str, ignore: GitIgnore) -> Iterator[dict]:
+    """Depth-first scandir walk that prunes ignored directories and reuses dirent data."""
+    stack = [(prefix, ignore)]
+    while stack:
+        rel_dir, ignore = stack.pop()
+        abs_dir = os.path.join(root, rel_dir) if rel_dir else root
+        gitignore = os.path.join(abs_dir, ".gitignore")
+        if os.path.isfile(gitignore):
+            ignore = ignore.extend(rel_dir, gitignore)
+        try:
+            with os.scandir(abs_dir) as entries:
+                subdirs = []
+                for entry in entries:
+                    rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in IGNORED_DIRS and not ignore.ignored(rel_path, True):
+                            subdirs.append(rel_path)
+                    elif entry.is_file(follow_symlinks=False):
+                        # A worktree's .git is a file pointing at the real git dir
+                        if entry.name != ".git" and not ignore.ignored(rel_path, False):
+                            yield _entry(rel_path, entry.stat(follow_symlinks=False).st_size)
+        except OSError as e:
+            logging.warning(f"Skipping unreadable directory {abs_dir}: {e}")
+            continue
+        stack.extend((d, ignore) for d in sorted(subdirs, reverse=True))
+
+
+def scan_directory(root: Path, workers: int = SCAN_WORKERS) -> Iterator[dict]:
+    """
+    Streams file entries under `root`, honoring .gitignore files and IGNORED_DIRS.
+    Top-level subtrees are walked in parallel when `workers` > 1.
+    """
+    root = str(root)
+    ignore = GitIgnore().extend("", os.path.join(root, ".gitignore"))
+    if workers <= 1:
+        yield from _walk(root, "", ignore)
+        return
+
+    subdirs = []
+    with os.scandir(root) as entries:
+        for entry in sorted(entries, key=lambda e: e.name):
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name not in IGNORED_DIRS and not ignore.ignored(entry.name, True):
+                    subdirs.append(entry.name)
+            elif (
+                entry.is_file(follow_symlinks=False)
+                and entry.name != ".git"
+                and not ignore.ignored(entry.name, False)
+            ):
+                yield _entry(entry.name, entry.stat(follow_symlinks=False).st_size)
+
+    # Subtrees are walked in order into bounded buffers and read back in order,
+    # so memory stays flat however large a subtree is
+    stop = threading.Event()
+    channels = [queue.Queue(maxsize=SCAN_BUFFER) for _ in subdirs]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        try:
+            for channel, subdir in zip(channels, subdirs):
+                executor.submit(_walk_into, channel, stop, root, subdir, ignore)
+            for channel in channels:
+                while (item := channel.get()) is not _DONE:
+                    if isinstance(item, Exception):
+                        raise item
+                    yield from item
+        finally:
+            # Lets the walks end early when the consumer stops reading
+            stop.set()
+
+
+def _put(channel: queue.Queue, item, stop: threading.Event) -> bool:
+    """Puts `item` once there is room; returns False if the scan was stopped instead."""
+    while not stop.is_set():
+        try:
+            channel.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _walk_into(channel: queue.Queue, stop: threading.Event, root: str, prefix: str, ignore) -> None:
+    try:
+        batch = []
+        for entry in _walk(root, prefix, ignore):
+            batch.append(entry)
+            if len(batch) == SCAN_BATCH:
+                if not _put(channel, batch, stop):
+                    return
+                batch = []
+        if batch:
+            _put(channel, batch, stop)
+    except Exception as e:
+        _put(channel, e, stop)
+    finally:
+        _put(channel, _DONE, stop)
+
+
+def scan_git_files(root: Path) -> Iterator[dict]:
+    """Streams tracked and untracked-but-not-ignored files as reported by `git ls-files`."""
+    process = subprocess.Popen(
+        ["git", "ls-files", "-z", "--cached", "--others", "--exclude-standard"],
+        cwd=root,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+    buffer = b""
+    completed = False
+    try:
+        for chunk in iter(lambda: process.stdout.read(65536), b""):
+            buffer += chunk
+            *paths, buffer = buffer.split(b"\0")
+            for raw in paths:
+                path = os.fsdecode(raw)
+                if is_ignored_path(path):
+                    continue
+                try:
+                    size = os.lstat(os.path.join(root, path)).st_size
+                except OSError:
+                    continue  # Deleted in the working tree
+                yield _entry(path, size)
+        completed = True
+    finally:
+        process.stdout.close()
+        if not completed:
+            process.kill()
+        if process.wait() != 0 and completed:
+            raise subprocess.CalledProcessError(process.returncode, "git ls-files")
+
+
+def scan_files(root: Path, workers: int = SCAN_WORKERS) -> Iterator[dict]:
+    """Streams the repository's files, using `git ls-files` when `root` is a git checkout."""
+    if (Path(root) / ".git").exists() and shutil.which("git"):
+        return scan_git_files(root)
+    return scan_directory(root, workers)
@@ -1,7 +1,18 @@
 import argparse
 import logging
 from pathlib import Path
-from utils import setup_logging, write_json_file
+from utils import setup_logging, write_json_stream
+from src.file_index import indexed_files
+from src.file_scanner import is_ignored_path, scan_files
+from src.repo_cache import (
+    CLONE_MODES,
+    DEFAULT_CLONE_MODE,
+    clone_options,
+    get_repo_cache,
+    init_sparse_checkout,
+    is_sparse,
+    list_tracked_files,
+)
 import git
 
 
@@ -22,27 +33,45 @@ def get_existing_remote_url(repo_path: Path) -> str | None:
 
 
 def list_files(root: Path) -> list:
-    """Lists all files in a directory recursively."""
+    """Lists all files in a directory recursively, skipping ignored directories."""
     logging.info(f"Scanning for files in {root}...")
-    files = []
-    for path in root.rglob("*"):
-        if path.is_file():
-            files.append(
-                {
-                    "path": str(path.relative_to(root)).replace("\\", "/"),
-                    "size": path.stat().st_size,
-                    "type": path.suffix or "",
-                }
-            )
+    files = list(scan_files(root))
     logging.info(f"Found {len(files)} files.")
     return files
 
 
-def main(url: str, out: str):
-    """Clones a repo if it doesn't exist or if it's the wrong one, then lists files."""
+DEFAULT_REPO_DIR = Path(__file__).parent.parent.parent / "repo"
+
+
+def iter_sparse_files(repo_dir: Path):
+    """
+    Yields every file at HEAD of a sparse checkout, including the ones not materialized.
+    Sizes are unknown without fetching blobs, so they are reported as None.
+    """
+    for path in list_tracked_files(repo_dir):
+        if not is_ignored_path(path):
+            yield {"path": path, "size": None, "type": Path(path).suffix}
+
+
+def main(
+    url: str,
+    out: str,
+    repo_dir: Path | None = None,
+    use_cache: bool = True,
+    clone_mode: str = DEFAULT_CLONE_MODE,
+    use_index: bool = True,
+):
+    """
+    Checks out a repo if it doesn't exist or updates it if it does, then lists files.
+    With `use_cache`, checkouts are worktrees of a shared local mirror of the remote.
+    `clone_mode` is one of CLONE_MODES and controls how much history and content is fetched.
+    With `use_index`, the file list comes from a per-commit index that is updated
+    from `git diff` instead of rescanning the whole checkout.
+    """
     setup_logging("git_details.log")
 
-    repo_dir = Path(__file__).parent.parent.parent / "repo"
+    repo_dir = Path(repo_dir) if repo_dir else DEFAULT_REPO_DIR
+    repo_cache = get_repo_cache() if use_cache else None
 
     try:
         if repo_dir.exists() and repo_dir.is_dir():
@@ -50,26 +79,46 @@ def main(url: str, out: str):
             if existing_url:
                 if existing_url == url:
                     logging.info(f"Repository {url} already exists. Pulling latest changes.")
-                    repo = git.Repo(repo_dir)
-                    repo.remotes.origin.pull()
+                    if repo_cache and repo_cache.owns(repo_dir):
+                        repo_cache.refresh(url, repo_dir, clone_mode)
+                    else:
+                        repo = git.Repo(repo_dir)
+                        repo.remotes.origin.pull()
                 else:
                     logging.error(
                         f"Another repository ({existing_url}) is already cloned."
                     )
                     logging.error(
-                        "Please remove the 'repo' directory to clone a new one."
+                        f"Please remove the '{repo_dir}' directory to clone a new one."
                     )
                     return
             else:
-                logging.error("Directory 'repo' exists but is not a git repository.")
+                logging.error(f"Directory '{repo_dir}' exists but is not a git repository.")
                 return
+        elif repo_cache:
+            logging.info(f"Checking out {url} into {repo_dir} from the mirror cache...")
+            repo_cache.checkout(url, repo_dir, clone_mode)
         else:
-            logging.info(f"Cloning {url} into {repo_dir}...")
-            git.Repo.clone_from(url, str(repo_dir))
+            logging.info(f"Cloning {url} into {repo_dir} ({clone_mode} mode)...")
+            sparse = clone_mode == "sparse"
+            git.Repo.clone_from(
+                url, str(repo_dir), no_checkout=sparse, **clone_options(clone_mode)
+            )
+            if sparse:
+                init_sparse_checkout(repo_dir)
 
-        tree = list_files(repo_dir)
-        write_json_file({"files": tree}, out)
-        logging.info(f"File tree JSON successfully written to {out}")
+        logging.info(f"Scanning for files in {repo_dir}...")
+        if use_index:
+            sparse = is_sparse(repo_dir)
+            tree = indexed_files(
+                url, repo_dir, sparse, full_scan=iter_sparse_files if sparse else scan_files
+            )
+        elif is_sparse(repo_dir):
+            tree = iter_sparse_files(repo_dir)
+        else:
+            tree = scan_files(repo_dir)
+        count = write_json_stream(tree, out, key="files")
+        logging.info(f"File tree JSON with {count} files successfully written to {out}")
 
     except git.exc.GitCommandError as e:
         logging.exception(
@@ -90,5 +139,33 @@ if __name__ == "__main__":
         default="file_tree.json",
         help="Output JSON file name (will be saved in the 'data' directory)",
     )
+    parser.add_argument(
+        "--repo-dir",
+        default=None,
+        help="Directory to clone the repository into (defaults to the project's 'repo' directory)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Clone directly from the remote instead of using the local mirror cache",
+    )
+    parser.add_argument(
+        "--mode",
+        choices=CLONE_MODES,
+        default=DEFAULT_CLONE_MODE,
+        help="How much of the repository to fetch: full, shallow, blobless or sparse",
+    )
+    parser.add_argument(
+        "--no-index",
+        action="store_true",
+        help="Rescan the checkout instead of using the per-commit file index",
+    )
     args = parser.parse_args()
-    main(args.url, args.out)
+    main(
+        args.url,
+        args.out,
+        args.repo_dir,
+        use_cache=not args.no_cache,
+        clone_mode=args.mode,
+        use_index=not args.no_index,
+    )
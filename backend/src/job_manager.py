@@ -0,0 +1,264 @@
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from src.llm_scheduler import is_retryable
+
+# Events kept per job for late subscribers to replay.
+EVENT_BUFFER_SIZE = int(os.environ.get("FRONTFREND_EVENT_BUFFER", "500"))
+# Attempts per job, and the delay before the first retry (doubled after each)
+JOB_ATTEMPTS = int(os.environ.get("FRONTFREND_JOB_ATTEMPTS", "3"))
+RETRY_DELAY_SECONDS = float(os.environ.get("FRONTFREND_RETRY_DELAY", "5"))
+
+
+class JobQueueFullError(Exception):
+    """Raised when a job is submitted while the pending queue is full."""
+
+
+def is_transient(error: Exception) -> bool:
+    """True for failures a later attempt may not hit: outages, rate limits, timeouts."""
+    return is_retryable(error) or isinstance(error, (ConnectionError, TimeoutError))
+
+
+class EventLog:
+    """
+    A bounded ring buffer of job events with increasing sequence numbers. Readers
+    keep their own cursor (the last sequence number they saw), so any number of
+    subscribers can follow or replay the stream without consuming it.
+    """
+
+    def __init__(self, maxlen: int = EVENT_BUFFER_SIZE):
+        self._events = deque(maxlen=maxlen)
+        self._seq = 0
+        self._closed = False
+        self._changed = threading.Condition()
+
+    def publish(self, event_type: str, **data) -> dict:
+        with self._changed:
+            self._seq += 1
+            event = {"seq": self._seq, "type": event_type, "time": time.time(), **data}
+            self._events.append(event)
+            self._changed.notify_all()
+        return event
+
+    def since(self, cursor: int = 0) -> list[dict]:
+        """Returns the buffered events after `cursor`; older ones may have been dropped."""
+        with self._changed:
+            return [event for event in self._events if event["seq"] > cursor]
+
+    def wait(self, cursor: int, timeout: float | None = None) -> list[dict]:
+        """Blocks until there are events after `cursor`, the log closes or `timeout` passes."""
+        with self._changed:
+            self._changed.wait_for(
+                lambda: self._seq > cursor or self._closed, timeout=timeout
+            )
+            return [event for event in self._events if event["seq"] > cursor]
+
+    def close(self) -> None:
+        """Marks the stream as complete and wakes every waiting subscriber."""
+        with self._changed:
+            self._closed = True
+            self._changed.notify_all()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    @property
+    def last_seq(self) -> int:
+        return self._seq
+
+
+class Job:
+    """A single workflow run with its own status, event stream and results."""
+
+    def __init__(
+        self, repo_url: str, user_preferences: dict, options: dict | None = None
+    ):
+        self.id = uuid.uuid4().hex
+        self.repo_url = repo_url
+        self.user_preferences = user_preferences
+        self.options = options or {}
+        self.status = "queued"
+        self.message = ""
+        self.results = {}
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.events = EventLog()
+        self.workspace = None
+
+    def save(self) -> None:
+        """Persists the job's status, message, results and timestamps; a no-op in memory."""
+
+    def emit(self, event_type: str, **data) -> dict:
+        """Publishes a structured event to the job's stream."""
+        return self.events.publish(event_type, **data)
+
+    def post(self, message: str) -> None:
+        """Publishes a plain progress message to the job's stream."""
+        self.emit("message", message=message)
+
+    def messages_since(self, cursor: int = 0) -> list[str]:
+        """Returns the messages of the events after `cursor`."""
+        return [e["message"] for e in self.events.since(cursor) if e.get("message")]
+
+    def release(self) -> None:
+        """Removes the job's workspace from disk, if it has one."""
+        if self.workspace is not None:
+            try:
+                self.workspace.cleanup()
+            except OSError as e:
+                logging.warning(f"Could not remove workspace for job {self.id}: {e}")
+            self.workspace = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("completed", "error")
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "repo_url": self.repo_url,
+            "status": self.status,
+            "message": self.message,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+def run_job(
+    job: Job, runner: Callable[..., dict | None], max_attempts: int = JOB_ATTEMPTS
+) -> None:
+    """
+    Runs `runner(job, **job.options)` and records the outcome on the job; its
+    return value becomes the job's results. An attempt that fails with a
+    transient error is retried up to `max_attempts` times in the same workspace,
+    where the workflow resumes from its checkpoints. A failed job keeps its
+    workspace, so a later run can resume it too. The stream ends with a "done"
+    event.
+    """
+    job.status = "processing"
+    job.started_at = time.time()
+    job.save()
+    job.emit("status", status=job.status)
+    try:
+        for attempt in range(1, max_attempts + 1):
+            try:
+                job.results = runner(job, **job.options) or {}
+                break
+            except Exception as e:
+                if attempt >= max_attempts or not is_transient(e):
+                    raise
+                delay = RETRY_DELAY_SECONDS * 2 ** (attempt - 1)
+                logging.warning(
+                    f"Attempt {attempt} of job {job.id} failed: {e}; retrying in {delay:.0f}s"
+                )
+                job.emit(
+                    "retrying",
+                    message=f"Attempt {attempt} failed: {e}. Resuming from the last checkpoint in {delay:.0f}s.",
+                    attempt=attempt,
+                )
+                time.sleep(delay)
+        job.message = job.results.get("message", "Workflow finished successfully.")
+        job.status = "completed"
+        logging.info(f"Job {job.id} completed successfully.")
+    except Exception as e:
+        logging.error(f"Error during job {job.id}: {e}", exc_info=True)
+        job.message = str(e)
+        job.results = {"status": "error", "message": str(e)}
+        job.status = "error"
+        job.post(f"ERROR: {e}")
+    finally:
+        job.finished_at = time.time()
+        job.save()
+        # Terminal event; subscribers stop listening after it
+        job.emit("done", status=job.status, message=job.message)
+        job.events.close()
+
+
+class JobManager:
+    """Runs workflow jobs on a bounded in-process worker pool and keeps per-job state."""
+
+    def __init__(
+        self,
+        runner: Callable[..., dict | None],
+        max_workers: int = 4,
+        max_pending: int = 32,
+        max_jobs: int = 100,
+    ):
+        self.runner = runner
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.max_jobs = max_jobs
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="workflow"
+        )
+        self._jobs: dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, repo_url: str, user_preferences: dict, **options) -> Job:
+        """
+        Queues a new job. The runner is called as `runner(job, **options)` on a
+        worker thread and its return value becomes the job's results.
+        """
+        job = Job(repo_url, user_preferences, options)
+        with self._lock:
+            if self._pending_count() >= self.max_pending:
+                raise JobQueueFullError(
+                    f"Too many pending jobs ({self.max_pending}). Try again later."
+                )
+            self._jobs[job.id] = job
+            self._evict_finished()
+        self._executor.submit(run_job, job, self.runner)
+        logging.info(f"Queued job {job.id} for repo: {repo_url}")
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def latest(self) -> Job | None:
+        """Returns the most recently submitted job, if any."""
+        with self._lock:
+            if not self._jobs:
+                return None
+            return max(self._jobs.values(), key=lambda j: j.created_at)
+
+    def list_jobs(self) -> list[Job]:
+        with self._lock:
+            return sorted(self._jobs.values(), key=lambda j: j.created_at)
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return self._pending_count()
+
+    def _pending_count(self) -> int:
+        return sum(1 for job in self._jobs.values() if job.status == "queued")
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stops the worker pool and removes the workspaces of finished jobs."""
+        self._executor.shutdown(wait=wait)
+        with self._lock:
+            for job in self._jobs.values():
+                if job.finished:
+                    job.release()
+
+    def _evict_finished(self) -> None:
+        """Drops the oldest finished jobs once more than `max_jobs` are tracked."""
+        excess = len(self._jobs) - self.max_jobs
+        if excess <= 0:
+            return
+        finished = sorted(
+            (job for job in self._jobs.values() if job.finished),
+            key=lambda j: j.created_at,
+        )
+        for job in finished[:excess]:
+            job.release()
+            del self._jobs[job.id]
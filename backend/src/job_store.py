@@ -0,0 +1,333 @@
+import json
+import logging
+import os
+import sqlite3
+import time
+import uuid
+from contextlib import closing, contextmanager
+from pathlib import Path
+
+from src.job_manager import EVENT_BUFFER_SIZE, JOB_ATTEMPTS, Job, JobQueueFullError
+from utils.workspace import Workspace
+
+JOB_STORE_PATH = Path(
+    os.environ.get(
+        "FRONTFREND_JOB_STORE",
+        Path(__file__).parent.parent.parent / "data" / "jobs.sqlite",
+    )
+)
+# How often readers in other processes look for new events.
+POLL_SECONDS = 0.5
+# A claimed job whose worker has not renewed its lease for this long is handed
+# to another worker, which resumes it from the workflow's checkpoints.
+LEASE_SECONDS = float(os.environ.get("FRONTFREND_JOB_LEASE", "60"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    repo_url TEXT NOT NULL,
+    user_preferences TEXT NOT NULL,
+    options TEXT NOT NULL,
+    status TEXT NOT NULL,
+    message TEXT NOT NULL DEFAULT '',
+    results TEXT NOT NULL DEFAULT '{}',
+    workspace TEXT,
+    worker TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_until REAL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at);
+CREATE TABLE IF NOT EXISTS events (
+    job_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (job_id, seq)
+);
+"""
+
+
+LOST_MESSAGE = "The job's worker stopped responding too many times."
+
+
+class StoredEventLog:
+    """The EventLog interface over a job's rows in the store, for readers in any process."""
+
+    def __init__(self, store: "JobStore", job_id: str):
+        self._store = store
+        self._job_id = job_id
+
+    def publish(self, event_type: str, **data) -> dict:
+        return self._store.publish(self._job_id, event_type, data)
+
+    def since(self, cursor: int = 0) -> list[dict]:
+        return self._store.events_since(self._job_id, cursor)
+
+    def wait(self, cursor: int, timeout: float | None = None) -> list[dict]:
+        """Polls until there are events after `cursor`, the stream ended or `timeout` passes."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            events = self.since(cursor)
+            if events or self.closed:
+                return events
+            if deadline is not None and time.monotonic() >= deadline:
+                return []
+            time.sleep(POLL_SECONDS)
+
+    def close(self) -> None:
+        """Nothing to do: the stored "done" event already marks the end of the stream."""
+
+    @property
+    def closed(self) -> bool:
+        return self._store.has_event(self._job_id, "done")
+
+    @property
+    def last_seq(self) -> int:
+        return self._store.last_seq(self._job_id)
+
+
+class StoredJob(Job):
+    """A job whose state lives in a JobStore, so API and worker processes share it."""
+
+    def __init__(self, store: "JobStore", row: sqlite3.Row):
+        self._store = store
+        self.id = row["id"]
+        self.repo_url = row["repo_url"]
+        self.user_preferences = json.loads(row["user_preferences"])
+        self.options = json.loads(row["options"])
+        self.status = row["status"]
+        self.message = row["message"]
+        self.results = json.loads(row["results"])
+        self.created_at = row["created_at"]
+        self.started_at = row["started_at"]
+        self.finished_at = row["finished_at"]
+        self._workspace_root = row["workspace"]
+        self.events = StoredEventLog(store, self.id)
+
+    @property
+    def workspace(self) -> Workspace | None:
+        if self._workspace_root is None:
+            return None
+        root = Path(self._workspace_root)
+        return Workspace(root.name, root.parent)
+
+    @workspace.setter
+    def workspace(self, workspace: Workspace | None) -> None:
+        self._workspace_root = None if workspace is None else str(workspace.root)
+        self._store.save_workspace(self.id, self._workspace_root)
+
+    def save(self) -> None:
+        self._store.save(self)
+
+
+class JobStore:
+    """
+    Keeps jobs and their events in SQLite, so API processes can queue jobs and
+    answer status, event and preview requests while worker processes (see
+    worker.py) claim and run them. Offers the JobManager interface to the API.
+    """
+
+    def __init__(self, db_path: Path = JOB_STORE_PATH, max_pending: int = 32, max_jobs: int = 100):
+        self.db_path = Path(db_path)
+        self.max_pending = max_pending
+        self.max_jobs = max_jobs
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.executescript(SCHEMA)
+            # Stores created before leases existed lack their columns
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if "attempts" not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+            if "lease_until" not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN lease_until REAL")
+
+    def _connect(self) -> sqlite3.Connection:
+        # Autocommit mode; writers that read first open their own IMMEDIATE transaction
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        """An IMMEDIATE transaction, so read-then-write sequences are not interleaved."""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.close()
+
+    def submit(self, repo_url: str, user_preferences: dict, **options) -> StoredJob:
+        """Queues a new job for the workers; raises JobQueueFullError when too many are waiting."""
+        job_id = uuid.uuid4().hex
+        with self._transaction() as conn:
+            pending = conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+            if pending >= self.max_pending:
+                raise JobQueueFullError(
+                    f"Too many pending jobs ({self.max_pending}). Try again later."
+                )
+            conn.execute(
+                "INSERT INTO jobs (id, repo_url, user_preferences, options, status, created_at) "
+                "VALUES (?, ?, ?, ?, 'queued', ?)",
+                (job_id, repo_url, json.dumps(user_preferences), json.dumps(options), time.time()),
+            )
+        self._evict_finished()
+        logging.info(f"Queued job {job_id} for repo: {repo_url}")
+        return self.get(job_id)
+
+    def _load(self, query: str, params: tuple = ()) -> list[StoredJob]:
+        with closing(self._connect()) as conn:
+            return [StoredJob(self, row) for row in conn.execute(query, params).fetchall()]
+
+    def get(self, job_id: str) -> StoredJob | None:
+        jobs = self._load("SELECT * FROM jobs WHERE id = ?", (job_id,))
+        return jobs[0] if jobs else None
+
+    def latest(self) -> StoredJob | None:
+        """Returns the most recently submitted job, if any."""
+        jobs = self._load("SELECT * FROM jobs ORDER BY created_at DESC LIMIT 1")
+        return jobs[0] if jobs else None
+
+    def list_jobs(self) -> list[StoredJob]:
+        return self._load("SELECT * FROM jobs ORDER BY created_at")
+
+    def pending_count(self) -> int:
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+
+    def claim(self, worker: str, lease: float = LEASE_SECONDS) -> StoredJob | None:
+        """
+        Leases the oldest queued job to `worker` for `lease` seconds. A job whose
+        lease expired (its worker died) is claimed again, until it has used up
+        its attempts and is failed instead.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            lost = [
+                row["id"]
+                for row in conn.execute(
+                    "SELECT id FROM jobs WHERE status = 'processing' AND lease_until < ? "
+                    "AND attempts >= ?",
+                    (now, JOB_ATTEMPTS),
+                ).fetchall()
+            ]
+            conn.executemany(
+                "UPDATE jobs SET status = 'error', message = ?, finished_at = ? WHERE id = ?",
+                [(LOST_MESSAGE, now, job_id) for job_id in lost],
+            )
+            row = conn.execute(
+                "SELECT id, status FROM jobs WHERE status = 'queued' "
+                "OR (status = 'processing' AND lease_until < ?) ORDER BY created_at LIMIT 1",
+                (now,),
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE jobs SET status = 'processing', worker = ?, attempts = attempts + 1, "
+                    "lease_until = ?, started_at = COALESCE(started_at, ?) WHERE id = ?",
+                    (worker, now + lease, now, row["id"]),
+                )
+        for job_id in lost:
+            self.publish(job_id, "done", {"status": "error", "message": LOST_MESSAGE})
+        if row is None:
+            return None
+        if row["status"] == "processing":
+            logging.warning(f"Job {row['id']} lost its worker; {worker} resumes it")
+            self.publish(
+                row["id"],
+                "message",
+                {"message": "The worker running this job stopped; resuming from the last checkpoint."},
+            )
+        return self.get(row["id"])
+
+    def renew(self, job_ids: list[str], worker: str, lease: float = LEASE_SECONDS) -> None:
+        """Extends the leases `worker` holds on the running jobs `job_ids`."""
+        with closing(self._connect()) as conn:
+            conn.executemany(
+                "UPDATE jobs SET lease_until = ? WHERE id = ? AND worker = ? "
+                "AND status = 'processing'",
+                [(time.time() + lease, job_id, worker) for job_id in job_ids],
+            )
+
+    def save(self, job: StoredJob) -> None:
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, message = ?, results = ?, started_at = ?, finished_at = ? "
+                "WHERE id = ?",
+                (
+                    job.status,
+                    job.message,
+                    json.dumps(job.results, separators=(",", ":")),
+                    job.started_at,
+                    job.finished_at,
+                    job.id,
+                ),
+            )
+
+    def save_workspace(self, job_id: str, root: str | None) -> None:
+        with closing(self._connect()) as conn:
+            conn.execute("UPDATE jobs SET workspace = ? WHERE id = ?", (root, job_id))
+
+    def publish(self, job_id: str, event_type: str, data: dict) -> dict:
+        with self._transaction() as conn:
+            seq = conn.execute(
+                "SELECT COALESCE(MAX(seq), 0) + 1 FROM events WHERE job_id = ?", (job_id,)
+            ).fetchone()[0]
+            event = {"seq": seq, "type": event_type, "time": time.time(), **data}
+            conn.execute(
+                "INSERT INTO events (job_id, seq, type, data) VALUES (?, ?, ?, ?)",
+                (job_id, seq, event_type, json.dumps(event)),
+            )
+            # Keep a bounded tail, like the in-memory EventLog
+            conn.execute(
+                "DELETE FROM events WHERE job_id = ? AND seq <= ?", (job_id, seq - EVENT_BUFFER_SIZE)
+            )
+        return event
+
+    def events_since(self, job_id: str, cursor: int = 0) -> list[dict]:
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT data FROM events WHERE job_id = ? AND seq > ? ORDER BY seq", (job_id, cursor)
+            ).fetchall()
+        return [json.loads(row["data"]) for row in rows]
+
+    def has_event(self, job_id: str, event_type: str) -> bool:
+        with closing(self._connect()) as conn:
+            return (
+                conn.execute(
+                    "SELECT 1 FROM events WHERE job_id = ? AND type = ? LIMIT 1", (job_id, event_type)
+                ).fetchone()
+                is not None
+            )
+
+    def last_seq(self, job_id: str) -> int:
+        with closing(self._connect()) as conn:
+            return conn.execute(
+                "SELECT COALESCE(MAX(seq), 0) FROM events WHERE job_id = ?", (job_id,)
+            ).fetchone()[0]
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Nothing to stop: jobs run in the worker processes."""
+
+    def _evict_finished(self) -> None:
+        """Drops the oldest finished jobs, with their events and workspaces, beyond `max_jobs`."""
+        with closing(self._connect()) as conn:
+            excess = conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0] - self.max_jobs
+        if excess <= 0:
+            return
+        for job in self._load(
+            "SELECT * FROM jobs WHERE status IN ('completed', 'error') ORDER BY created_at LIMIT ?",
+            (excess,),
+        ):
+            job.release()
+            with closing(self._connect()) as conn:
+                conn.execute("DELETE FROM events WHERE job_id = ?", (job.id,))
+                conn.execute("DELETE FROM jobs WHERE id = ?", (job.id,))
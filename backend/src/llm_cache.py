@@ -0,0 +1,327 @@
+import copy
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from src.llm_scheduler import DEFAULT_PRIORITY, estimate_tokens, get_llm_scheduler
+from utils import telemetry
+
+if TYPE_CHECKING:
+    from crewai import LLM
+
+CACHE_PATH = Path(
+    os.environ.get(
+        "FRONTFREND_LLM_CACHE",
+        Path(__file__).parent.parent.parent / "cache" / "llm" / "responses.sqlite",
+    )
+)
+# Total size of cached responses before least recently used ones are evicted.
+CACHE_MAX_BYTES = int(os.environ.get("FRONTFREND_LLM_CACHE_MAX_BYTES", 256 * 1024**2))
+# Responses older than this are treated as misses and eventually evicted.
+CACHE_TTL_SECONDS = int(os.environ.get("FRONTFREND_LLM_CACHE_TTL", 7 * 24 * 3600))
+# Set FRONTFREND_LLM_CACHE_BYPASS=1 to always call the model (results are still stored).
+CACHE_BYPASS = os.environ.get("FRONTFREND_LLM_CACHE_BYPASS", "") not in ("", "0", "false")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    response TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used);
+"""
+
+
+def _json_default(value):
+    if hasattr(value, "model_dump"):
+        return value.model_dump()
+    return str(value)
+
+
+def cache_key(
+    model: str, temperature, messages, tools=None, fingerprint: str = "", root: Path | None = None
+) -> str:
+    """
+    Hashes everything that determines a completion into a cache key. Occurrences of
+    `root` are replaced by a placeholder so that the same repository checked out
+    into different workspaces shares its entries.
+    """
+    payload = json.dumps(
+        {
+            "model": model,
+            "temperature": temperature,
+            "messages": messages,
+            "tools": tools or [],
+            "fingerprint": fingerprint,
+        },
+        sort_keys=True,
+        default=_json_default,
+    )
+    if root is not None:
+        payload = payload.replace(json.dumps(str(root))[1:-1], "<repo>")
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def fingerprint_files(root: Path, paths, read=None) -> str:
+    """
+    Returns a hash over the paths and contents of the given files under `root`.
+    With `read`, the contents come from `read(path)` (an overlay's, say) instead
+    of the disk; None means the file is missing.
+    """
+    digest = hashlib.sha256()
+    for path in sorted(str(p) for p in paths):
+        digest.update(str(path).encode("utf-8") + b"\0")
+        if read is not None:
+            content = read(path)
+            digest.update(content.encode("utf-8") if content is not None else b"<missing>")
+            digest.update(b"\0")
+            continue
+        try:
+            with open(Path(root) / path, "rb") as f:
+                for chunk in iter(lambda: f.read(65536), b""):
+                    digest.update(chunk)
+        except OSError:
+            digest.update(b"<missing>")
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _encode_response(response) -> str | None:
+    """Serializes text answers and native tool call lists; anything else is not cached."""
+    if isinstance(response, str):
+        return json.dumps({"text": response})
+    if isinstance(response, list) and response:
+        calls = []
+        for call in response:
+            if hasattr(call, "model_dump"):
+                call = call.model_dump()
+            if not isinstance(call, dict):
+                return None
+            calls.append(call)
+        return json.dumps({"tool_calls": calls}, default=_json_default)
+    return None
+
+
+def _decode_response(payload: str):
+    data = json.loads(payload)
+    return data["text"] if "text" in data else data["tool_calls"]
+
+
+class LLMCache:
+    """A persistent, size-bounded LRU cache of LLM responses with a TTL."""
+
+    def __init__(
+        self,
+        db_path: Path = CACHE_PATH,
+        max_bytes: int = CACHE_MAX_BYTES,
+        ttl_seconds: int = CACHE_TTL_SECONDS,
+    ):
+        self.db_path = Path(db_path)
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "expired": 0, "bypassed": 0, "stores": 0, "evictions": 0}
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def count(self, name: str, amount: int = 1) -> None:
+        """Adds `amount` to the statistic `name` reported by `stats`."""
+        with self._lock:
+            self._stats[name] += amount
+
+    def get(self, key: str):
+        """Returns the cached response for `key`, or None on a miss."""
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.count("misses")
+                return None
+            if now - row[1] > self.ttl_seconds:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.count("expired")
+                self.count("misses")
+                return None
+            conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+        self.count("hits")
+        return _decode_response(row[0])
+
+    def put(self, key: str, model: str, response) -> bool:
+        """Stores a response; returns False if it cannot be cached."""
+        payload = _encode_response(response)
+        if payload is None:
+            return False
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, payload, len(payload), now, now),
+            )
+        self.count("stores")
+        self.evict()
+        return True
+
+    def evict(self) -> int:
+        """Drops expired entries, then least recently used ones until under `max_bytes`."""
+        evicted = 0
+        with self._connect() as conn:
+            evicted += conn.execute(
+                "DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl_seconds,)
+            ).rowcount
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if total > self.max_bytes:
+                for key, size in conn.execute(
+                    "SELECT key, size FROM responses ORDER BY last_used"
+                ).fetchall():
+                    if total <= self.max_bytes:
+                        break
+                    conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    total -= size
+                    evicted += 1
+        if evicted:
+            self.count("evictions", evicted)
+        return evicted
+
+    def clear(self) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM responses")
+
+    def stats(self) -> dict:
+        """Returns hit/miss counters for this process plus the current size on disk."""
+        with self._connect() as conn:
+            entries, size = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats.update(
+            entries=entries,
+            bytes=size,
+            max_bytes=self.max_bytes,
+            hit_rate=round(stats["hits"] / lookups, 3) if lookups else 0.0,
+        )
+        return stats
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> LLMCache:
+    """Returns the process-wide LLM response cache."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = LLMCache()
+        return _default_cache
+
+
+_base_llms = {}
+_base_llms_lock = threading.Lock()
+
+
+def get_base_llm(config) -> "LLM":
+    """
+    Returns the process-wide LLM for an LLMConfig's model settings. Building one
+    validates the provider and creates its SDK client with its connection pool,
+    so it happens once per model; crews use copies of it (see `create_llm`),
+    which share the client and keep its connections alive between calls.
+    """
+    # crewai takes seconds to import, so the API and cache statistics never load it
+    from crewai import LLM
+
+    key = (config.model_name, config.temperature, config.base_url)
+    with _base_llms_lock:
+        if key not in _base_llms:
+            _base_llms[key] = LLM(
+                model=config.model_name, temperature=config.temperature, base_url=config.base_url
+            )
+        return _base_llms[key]
+
+
+def create_llm(
+    config,
+    fingerprint: str = "",
+    root: Path | None = None,
+    use_cache: bool = True,
+    cache: LLMCache | None = None,
+    priority: str = DEFAULT_PRIORITY,
+) -> "LLM":
+    """
+    Builds a crewai LLM from an LLMConfig whose calls go through the response cache.
+    `fingerprint` identifies the input files the prompts are about, so that edits to
+    them invalidate earlier answers even when the rendered prompt looks the same, and
+    `root` is the checkout directory whose path is left out of the key.
+    With `use_cache` False (or FRONTFREND_LLM_CACHE_BYPASS set) the model is always
+    called, but fresh responses are still stored for later runs.
+    Calls that reach the model are admitted by the process-wide LLMScheduler
+    at `priority` ("interactive" or "batch").
+    The LLM is a shallow copy of the pooled one for `config` (see `get_base_llm`).
+    """
+    base = get_base_llm(config)
+    # crewai's LLM is a pydantic model; fall back to a plain shallow copy should it stop being one
+    llm = base.model_copy() if hasattr(base, "model_copy") else copy.copy(base)
+    # The copies share the client, but not per-instance state such as token usage
+    private = getattr(llm, "__pydantic_private__", None) or {}
+    for name, value in private.items():
+        if isinstance(value, (dict, list)):
+            private[name] = copy.deepcopy(value)
+    cache = cache or get_llm_cache()
+    bypass = CACHE_BYPASS or not use_cache
+    scheduler = get_llm_scheduler()
+    llm_call = llm.call
+
+    def call(messages, **kwargs):
+        return scheduler.submit(lambda: llm_call(messages, **kwargs), messages, priority)
+
+    def cached_call(messages, tools=None, callbacks=None, available_functions=None, **kwargs):
+        with telemetry.span("llm.call", model=config.model_name, priority=priority) as span:
+            telemetry.add("tokens_in", estimate_tokens(messages))
+            # Calls that run functions inside the LLM or parse into a model have side
+            # effects or non-serializable results; they always go to the model.
+            if available_functions or kwargs.get("response_model") is not None:
+                span.set(cache="uncacheable")
+                telemetry.add("model_calls")
+                return call(messages, tools=tools, callbacks=callbacks, available_functions=available_functions, **kwargs)
+
+            key = cache_key(config.model_name, config.temperature, messages, tools, fingerprint, root)
+            if bypass:
+                cache.count("bypassed")
+                span.set(cache="bypassed")
+            else:
+                cached = cache.get(key)
+                if cached is not None:
+                    logging.info(f"LLM cache hit for {config.model_name} ({key[:12]})")
+                    span.set(cache="hit")
+                    telemetry.add("cache_hits")
+                    return cached
+                span.set(cache="miss")
+
+            telemetry.add("model_calls")
+            response = call(messages, tools=tools, callbacks=callbacks, available_functions=available_functions, **kwargs)
+            if isinstance(response, str):
+                telemetry.add("tokens_out", estimate_tokens(response))
+            cache.put(key, config.model_name, response)
+            return response
+
+    # LLM is a pydantic model, so the bound method is replaced on the instance directly
+    object.__setattr__(llm, "call", cached_call)
+    return llm
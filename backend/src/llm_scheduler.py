@@ -0,0 +1,225 @@
+import heapq
+import itertools
+import json
+import logging
+import os
+import random
+import threading
+import time
+from typing import Callable
+
+from utils import telemetry
+
+# Provider quotas shared by every crew and job in the process; 0 disables a limit.
+REQUESTS_PER_MINUTE = int(os.environ.get("FRONTFREND_LLM_RPM", "60"))
+TOKENS_PER_MINUTE = int(os.environ.get("FRONTFREND_LLM_TPM", "1000000"))
+MAX_RETRIES = int(os.environ.get("FRONTFREND_LLM_MAX_RETRIES", "5"))
+BACKOFF_BASE_SECONDS = 2.0
+BACKOFF_MAX_SECONDS = 60.0
+
+# Lower values are served first.
+PRIORITIES = {"interactive": 0, "batch": 1}
+DEFAULT_PRIORITY = "interactive"
+
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+RETRYABLE_ERRORS = {
+    "RateLimitError",
+    "InternalServerError",
+    "ServiceUnavailableError",
+    "APIConnectionError",
+    "Timeout",
+    "APITimeoutError",
+}
+
+
+def estimate_tokens(messages) -> int:
+    """A rough, model independent token estimate (about four characters per token)."""
+    if isinstance(messages, str):
+        return max(1, len(messages) // 4)
+    return max(1, len(json.dumps(messages, default=str)) // 4)
+
+
+def is_retryable(error: Exception) -> bool:
+    """True for rate limiting and transient server errors, whichever client raised them."""
+    status = getattr(error, "status_code", None) or getattr(error, "code", None)
+    if status in RETRYABLE_STATUS_CODES:
+        return True
+    return any(cls.__name__ in RETRYABLE_ERRORS for cls in type(error).__mro__)
+
+
+def _retry_after(error: Exception) -> float | None:
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """A continuously refilled bucket holding one minute's worth of a quota."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = per_minute
+        self.level = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` can be taken; requests above capacity wait for a full bucket."""
+        if not self.capacity:
+            return 0.0
+        self._refill()
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount: float) -> None:
+        # May go negative when a response turns out larger than estimated
+        if self.capacity:
+            self._refill()
+            self.level -= amount
+
+
+class LLMScheduler:
+    """
+    Admits LLM calls from every crew under shared requests-per-minute and
+    tokens-per-minute quotas. Waiting calls are served by priority, then in
+    arrival order; rate limiting and transient errors are retried with jittered
+    exponential backoff, and a 429 pauses all callers, not just the one that hit it.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: int = REQUESTS_PER_MINUTE,
+        tokens_per_minute: int = TOKENS_PER_MINUTE,
+        max_retries: int = MAX_RETRIES,
+    ):
+        self.max_retries = max_retries
+        self._requests = TokenBucket(requests_per_minute)
+        self._tokens = TokenBucket(tokens_per_minute)
+        self._changed = threading.Condition()
+        self._waiting = []
+        self._tickets = itertools.count()
+        self._paused_until = 0.0
+        self._in_flight = 0
+        self._stats = {"calls": 0, "retries": 0, "throttled": 0, "failures": 0}
+
+    def _acquire(self, tokens: int, priority: str) -> None:
+        ticket = (PRIORITIES.get(priority, PRIORITIES[DEFAULT_PRIORITY]), next(self._tickets))
+        with self._changed:
+            heapq.heappush(self._waiting, ticket)
+            try:
+                while True:
+                    if self._waiting[0] != ticket:
+                        self._changed.wait()
+                        continue
+                    wait = max(
+                        self._paused_until - time.monotonic(),
+                        self._requests.wait_time(1),
+                        self._tokens.wait_time(tokens),
+                    )
+                    if wait <= 0:
+                        break
+                    self._changed.wait(timeout=wait)
+                self._requests.take(1)
+                self._tokens.take(tokens)
+                self._in_flight += 1
+            finally:
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+                self._changed.notify_all()
+
+    def _release(self, extra_tokens: int) -> None:
+        with self._changed:
+            self._in_flight -= 1
+            self._tokens.take(extra_tokens)
+            self._changed.notify_all()
+
+    def _pause(self, seconds: float) -> None:
+        with self._changed:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def _count(self, name: str) -> None:
+        with self._changed:
+            self._stats[name] += 1
+
+    def submit(self, call: Callable[[], object], messages, priority: str = DEFAULT_PRIORITY):
+        """Runs `call` once the quotas admit a request for `messages`, retrying transient failures."""
+        estimated = estimate_tokens(messages)
+        for attempt in range(self.max_retries + 1):
+            waiting_since = time.monotonic()
+            self._acquire(estimated, priority)
+            telemetry.add("queued_seconds", time.monotonic() - waiting_since)
+            response = None
+            try:
+                response = call()
+                self._count("calls")
+                return response
+            except Exception as e:
+                if not is_retryable(e) or attempt == self.max_retries:
+                    self._count("failures")
+                    raise
+                delay = random.uniform(
+                    0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2**attempt)
+                )
+                retry_after = _retry_after(e)
+                if retry_after is not None:
+                    delay = max(delay, retry_after)
+                if getattr(e, "status_code", None) == 429 or type(e).__name__ == "RateLimitError":
+                    self._count("throttled")
+                    self._pause(delay)
+                self._count("retries")
+                telemetry.add("retries")
+                logging.warning(
+                    f"LLM call failed ({type(e).__name__}); retry {attempt + 1}/{self.max_retries} "
+                    f"in {delay:.1f}s"
+                )
+            finally:
+                # Output tokens count against the quota once they are known
+                self._release(estimate_tokens(response) if isinstance(response, str) else 0)
+            time.sleep(delay)
+
+    def stats(self) -> dict:
+        """Returns queue depth per priority, calls in flight and retry counters."""
+        with self._changed:
+            depth = {name: 0 for name in PRIORITIES}
+            names = {level: name for name, level in PRIORITIES.items()}
+            for level, _ticket in self._waiting:
+                depth[names[level]] += 1
+            return {
+                "queued": len(self._waiting),
+                "queued_by_priority": depth,
+                "in_flight": self._in_flight,
+                "paused_for": round(max(0.0, self._paused_until - time.monotonic()), 1),
+                "requests_per_minute": self._requests.capacity,
+                "tokens_per_minute": self._tokens.capacity,
+                **self._stats,
+            }
+
+
+_default_scheduler = None
+_default_scheduler_lock = threading.Lock()
+
+
+def get_llm_scheduler() -> LLMScheduler:
+    """Returns the process-wide LLM scheduler."""
+    global _default_scheduler
+    with _default_scheduler_lock:
+        if _default_scheduler is None:
+            _default_scheduler = LLMScheduler()
+            telemetry.register_gauge(
+                "frontfrend_llm_queued_calls",
+                "Model calls waiting for the scheduler's quotas.",
+                lambda: _default_scheduler.stats()["queued"],
+            )
+            telemetry.register_gauge(
+                "frontfrend_llm_in_flight_calls",
+                "Model calls running.",
+                lambda: _default_scheduler.stats()["in_flight"],
+            )
+        return _default_scheduler
@@ -0,0 +1,149 @@
+import difflib
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+# Contents larger than this are kept in temp files instead of memory.
+SPILL_BYTES = int(os.environ.get("FRONTFREND_OVERLAY_SPILL_BYTES", str(1024 * 1024)))
+
+
+def replace_atomically(full_path: Path, content: str) -> None:
+    """Writes `content` to a temp file next to `full_path` and renames it into place."""
+    full_path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=full_path.parent, prefix=f".{full_path.name}.")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(content)
+        if full_path.exists():
+            os.chmod(temp_path, full_path.stat().st_mode)
+        os.replace(temp_path, full_path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+class Overlay:
+    """
+    A copy-on-write view of a checkout. Reads fall through to disk once per path,
+    writes stay in the overlay, and both the original and the modified content of
+    every written path are kept (in temp files when large). Changes reach the
+    worktree only through `flush`, or a patch file through `export_patch`;
+    `discard` drops them. `on_write(content)` sees every version written, even
+    one a later write replaces.
+    """
+
+    def __init__(
+        self, root: Path, on_missing=None, spill_bytes: int = SPILL_BYTES, on_write=None
+    ):
+        self.root = Path(root).resolve()
+        self.on_missing = on_missing
+        self.on_write = on_write
+        self.spill_bytes = spill_bytes
+        self._lock = threading.RLock()
+        # path -> str, Path of a spilled copy, or None for a file that does not exist
+        self._originals = {}
+        self._modified = {}
+        self._order = []
+        self._spill_dir = None
+
+    def _store(self, content: str | None):
+        if content is None or len(content) < self.spill_bytes:
+            return content
+        if self._spill_dir is None:
+            self._spill_dir = tempfile.TemporaryDirectory(prefix="frontfrend-overlay-")
+        fd, spill_path = tempfile.mkstemp(dir=self._spill_dir.name)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(content)
+        return Path(spill_path)
+
+    @staticmethod
+    def _load(stored) -> str | None:
+        if isinstance(stored, Path):
+            return stored.read_text(encoding="utf-8")
+        return stored
+
+    def _base(self, path: str) -> str | None:
+        """Returns the content `path` has in the checkout, caching it as the original."""
+        if path not in self._originals:
+            full_path = self.root / path
+            if not full_path.is_file() and self.on_missing is not None:
+                self.on_missing([path])
+            content = full_path.read_text(encoding="utf-8") if full_path.is_file() else None
+            self._originals[path] = self._store(content)
+            return content
+        return self._load(self._originals[path])
+
+    def read(self, path: str) -> str | None:
+        """Returns the current content of `path` (relative, posix), or None if it does not exist."""
+        with self._lock:
+            if path in self._modified:
+                return self._load(self._modified[path])
+            return self._base(path)
+
+    def exists(self, path: str) -> bool:
+        return self.read(path) is not None
+
+    def write(self, path: str, content: str) -> None:
+        if self.on_write is not None:
+            self.on_write(content)
+        with self._lock:
+            self._base(path)
+            if path not in self._modified:
+                self._order.append(path)
+            self._modified[path] = self._store(content)
+
+    def original(self, path: str) -> str | None:
+        """Returns the content `path` had before the overlay touched it."""
+        with self._lock:
+            return self._base(path)
+
+    def changed_paths(self) -> list[str]:
+        """Paths whose content differs from the checkout, in first-write order."""
+        with self._lock:
+            return [
+                path
+                for path in self._order
+                if self._load(self._modified[path]) != self._load(self._originals[path])
+            ]
+
+    def changes(self) -> list[tuple[str, str | None, str]]:
+        """Returns (path, before, after) for every changed path, without touching disk."""
+        with self._lock:
+            return [
+                (path, self._load(self._originals[path]), self._load(self._modified[path]))
+                for path in self.changed_paths()
+            ]
+
+    def export_patch(self, patch_path: Path) -> None:
+        """Writes every change as one unified diff, applicable with `git apply`."""
+        lines = []
+        for path, before, after in self.changes():
+            diff = difflib.unified_diff(
+                (before or "").splitlines(keepends=True),
+                after.splitlines(keepends=True),
+                fromfile=f"a/{path}" if before is not None else "/dev/null",
+                tofile=f"b/{path}",
+            )
+            for line in diff:
+                lines.append(line if line.endswith("\n") else line + "\n\\ No newline at end of file\n")
+        replace_atomically(Path(patch_path), "".join(lines))
+
+    def flush(self) -> list[str]:
+        """Writes every change to the checkout in one pass and returns the changed paths."""
+        with self._lock:
+            changes = self.changes()
+            for path, _before, after in changes:
+                replace_atomically(self.root / path, after)
+            self.discard()
+            return [path for path, _before, _after in changes]
+
+    def discard(self) -> None:
+        """Drops every change and spilled copy; the checkout is left as it was."""
+        with self._lock:
+            self._originals.clear()
+            self._modified.clear()
+            self._order.clear()
+            if self._spill_dir is not None:
+                self._spill_dir.cleanup()
+                self._spill_dir = None
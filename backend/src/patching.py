@@ -0,0 +1,185 @@
+import ast
+import json
+import os
+import posixpath
+import re
+
+# "patch" asks the generator for edit blocks; "full" for the whole modified file.
+GENERATION_MODE = os.environ.get("FRONTFREND_GENERATION_MODE", "patch")
+GENERATION_MODES = ("patch", "full")
+
+# Models often copy the indentation the prompts show blocks with, so markers may be indented
+EDIT_BLOCK_PATTERN = re.compile(
+    r"^([ \t]*)<{5,9} SEARCH[^\n]*\n(.*?)^[ \t]*={5,9}[ \t]*\n(.*?)^[ \t]*>{5,9} REPLACE[ \t]*$",
+    re.MULTILINE | re.DOTALL,
+)
+HUNK_HEADER_PATTERN = re.compile(r"^@@ -(\d+)(?:,\d+)? \+\d+(?:,\d+)? @@")
+CODE_BLOCK_PATTERN = re.compile(r"```[^\n]*\n(.*?)^```[ \t]*$", re.MULTILINE | re.DOTALL)
+FILE_HEADER_PATTERN = re.compile(
+    r"^[#*\s]*(?:Final Answer:\s*)?FILE:\s*[`'\"]?([^\s`'\"*]+)[`'\"*]*[ \t]*$", re.MULTILINE
+)
+
+
+class PatchError(Exception):
+    """Raised when generated edits cannot be applied cleanly to a file."""
+
+
+def _dedent(text: str, indent: str) -> str:
+    return "".join(
+        line[len(indent) :] if line.startswith(indent) else line.lstrip(" \t")
+        for line in text.splitlines(keepends=True)
+    )
+
+
+def parse_edit_blocks(text: str) -> list[tuple[str, str]]:
+    """
+    Returns the (search, replace) pairs of SEARCH/REPLACE blocks in model output.
+    When a block's SEARCH marker is indented and every line of the block shares
+    that indentation, it was copied from the prompt and is removed.
+    """
+    blocks = []
+    for indent, search, replace in EDIT_BLOCK_PATTERN.findall(text):
+        lines = (search + replace).splitlines()
+        if indent and all(not line.strip() or line.startswith(indent) for line in lines):
+            search, replace = _dedent(search, indent), _dedent(replace, indent)
+        blocks.append((search, replace))
+    return blocks
+
+
+def split_by_file(output: str, paths: list[str]) -> dict[str, str]:
+    """
+    Splits generator output covering several files at its "FILE: <path>" lines
+    and returns the section of each path in `paths` that has one. Headers may
+    name a path absolutely; output without headers belongs to a single path.
+    """
+    headers = list(FILE_HEADER_PATTERN.finditer(output))
+    if not headers:
+        return {paths[0]: output} if len(paths) == 1 else {}
+    sections = {}
+    for header, following in zip(headers, headers[1:] + [None]):
+        named = header.group(1).replace("\\", "/")
+        path = next((p for p in paths if named == p or named.endswith("/" + p)), None)
+        if path is None:
+            continue
+        end = following.start() if following is not None else len(output)
+        sections[path] = sections.get(path, "") + output[header.end() : end]
+    return sections
+
+
+def parse_unified_diff(text: str) -> list[tuple[int, list[str], list[str]]]:
+    """
+    Returns the hunks of a unified diff as (old_start, old_lines, new_lines).
+    File headers are ignored; the diff is assumed to target a single file.
+    """
+    hunks = []
+    current = None
+    for line in text.splitlines():
+        header = HUNK_HEADER_PATTERN.match(line)
+        if header:
+            current = (int(header.group(1)), [], [])
+            hunks.append(current)
+        elif current is None or line.startswith(("--- ", "+++ ", "\\")):
+            continue
+        elif line.startswith("-"):
+            current[1].append(line[1:])
+        elif line.startswith("+"):
+            current[2].append(line[1:])
+        elif line.startswith(" ") or line == "":
+            current[1].append(line[1:])
+            current[2].append(line[1:])
+        elif line.startswith("```"):
+            current = None
+    return hunks
+
+
+def extract_code_block(text: str) -> str | None:
+    """Returns the largest fenced code block in model output, if any."""
+    blocks = CODE_BLOCK_PATTERN.findall(text)
+    return max(blocks, key=len) if blocks else None
+
+
+def _find(content: str, search: str) -> tuple[int, int]:
+    """Locates `search` exactly once in `content`, tolerating trailing whitespace differences."""
+    count = content.count(search)
+    if count == 1:
+        start = content.index(search)
+        return start, start + len(search)
+    if count > 1:
+        raise PatchError(f"Search text matches {count} places:\n{search[:200]}")
+
+    # Retry line by line, ignoring trailing whitespace
+    lines = content.splitlines(keepends=True)
+    wanted = [line.rstrip() for line in search.splitlines()]
+    if not wanted:
+        raise PatchError("Empty search text.")
+    matches = [
+        i
+        for i in range(len(lines) - len(wanted) + 1)
+        if [line.rstrip() for line in lines[i : i + len(wanted)]] == wanted
+    ]
+    if len(matches) != 1:
+        problem = "not found" if not matches else f"found {len(matches)} times"
+        raise PatchError(f"Search text {problem}:\n{search[:200]}")
+    start = sum(len(line) for line in lines[: matches[0]])
+    end = start + sum(len(line) for line in lines[matches[0] : matches[0] + len(wanted)])
+    return start, end
+
+
+def apply_edit_blocks(content: str, edits: list[tuple[str, str]]) -> str:
+    """Applies SEARCH/REPLACE edits in order; each search text must match exactly once."""
+    for search, replace in edits:
+        if not search.strip():
+            # An empty search block appends to the file
+            content = content + ("" if content.endswith("\n") else "\n") + replace
+            continue
+        start, end = _find(content, search)
+        if content[start:end].endswith("\n") and not replace.endswith("\n"):
+            replace += "\n"
+        content = content[:start] + replace + content[end:]
+    return content
+
+
+def apply_unified_diff(content: str, hunks: list[tuple[int, list[str], list[str]]]) -> str:
+    """Applies diff hunks by their context, so stale line numbers are tolerated."""
+    edits = []
+    for _old_start, old_lines, new_lines in hunks:
+        search = "".join(line + "\n" for line in old_lines)
+        replace = "".join(line + "\n" for line in new_lines)
+        edits.append((search, replace))
+    return apply_edit_blocks(content, edits)
+
+
+def validate(path: str, content: str) -> None:
+    """Rejects edited content that no longer parses, for the file types that can be checked here."""
+    suffix = posixpath.splitext(path)[1].lower()
+    try:
+        if suffix == ".py":
+            ast.parse(content)
+        elif suffix == ".json":
+            json.loads(content)
+    except (SyntaxError, ValueError) as e:
+        raise PatchError(f"Edited {path} does not parse: {e}") from e
+
+
+def apply_generation(path: str, original: str, output: str, allow_full_file: bool = True) -> tuple[str, str]:
+    """
+    Turns generator output into the new file content. SEARCH/REPLACE blocks are
+    preferred, then unified diff hunks, then (if `allow_full_file`) a fenced code
+    block holding the whole file. Returns (content, mode) or raises PatchError.
+    """
+    edits = parse_edit_blocks(output)
+    if edits:
+        content, mode = apply_edit_blocks(original, edits), "edit_blocks"
+    else:
+        hunks = parse_unified_diff(output)
+        if hunks:
+            content, mode = apply_unified_diff(original, hunks), "unified_diff"
+        elif allow_full_file:
+            # Prose is never taken for a file's content
+            content, mode = extract_code_block(output), "full_file"
+            if content is None:
+                raise PatchError("The output contains no edit blocks, diff hunks or code block.")
+        else:
+            raise PatchError("The output contains no edit blocks or diff hunks.")
+    validate(path, content)
+    return content, mode
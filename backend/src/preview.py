@@ -0,0 +1,131 @@
+import json
+import logging
+import posixpath
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from src.results_store import ResultsStore
+
+PREVIEW_REVISIONS = ("before", "after")
+HTML_SUFFIXES = (".html", ".htm")
+
+HEAD_CLOSE_PATTERN = re.compile(r"</head\s*>", re.IGNORECASE)
+BODY_CLOSE_PATTERN = re.compile(r"</body\s*>", re.IGNORECASE)
+
+
+class PreviewError(Exception):
+    """Raised when no preview can be built for a job."""
+
+
+def _link_missing_assets(html: str, entry: str, assets: list[str]) -> str:
+    """Links the example stylesheets and scripts the entry page does not reference yet."""
+    base = posixpath.dirname(entry)
+    links, scripts = [], []
+    for path in assets:
+        href = posixpath.relpath(path, base or ".")
+        if href in html:
+            continue
+        if path.endswith(".css"):
+            links.append(f'<link rel="stylesheet" href="{href}">')
+        elif path.endswith(".js"):
+            scripts.append(f'<script src="{href}"></script>')
+    if links:
+        tags = "".join(links)
+        html, found = HEAD_CLOSE_PATTERN.subn(lambda m: tags + m.group(0), html, count=1)
+        if not found:
+            html = tags + html
+    if scripts:
+        tags = "".join(scripts)
+        html, found = BODY_CLOSE_PATTERN.subn(lambda m: tags + m.group(0), html, count=1)
+        if not found:
+            html = html + tags
+    return html
+
+
+def build_bundle(workspace, results: dict, revision: str) -> dict:
+    """
+    Builds the preview of one revision ("before" or "after") of a job's UI files:
+    the highest-ranked HTML file is the entry page, every example file is served
+    as its own asset, and stylesheets and scripts the entry does not reference are
+    linked into it. Assets are blobs in the job's ResultsStore, named by hash.
+    """
+    try:
+        with open(workspace.ui_detection_path, "r", encoding="utf-8") as f:
+            examples = json.load(f).get("examples", [])
+    except (OSError, ValueError) as e:
+        raise PreviewError(f"Could not read UI detection output: {e}") from e
+    if not examples:
+        raise PreviewError("No example UI files found in detection output.")
+
+    store = ResultsStore(workspace.blobs_dir)
+    changed = {entry["path"]: entry for entry in results.get("files", [])}
+    assets = {}
+    for path in examples:
+        if path in changed:
+            assets[path] = changed[path][f"{revision}_sha256"]
+            continue
+        # Files the crews did not touch are the same in both revisions
+        file_path = workspace.repo_dir / path
+        if not file_path.is_file():
+            logging.warning(f"Live Preview: File not found in repo: {file_path}")
+            continue
+        assets[path] = store.put(file_path.read_text(encoding="utf-8"))
+
+    entry = next((path for path in assets if path.lower().endswith(HTML_SUFFIXES)), None)
+    if entry is None:
+        raise PreviewError("No HTML file found in example UI files.")
+    html = _link_missing_assets(store.get(assets[entry]), entry, list(assets))
+    assets[entry] = store.put(html)
+
+    bundle = {"revision": revision, "entry": entry, "assets": assets, "built_at": time.time()}
+    path = workspace.preview_dir / f"{revision}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(bundle), encoding="utf-8")
+    return bundle
+
+
+# Recently used bundles; older ones are reloaded from the workspace on demand
+MAX_CACHED_BUNDLES = 64
+_bundles = OrderedDict()
+_bundles_lock = threading.Lock()
+# One per bundle being built, so a slow build only holds up requests for that bundle
+_build_locks = {}
+
+
+def _cached_bundle(key) -> dict | None:
+    with _bundles_lock:
+        if key not in _bundles:
+            return None
+        _bundles.move_to_end(key)
+        return _bundles[key]
+
+
+def get_bundle(workspace, results: dict, revision: str) -> dict:
+    """Returns the job's preview bundle for `revision`, building it on first use only."""
+    if revision not in PREVIEW_REVISIONS:
+        raise PreviewError(f"Unknown preview revision: {revision}")
+    key = (str(workspace.root), revision)
+    bundle = _cached_bundle(key)
+    if bundle is not None:
+        return bundle
+    with _bundles_lock:
+        build_lock = _build_locks.setdefault(key, threading.Lock())
+    with build_lock:
+        # Another request may have built it while this one waited
+        bundle = _cached_bundle(key)
+        if bundle is not None:
+            return bundle
+        path = workspace.preview_dir / f"{revision}.json"
+        if path.is_file():
+            bundle = json.loads(path.read_text(encoding="utf-8"))
+        else:
+            bundle = build_bundle(workspace, results, revision)
+        with _bundles_lock:
+            _bundles[key] = bundle
+            _build_locks.pop(key, None)
+            while len(_bundles) > MAX_CACHED_BUNDLES:
+                _bundles.popitem(last=False)
+    return bundle
+
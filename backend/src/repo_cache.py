@@ -0,0 +1,285 @@
+import fcntl
+import hashlib
+import logging
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+# GitPython is imported where it is used, so the API starts without loading it
+if TYPE_CHECKING:
+    import git
+
+CACHE_DIR = Path(
+    os.environ.get(
+        "FRONTFREND_REPO_CACHE", Path(__file__).parent.parent.parent / "cache" / "mirrors"
+    )
+)
+# Total disk budget for all mirrors before least recently used ones are evicted.
+CACHE_MAX_BYTES = int(os.environ.get("FRONTFREND_REPO_CACHE_MAX_BYTES", 10 * 1024**3))
+
+LAST_USED_MARKER = "frontfrend-last-used"
+
+# "full" clones everything, "shallow" only the last FRONTFREND_CLONE_DEPTH commits,
+# "blobless" fetches file contents lazily, and "sparse" is blobless with only the
+# top-level files checked out; everything else is materialized on demand.
+CLONE_MODES = ("full", "shallow", "blobless", "sparse")
+DEFAULT_CLONE_MODE = os.environ.get("FRONTFREND_CLONE_MODE", "full")
+SHALLOW_DEPTH = int(os.environ.get("FRONTFREND_CLONE_DEPTH", "1"))
+
+
+def _dir_size(path: Path) -> int:
+    total = 0
+    for dirpath, _dirnames, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                total += os.lstat(os.path.join(dirpath, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+def clone_options(mode: str, depth: int = SHALLOW_DEPTH) -> dict:
+    """Returns the extra `git clone`/`git fetch` options for a clone mode."""
+    if mode not in CLONE_MODES:
+        raise ValueError(f"Unknown clone mode '{mode}'. Expected one of {CLONE_MODES}.")
+    if mode == "shallow":
+        return {"depth": depth}
+    if mode in ("blobless", "sparse"):
+        return {"filter": "blob:none"}
+    return {}
+
+
+def init_sparse_checkout(repo_dir: Path) -> None:
+    """Restricts a not yet checked out working tree to top-level files, then populates it."""
+    import git
+
+    repo = git.Repo(repo_dir)
+    repo.git.sparse_checkout("set", "--no-cone", "/*", "!/*/")
+    repo.git.read_tree("-mu", "HEAD")
+
+
+def is_sparse(repo_dir: Path) -> bool:
+    import git
+
+    try:
+        value = git.Repo(repo_dir).git.config("--get", "core.sparseCheckout")
+    except git.exc.GitCommandError:
+        return False
+    return value.strip() == "true"
+
+
+def _sparse_pattern(path: str) -> str:
+    """Turns a repository-relative path into an anchored, escaped non-cone pattern."""
+    escaped = "".join("\\" + c if c in "\\*?[" else c for c in path.strip("/"))
+    return "/" + escaped
+
+
+@contextmanager
+def file_lock(path: Path, blocking: bool = True):
+    """
+    Holds an exclusive lock on `path` (created if needed) across processes, such
+    as the worker processes sharing the cache. Yields False instead of waiting
+    when `blocking` is False and another holder has it.
+    """
+    with open(path, "a") as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+_materialize_lock = threading.Lock()
+
+
+def materialize(repo_dir: Path, paths: list[str]) -> None:
+    """Checks out `paths` in a sparse working tree. Does nothing for full checkouts."""
+    import git
+
+    repo_dir = Path(repo_dir)
+    # Concurrent crews share the checkout and git takes an index lock per update;
+    # a resumed job's worktree may still be used by the worker that lost its lease
+    git_dir = Path(git.Repo(repo_dir).git_dir)
+    with _materialize_lock, file_lock(git_dir / "frontfrend-materialize.lock"):
+        missing = [p for p in paths if p and not (repo_dir / p).exists()]
+        if not missing or not is_sparse(repo_dir):
+            return
+        logging.info(f"Materializing {len(missing)} path(s) in sparse checkout {repo_dir}")
+        git.Repo(repo_dir).git.sparse_checkout("add", *[_sparse_pattern(p) for p in missing])
+
+
+def open_mirror(mirror: Path) -> "git.Repo":
+    """
+    Opens a bare mirror. Once a sparse worktree enables per-worktree config, git
+    keeps `core.bare` in the mirror's config.worktree, which GitPython does not
+    read, so commands are run in the mirror itself rather than its parent.
+    """
+    import git
+
+    repo = git.Repo(mirror)
+    repo.git = git.Git(mirror)
+    return repo
+
+
+def list_tracked_files(repo_dir: Path) -> list[str]:
+    """Lists every file at HEAD without reading blobs or touching the working tree."""
+    import git
+
+    output = git.Repo(repo_dir).git.ls_tree("-r", "-z", "--name-only", "HEAD")
+    return [path for path in output.split("\0") if path]
+
+
+class RepoCache:
+    """
+    A local cache of bare mirror clones keyed by remote URL. Mirrors are fetched
+    incrementally and every run gets its own cheap worktree checkout. Worker
+    processes share the cache; a lock file beside each mirror serializes them.
+    """
+
+    def __init__(self, cache_dir: Path = CACHE_DIR, max_bytes: int = CACHE_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self._locks: dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    def mirror_path(self, url: str, mode: str = "full") -> Path:
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()[:16]
+        # Sparse checkouts share the blobless mirror; only the worktree differs.
+        flavor = "blobless" if mode == "sparse" else mode
+        suffix = "" if flavor == "full" else f"-{flavor}"
+        return self.cache_dir / f"{key}{suffix}.git"
+
+    def _lock_for(self, mirror: Path) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(mirror.name, threading.Lock())
+
+    @contextmanager
+    def _mirror_lock(self, mirror: Path, blocking: bool = True):
+        """
+        Holds `mirror` against other threads and processes. Yields False instead
+        of waiting when `blocking` is False and the mirror is in use.
+        """
+        lock = self._lock_for(mirror)
+        if not lock.acquire(blocking=blocking):
+            yield False
+            return
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            with file_lock(mirror.with_suffix(".lock"), blocking=blocking) as acquired:
+                yield acquired
+        finally:
+            lock.release()
+
+    def _touch(self, mirror: Path) -> None:
+        (mirror / LAST_USED_MARKER).touch()
+
+    def _last_used(self, mirror: Path) -> float:
+        try:
+            return (mirror / LAST_USED_MARKER).stat().st_mtime
+        except OSError:
+            return mirror.stat().st_mtime
+
+    def ensure_mirror(self, url: str, mode: str = "full") -> "git.Repo":
+        """Clones a bare mirror of `url` on first use, otherwise fetches what changed."""
+        import git
+
+        mirror = self.mirror_path(url, mode)
+        options = clone_options(mode)
+        with self._mirror_lock(mirror):
+            if (mirror / "HEAD").exists():
+                logging.info(f"Updating cached mirror of {url} in {mirror}")
+                repo = open_mirror(mirror)
+                fetch_args = ["--prune"]
+                if "depth" in options:
+                    fetch_args.append(f"--depth={options['depth']}")
+                repo.git.fetch(*fetch_args, "origin")
+                repo.git.worktree("prune")
+            else:
+                logging.info(f"Creating cached mirror of {url} in {mirror}")
+                tmp = mirror.with_suffix(".tmp")
+                shutil.rmtree(tmp, ignore_errors=True)
+                git.Repo.clone_from(url, str(tmp), mirror=True, **options)
+                tmp.rename(mirror)
+                repo = open_mirror(mirror)
+            self._touch(mirror)
+        return repo
+
+    def checkout(self, url: str, dest: Path, mode: str = "full") -> "git.Repo":
+        """Creates a detached worktree of the remote's default branch at `dest`."""
+        import git
+
+        mirror_repo = self.ensure_mirror(url, mode)
+        mirror = self.mirror_path(url, mode)
+        with self._mirror_lock(mirror):
+            if mode == "sparse":
+                mirror_repo.git.worktree("add", "--no-checkout", "--detach", str(dest), "HEAD")
+            else:
+                mirror_repo.git.worktree("add", "--detach", str(dest), "HEAD")
+        if mode == "sparse":
+            init_sparse_checkout(dest)
+        logging.info(f"Checked out {url} into {dest} from cache ({mode} mode)")
+        self.evict()
+        return git.Repo(dest)
+
+    def owns(self, repo_dir: Path) -> bool:
+        """Returns True if `repo_dir` is a worktree of one of the cached mirrors."""
+        dot_git = Path(repo_dir) / ".git"
+        if not dot_git.is_file():
+            return False
+        gitdir = dot_git.read_text(encoding="utf-8").strip().removeprefix("gitdir:").strip()
+        return self.cache_dir.resolve() in Path(gitdir).resolve().parents
+
+    def refresh(self, url: str, repo_dir: Path, mode: str = "full") -> "git.Repo":
+        """Moves an existing worktree to the latest fetched tip of the default branch."""
+        import git
+
+        mirror_repo = self.ensure_mirror(url, mode)
+        repo = git.Repo(repo_dir)
+        repo.git.checkout("--detach", "--force", mirror_repo.head.commit.hexsha)
+        return repo
+
+    def evict(self) -> None:
+        """Removes least recently used mirrors until the cache fits its disk budget."""
+        if not self.cache_dir.exists():
+            return
+        mirrors = [p for p in self.cache_dir.glob("*.git") if p.is_dir()]
+        sizes = {mirror: _dir_size(mirror) for mirror in mirrors}
+        total = sum(sizes.values())
+        if total <= self.max_bytes:
+            return
+
+        for mirror in sorted(mirrors, key=self._last_used):
+            if total <= self.max_bytes:
+                break
+            with self._mirror_lock(mirror, blocking=False) as acquired:
+                # Another thread or worker process is fetching or checking it out
+                if not acquired or not (mirror / "HEAD").exists():
+                    continue
+                repo = open_mirror(mirror)
+                repo.git.worktree("prune")
+                worktrees = mirror / "worktrees"
+                if worktrees.exists() and any(worktrees.iterdir()):
+                    continue  # Still checked out by a running job
+                shutil.rmtree(mirror, ignore_errors=True)
+                total -= sizes[mirror]
+                logging.info(f"Evicted cached mirror {mirror} ({sizes[mirror]} bytes)")
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_repo_cache() -> RepoCache:
+    """Returns the process-wide repository cache."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = RepoCache()
+        return _default_cache
@@ -0,0 +1,59 @@
+import gzip
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+
+
+class ResultsStore:
+    """
+    Content-addressed, gzip-compressed storage for the file contents of a run's
+    results. The results themselves only carry hashes, so they stay small no
+    matter how large the changed files are, and identical contents (a file whose
+    "before" and "after" match, or one written by several crews) are stored once.
+    """
+
+    def __init__(self, blobs_dir: Path):
+        self.blobs_dir = Path(blobs_dir)
+
+    def blob_path(self, digest: str) -> Path:
+        return self.blobs_dir / f"{digest}.gz"
+
+    def put(self, content: str) -> str:
+        """Stores `content` and returns its SHA-256 hex digest."""
+        data = content.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.blob_path(digest)
+        if path.exists():
+            return digest
+        self.blobs_dir.mkdir(parents=True, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.blobs_dir, prefix=f".{digest}.")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(gzip.compress(data, compresslevel=6))
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        return digest
+
+    def get_compressed(self, digest: str) -> bytes:
+        """Returns the gzip-compressed bytes of a blob; raises FileNotFoundError if unknown."""
+        if len(digest) != 64 or not all(c in "0123456789abcdef" for c in digest):
+            raise FileNotFoundError(digest)
+        return self.blob_path(digest).read_bytes()
+
+    def get(self, digest: str) -> str:
+        return gzip.decompress(self.get_compressed(digest)).decode("utf-8")
+
+    def add_file(self, index: int, path: str, before: str, after: str) -> dict:
+        """Stores both versions of a changed file and returns its manifest entry."""
+        return {
+            "index": index,
+            "path": path,
+            "before_sha256": self.put(before),
+            "after_sha256": self.put(after),
+            "before_bytes": len(before.encode("utf-8")),
+            "after_bytes": len(after.encode("utf-8")),
+            "changed": before != after,
+        }
@@ -1,9 +1,29 @@
 import logging
-from crewai import Agent, Task, Crew, Process, LLM
-from tools.tools import read_file, write_file
-from models import LLMConfig
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from crewai import Agent, Task, Crew, Process
+from tools.tools import make_context_tools, make_file_tools, read_repo_file
+from models import FileChange, default_llm_config
+from src.change_writer import write_change_set
+from src.llm_cache import create_llm, fingerprint_files
+from src.llm_scheduler import DEFAULT_PRIORITY
+from src.patching import (
+    GENERATION_MODE,
+    GENERATION_MODES,
+    PatchError,
+    apply_generation,
+    extract_code_block,
+    parse_edit_blocks,
+    parse_unified_diff,
+    split_by_file,
+)
+from src.ui_ranker import group_ui_files, make_disk_reader
+from utils.telemetry import current_span, in_context, traced
 from pathlib import Path
 
+# Groups of related UI files improved at the same time
+MAX_PARALLEL_GROUPS = int(os.environ.get("FRONTFREND_MAX_PARALLEL_GROUPS", "4"))
+
 
 class UIAdvisorCrew:
     def __init__(
@@ -11,13 +31,34 @@ class UIAdvisorCrew:
         repo_path: Path,
         ui_detection_output: dict,
         user_preferences: str,
+        materialize=None,
+        use_llm_cache: bool = True,
+        write_tracker=None,
+        priority: str = DEFAULT_PRIORITY,
+        overlay=None,
+        generation_mode: str = GENERATION_MODE,
     ):
         """
         Initializes the UIAdvisorCrew with UI detection data and user preferences.
+        `materialize` checks out files on demand when the repo is a sparse checkout.
+        LLM responses are cached per UI file contents unless `use_llm_cache` is False.
+        Writes go through `write_tracker` when other crews share the checkout,
+        and into `overlay` instead of the checkout when one is given.
+        `priority` ranks its model calls against those of other jobs.
+        `generation_mode` is "patch" (edit blocks applied locally, falling back to
+        the whole file when they do not apply) or "full".
         """
+        if generation_mode not in GENERATION_MODES:
+            raise ValueError(f"Unknown generation mode: {generation_mode}")
         self.repo_path = repo_path
+        self.materialize = materialize
+        self.write_tracker = write_tracker
+        self.overlay = overlay
+        self.generation_mode = generation_mode
         self.ui_detection_output = ui_detection_output
         self.user_preferences = user_preferences
+        self.errors = []
+        self._groups = None
 
         formatted_preferences = []
         if self.user_preferences.get("improvements"):
@@ -36,29 +77,94 @@ class UIAdvisorCrew:
             )
 
         self.formatted_preferences = "\n".join(formatted_preferences)
-        self.llm = LLM(
-            model=LLMConfig().model_name, temperature=LLMConfig().temperature
+        self.llm = create_llm(
+            default_llm_config(),
+            fingerprint=fingerprint_files(
+                self.repo_path,
+                self.ui_detection_output.get("examples", []),
+                read=overlay.read if overlay is not None else None,
+            ),
+            root=self.repo_path,
+            use_cache=use_llm_cache,
+            priority=priority,
+        )
+        # Edits are applied locally, so the generator only needs to read
+        self.file_read_tool = make_file_tools(
+            self.repo_path,
+            on_missing=materialize,
+            tracker=write_tracker,
+            overlay=overlay,
+            owner="ui_advisor",
+        )[0]
+        # The advisor only analyzes, so it reads large files in packed form
+        self.context_tools = make_context_tools(
+            self.repo_path, on_missing=materialize, overlay=overlay
         )
-        self.file_read_tool = read_file
-        self.file_write_tool = write_file
 
-    def run(self):
+    def file_groups(self) -> list[list[str]]:
+        """The example UI files, grouped with their related files (see `group_ui_files`)."""
+        if self._groups is None:
+            self._groups = group_ui_files(
+                self.ui_detection_output.get("examples", []),
+                make_disk_reader(self.repo_path, before_read=self.materialize),
+            )
+        return self._groups
+
+    def run(self, groups: list[list[str]] | None = None, on_group_done=None):
         """
-        Sets up and runs the UI analysis and advisory crew.
+        Improves every group of UI files (all of `file_groups()` by default) with
+        one crew run per group, running up to MAX_PARALLEL_GROUPS at once, and
+        returns the manifest of written files (see `write_change_set`), empty if
+        there was nothing to do. `on_group_done(group, manifest)` is called as
+        each group finishes. Failed groups are listed in `self.errors`; only if
+        every group fails is an error raised.
         """
         if not self.ui_detection_output.get("exists"):
-            return "UI does not exist. The UI Advisor crew has nothing to analyze."
+            logging.info("UI does not exist. The UI Advisor crew has nothing to analyze.")
+            return []
 
-        ui_file_relative_path = (
-            self.ui_detection_output.get("examples", [])[0]
-            if self.ui_detection_output.get("examples")
-            else None
-        )
-        if not ui_file_relative_path:
-            return "No UI file path found in detection output. Cannot run the UI Advisor crew."
+        groups = self.file_groups() if groups is None else groups
+        if not groups:
+            logging.info("No UI file path found in detection output. Cannot run the UI Advisor crew.")
+            return []
+
+        manifests = {}
+        self.errors = []
+        with ThreadPoolExecutor(
+            max_workers=max(1, min(MAX_PARALLEL_GROUPS, len(groups))),
+            thread_name_prefix="ui-advisor",
+        ) as executor:
+            futures = {
+                executor.submit(in_context(self._improve_group), group): tuple(group) for group in groups
+            }
+            for future in as_completed(futures):
+                group = futures[future]
+                try:
+                    manifests[group] = future.result()
+                except Exception as e:
+                    logging.error("UI Crew failed for %s: %s", list(group), e, exc_info=True)
+                    self.errors.extend({"path": path, "error": str(e)} for path in group)
+                    continue
+                if on_group_done is not None:
+                    on_group_done(list(group), manifests[group])
 
-        # Resolve the full path to the UI file
-        full_ui_file_path = self.repo_path.joinpath(ui_file_relative_path).resolve()
+        if not manifests:
+            raise RuntimeError(f"The UI Advisor crew failed for every UI file: {self.errors}")
+        return [entry for group in groups for entry in manifests.get(tuple(group), ())]
+
+    @traced("advise.group")
+    def _improve_group(self, paths: list[str]) -> list[dict]:
+        """Runs the advisor and generator on one group of related UI files and writes the result."""
+        current_span().set(paths=paths)
+        full_paths = [str(self.repo_path.joinpath(path).resolve()) for path in paths]
+        listed_paths = "\n".join(f"               - '{path}'" for path in full_paths)
+        if len(paths) > 1:
+            scope = (
+                "These files belong together (a page and its stylesheets and scripts, or a "
+                "component and its styles); keep the changes consistent across them."
+            )
+        else:
+            scope = ""
 
         ui_advisor_agent = Agent(
             role="Expert UI/UX and Accessibility Consultant",
@@ -74,7 +180,7 @@ class UIAdvisorCrew:
             ),
             verbose=False,
             llm=self.llm,
-            tools=[self.file_read_tool],
+            tools=list(self.context_tools),
             allow_delegation=False,
         )
 
@@ -95,32 +201,24 @@ class UIAdvisorCrew:
                 "You MUST NOT add any new, unrequested features, sections, or content to the code."
             ),
             llm=self.llm,
-        )
-
-        code_writer_agent = Agent(
-            role="Code Writer",
-            goal="Take the generated code and write it to the appropriate file.",
-            backstory=(
-                "You are a meticulous code writer. Your primary function is to take a block of code, "
-                "and use the 'file_writer' tool to save it to the correct file path."
-            ),
-            verbose=False,
-            llm=self.llm,
-            tools=[self.file_write_tool],
+            tools=[self.file_read_tool],
             allow_delegation=False,
         )
 
         advisory_task = Task(
             description=f"""
-            1. **Mandatory First Step: Read the File's Content.**
-               You MUST use the 'file_reader' tool to read the full content of the UI file located at the path: '{full_ui_file_path}'.
-               Do not proceed without successfully reading the file.
+            1. **Mandatory First Step: Read the Files' Content.**
+               You MUST use the 'file_reader' tool to read the content of each of these UI files:
+{listed_paths}
+               Large files come back as an outline followed by their first sections; use the 'file_range_reader' tool to read the sections you need to judge.
+               Do not proceed without successfully reading the files.
+               {scope}
 
             2. **Analyze and Summarize.**
                Based *only* on the content you just read, create a brief technical summary.
 
             3. **Provide Context-Specific Suggestions.**
-               Based *directly* on your analysis of the code, provide at least 5 concrete and actionable improvement suggestions in a Markdown list.
+               Based *directly* on your analysis of the code, provide at least 5 concrete and actionable improvement suggestions in a Markdown list, naming the file each one applies to.
                The suggestions should follow these UI/UX guidelines and incorporate the user's preferences: '{self.user_preferences}'.
                - Try unique designs for backgrounds, font styles, gradients, animations, and visuals/images for a better UI.
                - Always prioritize readability (use proper color combinations which are readable in different backgrounds; avoid white background with white text or white button that cause readability issues).
@@ -129,66 +227,187 @@ class UIAdvisorCrew:
                - Tend to make creative changes to design while following these rules.
             """,
             expected_output="""A Markdown-formatted response containing ONLY:
-            1. A brief technical summary of the file.
+            1. A brief technical summary of the files.
             2. A list of at least 5 actionable UI/UX improvement suggestions based on the user's preferences.
             DO NOT include the original file content in your output.
             """,
             agent=ui_advisor_agent,
         )
 
-        generation_task = Task(
-            description=f"""
-            Your task is to implement the UI/UX improvement suggestions from the UI Advisor by modifying the original source code, keeping in mind the user's preferences: '{self.user_preferences}'.
+        generation_task = self._generation_task(
+            code_generator_agent,
+            advisory_task,
+            paths,
+            full_file=self.generation_mode == "full",
+        )
 
-            **Mandatory Steps:**
-            1. **Read the Original File:** Before writing any code, you MUST use the 'file_reader' tool to read the full content of the original UI file at: '{full_ui_file_path}'.
-            2. **Integrate Suggestions:** Take the *entire content* of the original file you just read, and integrate the specific UI/UX improvement suggestions provided by the UI Advisor into it. Do not remove any code unless explicitly part of a your code changes.
+        ui_crew = Crew(
+            agents=[ui_advisor_agent, code_generator_agent],
+            tasks=[advisory_task, generation_task],
+            process=Process.sequential,
+            verbose=False,
+        )
+
+        try:
+            ui_crew.kickoff()
+        except Exception as e:
+            logging.error("Exception during UI Crew kickoff: %s", e)
+            raise
+
+        originals = {path: self._read_ui_file(path) for path in paths}
+        contents, modes, failed = self._apply_output(
+            paths, originals, generation_task.output.raw, self.generation_mode == "full"
+        )
+        if failed:
+            if self.generation_mode == "full":
+                raise PatchError("; ".join(failed.values()))
+            # One more round trip, asking for the whole files whose edits did not apply
+            logging.warning("Generated edits did not apply (%s); requesting the full files.", failed)
+            fallback_task = self._generation_task(
+                code_generator_agent,
+                advisory_task,
+                list(failed),
+                full_file=True,
+                previous_error="; ".join(failed.values()),
+            )
+            Crew(
+                agents=[code_generator_agent],
+                tasks=[fallback_task],
+                process=Process.sequential,
+                verbose=False,
+            ).kickoff()
+            retried, retried_modes, still_failed = self._apply_output(
+                list(failed), originals, fallback_task.output.raw, full_file=True
+            )
+            if still_failed:
+                raise PatchError("; ".join(still_failed.values()))
+            contents.update(retried)
+            modes.update(retried_modes)
+        manifest = write_change_set(
+            self.repo_path,
+            [FileChange(path=path, content=content) for path, content in contents.items()],
+            tracker=self.write_tracker,
+            owner="ui_advisor",
+            overlay=self.overlay,
+        )
+        logging.info("UI Crew applied %s and wrote %d file(s)", modes, len(manifest))
+        return manifest
+
+    @staticmethod
+    def _apply_output(
+        paths: list[str], originals: dict[str, str], output: str, full_file: bool
+    ) -> tuple[dict[str, str], dict[str, str], dict[str, str]]:
+        """
+        Applies the generator's output to each file in `paths`. Returns the new
+        contents and generation modes of the files it changed, and the error of
+        each file whose edits did not apply. Files the output does not mention,
+        or (unless `full_file`) mentions without any edits or code, are left as
+        they are; if that is all of them, every file counts as failed.
+        """
+        contents, modes, failed = {}, {}, {}
+        for path, section in split_by_file(output, paths).items():
+            has_code = bool(
+                parse_edit_blocks(section)
+                or parse_unified_diff(section)
+                or extract_code_block(section) is not None
+            )
+            if not (has_code or full_file):
+                continue
+            try:
+                contents[path], modes[path] = apply_generation(path, originals[path], section)
+            except PatchError as e:
+                failed[path] = f"{path}: {e}"
+        if not contents and not failed:
+            failed = {path: f"{path}: the output contains no edits for it" for path in paths}
+        return contents, modes, failed
+
+    def _read_ui_file(self, relative_path: str) -> str:
+        _path, content = read_repo_file(
+            self.repo_path.resolve(),
+            relative_path,
+            self.materialize,
+            self.write_tracker,
+            "ui_advisor",
+            overlay=self.overlay,
+        )
+        return content
+
+    def _generation_task(
+        self,
+        agent: Agent,
+        advisory_task: Task,
+        paths: list[str],
+        full_file: bool,
+        previous_error: str | None = None,
+    ) -> Task:
+        """
+        Builds the task implementing the advisor's suggestions on the files in
+        `paths`. In patch mode the generator answers with SEARCH/REPLACE blocks,
+        which are applied locally; in full-file mode it returns the whole
+        modified files. Each file's part starts with a "FILE: <path>" line.
+        """
+        listed_paths = "\n".join(
+            f"               - '{self.repo_path.joinpath(path).resolve()}' (write its header as: FILE: {path})"
+            for path in paths
+        )
+        guidelines = """
                When implementing the changes, you must follow these UI/UX guidelines:
                - Try unique designs for backgrounds, font styles, gradients,esthetic animations,actual working buttons and visuals/images for a better UI.
                - Always prioritize readability (use proper color combinations which are readable in different backgrounds; avoid white background with white text or white button that cause readability issues).
                  Example: light backgrounds with light color text or white buttons that cause readability issues.
                - Ensure all visuals, images, and graphs are presentable, well-sized, and do not overflow or break the layout/frame. Use responsive or max-width styles as needed.
-               - Tend to make creative changes to design while following these rules.
-            3. **Output Entire Modified File:** The output must be the *complete and final content of the entire file*, with all original code preserved and the suggested modifications applied.
+               - Tend to make creative changes to design while following these rules."""
+        suggestions = ""
+        if previous_error is not None and advisory_task.output is not None:
+            suggestions = f"""
+            The UI Advisor's suggestions are:
+            {advisory_task.output.raw}
+
+            Your previous edits could not be applied ({previous_error}), so this time return the entire files.
+            """
+
+        if full_file:
+            return Task(
+                description=f"""
+            Your task is to implement the UI/UX improvement suggestions from the UI Advisor by modifying the original source code, keeping in mind the user's preferences: '{self.user_preferences}'.
+            {suggestions}
+            **Mandatory Steps:**
+            1. **Read the Original Files:** Before writing any code, you MUST use the 'file_reader' tool to read the full content of each original UI file:
+{listed_paths}
+            2. **Integrate Suggestions:** Take the *entire content* of each original file you just read, and integrate the specific UI/UX improvement suggestions provided by the UI Advisor into it. Do not remove any code unless explicitly part of a your code changes.
+            {guidelines}
+            3. **Output Entire Modified Files:** For each file, write its header line "FILE: <path>" followed by the *complete and final content of the entire file* in a markdown code block, with all original code preserved and the suggested modifications applied.
             """,
-            expected_output="""The complete and final code for the entire file, with the requested UI/UX improvements applied.
-                The code should be enclosed in a single markdown code block (e.g., ```python ... ```).
+                expected_output="""For each file, a "FILE: <path>" line followed by the complete and final code for the entire file,
+                with the requested UI/UX improvements applied, enclosed in a single markdown code block (e.g., ```python ... ```).
                 This output MUST represent the *entire* file content, not just the changes or a partial file.
                 """,
-            agent=code_generator_agent,
-            context=[advisory_task],
-        )
+                agent=agent,
+                context=[] if suggestions else [advisory_task],
+            )
 
-        code_writing_task = Task(
+        return Task(
             description=f"""
-            Take the code generated by the 'Senior Frontend Developer' and write it to the file system.
-            - Always prioritize readability (use proper color combinations which are readable in different backgrounds; avoid white background with white text or white button that cause readability issues).
-            Example: light backgrounds with light color text or white buttons that cause readability issues.
-            - Tend to make creative changes to design while following the rules.
-            You MUST use the 'file_writer' tool for this.
+            Your task is to implement the UI/UX improvement suggestions from the UI Advisor by editing the original source code, keeping in mind the user's preferences: '{self.user_preferences}'.
 
-            The file path to write to is: '{full_ui_file_path}'
-
-            The content to write is the full code provided in the context from the previous task.
+            **Mandatory Steps:**
+            1. **Read the Original Files:** Before writing any edits, you MUST use the 'file_reader' tool to read the full content of each original UI file:
+{listed_paths}
+            2. **Plan the Edits:** Decide which parts of the files must change to apply the UI Advisor's suggestions. Do not remove any code unless explicitly part of your changes.
+            {guidelines}
+            3. **Output Edit Blocks Only:** For each file you change, write its header line "FILE: <path>" and then one SEARCH/REPLACE block per change, in file order:
+            FILE: <path>
+            <<<<<<< SEARCH
+            (lines copied exactly from the original file, including indentation)
+            =======
+            (the lines that replace them)
+            >>>>>>> REPLACE
+               Each SEARCH section must match exactly one place in its file; include a few unchanged lines around a change if needed to make it unique.
+               Do not output the unchanged parts of the files.
             """,
-            expected_output=f"A confirmation message stating that the file '{full_ui_file_path}' was written successfully.",
-            agent=code_writer_agent,
-            context=[generation_task],
-        )
-
-        ui_crew = Crew(
-            agents=[ui_advisor_agent, code_generator_agent, code_writer_agent],
-            tasks=[advisory_task, generation_task, code_writing_task],
-            process=Process.sequential,
-            verbose=False,
+            expected_output="""For each changed file, a "FILE: <path>" line followed by one or more SEARCH/REPLACE blocks
+                that apply the requested UI/UX improvements to it, and nothing else. Do not return entire files.
+                """,
+            agent=agent,
+            context=[advisory_task],
         )
-
-        logging.info(f"UI Advisor Agent Goal: {ui_advisor_agent.goal}")
-        logging.info(f"UI Advisor Agent Backstory: {ui_advisor_agent.backstory}")
-        try:
-            result = ui_crew.kickoff()
-            logging.info("UI Crew Result:\n%s", result)
-        except Exception as e:
-            logging.error("Exception during UI Crew kickoff: %s", e)
-            raise
-        return result
@@ -1,93 +1,257 @@
 import json
 import argparse
 import logging
-from pathlib import Path
+from collections import defaultdict
 from utils import setup_logging, read_json_file, write_json_file
 
 
-def detect_ui(file_tree: dict) -> dict:
+class TreeIndex:
+    """A suffix and basename index over the file tree, built in a single pass."""
+
+    def __init__(self, files: list[dict]):
+        self.paths = [f["path"] for f in files]
+        # Buckets hold positions in `paths`, so merged results keep tree order cheaply.
+        self.by_suffix = defaultdict(list)
+        self.by_basename = defaultdict(list)
+        by_suffix, by_basename = self.by_suffix, self.by_basename
+        for i, path in enumerate(self.paths):
+            name = path.rpartition("/")[2]
+            by_basename[name].append(i)
+            dot = name.rfind(".")
+            if dot > 0:
+                by_suffix[name[dot:].lower()].append(i)
+
+    def suffix_positions(self, suffixes) -> list[int]:
+        return self.merge(self.by_suffix.get(s) for s in suffixes)
+
+    def basename_positions(self, names) -> list[int]:
+        return self.merge(self.by_basename.get(n) for n in names)
+
+    def with_suffix(self, suffixes) -> list[str]:
+        return self.to_paths(self.suffix_positions(suffixes))
+
+    def with_basename(self, names) -> list[str]:
+        return self.to_paths(self.basename_positions(names))
+
+    def to_paths(self, positions: list[int]) -> list[str]:
+        paths = self.paths
+        return [paths[i] for i in positions]
+
+    @staticmethod
+    def merge(buckets) -> list[int]:
+        """Unites lists of positions into one, in tree order."""
+        buckets = [b for b in buckets if b]
+        if not buckets:
+            return []
+        if len(buckets) == 1:
+            return buckets[0]
+        return sorted(set().union(*buckets))
+
+
+class UIRule:
     """
-    Detects if a UI exists in the file tree and infers the technology.
+    A declarative UI technology rule. Each signal is a `(weight, kind, *args)` tuple
+    evaluated against the TreeIndex; `required` signals must all match for the rule
+    to produce a candidate, and the confidence is the sum of matched weights.
+
+    Signal kinds:
+      - ("basename", names): a file with one of these exact names exists
+      - ("suffix", suffixes): a file with one of these extensions exists
+      - ("path_contains", text, suffixes): a file with one of the extensions has `text` in its lowercased path
+      - ("in_dir", dirname, suffixes): a file with one of the extensions lives under a `dirname` directory
     """
-    exists = False
-    tech = None
-    examples = []
-
-    files = file_tree.get("files", [])
-
-    # --- Extension-based detection logic ---
-    streamlit_files = [
-        f["path"]
-        for f in files
-        if f["path"].endswith(".py")
-        and (
-            "streamlit" in f["path"].lower()
-            or "streamlit_app.py" in f["path"].lower()
-
-        )
-    ]
-    if streamlit_files:
-        exists = True
-        tech = "Streamlit"
-        examples = streamlit_files
-        logging.info(f"Detected Streamlit UI with files: {examples}")
-        return {"exists": exists, "tech": tech, "examples": examples}
-
-    react_files = [
-        f["path"]
-        for f in files
-        if f["path"].endswith((".js", ".jsx", ".ts", ".tsx")) or f["path"].endswith("package.json")
-    ]
-    if any(f.endswith(("App.js", "App.jsx", "App.tsx")) for f in react_files) and any(
-        f.endswith("package.json") for f in react_files
-    ) and any(f.endswith("tsconfig.json") for f in files):
-        exists = True
-        tech = "React"
-        examples = react_files
-        logging.info(f"Detected React UI with files: {examples}")
-        return {"exists": exists, "tech": tech, "examples": examples}
-
-    vue_files = [
-        f["path"]
-        for f in files
-        if f["path"].endswith((".vue", ".js")) or f["path"].endswith("package.json")
-    ]
-    if any(f.endswith("App.vue") for f in vue_files) and any(
-        f.endswith("package.json") for f in vue_files
-    ):
-        exists = True
-        tech = "Vue"
-        examples = vue_files
-        logging.info(f"Detected Vue UI with files: {examples}")
-        return {"exists": exists, "tech": tech, "examples": examples}
-
-    angular_files = [
-        f["path"]
-        for f in files
-        if f["path"].endswith((".ts", ".json")) or f["path"].endswith("package.json")
-    ]
-    if any(f.endswith("main.ts") for f in angular_files) and any(
-        f.endswith("package.json") for f in angular_files
+
+    def __init__(
+        self,
+        tech: str,
+        required: list[tuple],
+        optional: list[tuple] = (),
+        example_suffixes: tuple = (),
+        example_basenames: tuple = (),
+        examples_from_signals: bool = False,
     ):
-        exists = True
-        tech = "Angular"
-        examples = angular_files
-        logging.info(f"Detected Angular UI with files: {examples}")
-        return {"exists": exists, "tech": tech, "examples": examples}
-
-    # Generic HTML/CSS/JS UI detection (any .html file, not just index.html)
-    html_files = [f["path"] for f in files if f["path"].endswith(".html")]
-    css_files = [f["path"] for f in files if f["path"].endswith(".css")]
-    js_files = [f["path"] for f in files if f["path"].endswith(".js")]
-    if html_files:
-        exists = True
-        tech = "HTML/CSS/JS"
-        examples = html_files + css_files + js_files
-        logging.info(f"Detected HTML/CSS/JS UI with files: {examples}")
-        return {"exists": exists, "tech": tech, "examples": examples}
-
-    logging.info("No specific UI technology detected.")
-    return {"exists": exists, "tech": tech, "examples": examples}
+        self.tech = tech
+        self.required = list(required)
+        self.optional = list(optional)
+        self.example_suffixes = example_suffixes
+        self.example_basenames = example_basenames
+        self.examples_from_signals = examples_from_signals
+
+    @staticmethod
+    def _match(index: TreeIndex, signal: tuple) -> list[int]:
+        """Returns the tree positions of the files matching a signal."""
+        kind, args = signal[1], signal[2:]
+        if kind == "basename":
+            return index.basename_positions(args[0])
+        if kind == "suffix":
+            return index.suffix_positions(args[0])
+        if kind == "path_contains":
+            text, suffixes = args
+            paths = index.paths
+            return [i for i in index.suffix_positions(suffixes) if text in paths[i].lower()]
+        if kind == "in_dir":
+            dirname, suffixes = args
+            paths = index.paths
+            prefix, infix = f"{dirname}/", f"/{dirname}/"
+            return [
+                i
+                for i in index.suffix_positions(suffixes)
+                if paths[i].startswith(prefix) or infix in paths[i]
+            ]
+        raise ValueError(f"Unknown UI rule signal kind: {kind}")
+
+    def evaluate(self, index: TreeIndex) -> dict | None:
+        """
+        Returns a candidate with its confidence and the tree positions of its
+        example files, or None if a required signal does not match.
+        """
+        confidence = 0.0
+        signal_matches = []
+        for signal in self.required:
+            matches = self._match(index, signal)
+            if not matches:
+                return None
+            confidence += signal[0]
+            signal_matches.append(matches)
+        for signal in self.optional:
+            if self._match(index, signal):
+                confidence += signal[0]
+
+        if self.examples_from_signals:
+            positions = index.merge(signal_matches)
+        else:
+            positions = index.merge(
+                [
+                    index.suffix_positions(self.example_suffixes),
+                    index.basename_positions(self.example_basenames),
+                ]
+            )
+        return {
+            "tech": self.tech,
+            "confidence": round(min(confidence, 1.0), 2),
+            "positions": positions,
+        }
+
+
+JS_SUFFIXES = (".js", ".jsx", ".ts", ".tsx")
+TEMPLATE_SUFFIXES = (".html", ".jinja", ".jinja2", ".j2")
+
+# Evaluated in order; earlier rules win ties on confidence. Streamlit scores the
+# maximum, so as before it wins over any other UI in the same repository. React
+# only needs tsconfig.json for a higher score, so plain JavaScript apps count too.
+UI_RULES = [
+    UIRule(
+        "Streamlit",
+        required=[(1.0, "path_contains", "streamlit", (".py",))],
+        examples_from_signals=True,
+    ),
+    UIRule(
+        "Next.js",
+        required=[
+            (0.6, "basename", ("next.config.js", "next.config.mjs", "next.config.ts")),
+            (0.3, "basename", ("package.json",)),
+        ],
+        optional=[(0.05, "in_dir", "pages", JS_SUFFIXES), (0.05, "in_dir", "app", JS_SUFFIXES)],
+        example_suffixes=JS_SUFFIXES,
+        example_basenames=("package.json",),
+    ),
+    UIRule(
+        "React",
+        required=[
+            (0.5, "basename", ("App.js", "App.jsx", "App.tsx")),
+            (0.3, "basename", ("package.json",)),
+        ],
+        optional=[(0.15, "basename", ("tsconfig.json",)), (0.05, "basename", ("index.html",))],
+        example_suffixes=JS_SUFFIXES,
+        example_basenames=("package.json",),
+    ),
+    UIRule(
+        "Vue",
+        required=[(0.6, "basename", ("App.vue",)), (0.3, "basename", ("package.json",))],
+        optional=[(0.05, "basename", ("vue.config.js", "vite.config.js", "vite.config.ts"))],
+        example_suffixes=(".vue", ".js"),
+        example_basenames=("package.json",),
+    ),
+    UIRule(
+        "Svelte",
+        required=[(0.5, "suffix", (".svelte",)), (0.3, "basename", ("package.json",))],
+        optional=[(0.15, "basename", ("svelte.config.js", "svelte.config.ts"))],
+        example_suffixes=(".svelte", ".js", ".ts"),
+        example_basenames=("package.json",),
+    ),
+    UIRule(
+        "Angular",
+        required=[(0.4, "basename", ("main.ts",)), (0.2, "basename", ("package.json",))],
+        optional=[(0.35, "basename", ("angular.json",))],
+        example_suffixes=(".ts", ".json"),
+    ),
+    UIRule(
+        "Flask/Jinja",
+        required=[(0.5, "in_dir", "templates", TEMPLATE_SUFFIXES)],
+        optional=[
+            (0.2, "basename", ("app.py", "wsgi.py", "__init__.py")),
+            (0.1, "in_dir", "static", (".css", ".js")),
+        ],
+        example_suffixes=TEMPLATE_SUFFIXES + (".css", ".js"),
+    ),
+    UIRule(
+        "HTML/CSS/JS",
+        required=[(0.5, "suffix", (".html",))],
+        optional=[(0.1, "suffix", (".css",)), (0.05, "suffix", (".js",))],
+        example_suffixes=(".html", ".css", ".js"),
+    ),
+]
+
+
+def register_rule(rule: UIRule, before: str | None = None) -> None:
+    """Adds a UI rule, optionally ahead of the rule for technology `before`."""
+    if before is not None:
+        for i, existing in enumerate(UI_RULES):
+            if existing.tech == before:
+                UI_RULES.insert(i, rule)
+                return
+    UI_RULES.append(rule)
+
+
+def detect_ui(file_tree: dict, rules: list[UIRule] | None = None) -> dict:
+    """
+    Detects if a UI exists in the file tree and infers the technology.
+    Every rule is scored against a single index of the tree; the best scoring
+    candidate becomes the result and all candidates are returned ranked.
+    """
+    index = TreeIndex(file_tree.get("files", []))
+
+    candidates = []
+    for order, rule in enumerate(rules if rules is not None else UI_RULES):
+        candidate = rule.evaluate(index)
+        if candidate is not None:
+            candidates.append((candidate["confidence"], -order, candidate))
+    candidates.sort(key=lambda c: (c[0], c[1]), reverse=True)
+    ranked = [candidate for _, _, candidate in candidates]
+
+    if not ranked:
+        logging.info("No specific UI technology detected.")
+        return {"exists": False, "tech": None, "examples": [], "confidence": 0.0, "candidates": []}
+
+    best = ranked[0]
+    examples = index.to_paths(best["positions"])
+    logging.info(
+        f"Detected {best['tech']} UI (confidence {best['confidence']}) with {len(examples)} files"
+    )
+    return {
+        "exists": True,
+        "tech": best["tech"],
+        "examples": examples,
+        "confidence": best["confidence"],
+        "candidates": [
+            {
+                "tech": c["tech"],
+                "confidence": c["confidence"],
+                "example_count": len(c["positions"]),
+            }
+            for c in ranked
+        ],
+    }
 
 
 def main(file_tree_path: str, out: str):
@@ -100,7 +264,7 @@ def main(file_tree_path: str, out: str):
 
         write_json_file(detection_result, out)
         logging.info(f"UI detection results successfully written to {out}")
-        print(json.dumps(detection_result, indent=2))  # Print for direct output
+        return detection_result
 
     except Exception as e:
         logging.exception(f"An unexpected error occurred in UI Detector: {e}")
@@ -119,4 +283,4 @@ if __name__ == "__main__":
         help="Output JSON file name for detection results (will be saved in the 'data' directory).",
     )
     args = parser.parse_args()
-    main(args.file_tree_path, args.out)
+    print(json.dumps(main(args.file_tree_path, args.out), indent=2))
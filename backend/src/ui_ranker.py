@@ -0,0 +1,310 @@
+import json
+import logging
+import math
+import os
+import posixpath
+import re
+from pathlib import Path
+from typing import Callable
+
+# Upper bound on UI files handed to the LLM crews.
+MAX_UI_FILES = int(os.environ.get("FRONTFREND_MAX_UI_FILES", "5"))
+# Upper bound on related UI files improved together in one crew run.
+MAX_GROUP_FILES = int(os.environ.get("FRONTFREND_MAX_GROUP_FILES", "4"))
+MAX_DEPTH = 8
+MAX_FILES_READ = 2000
+MAX_FILE_BYTES = 256 * 1024
+
+RESOLVE_SUFFIXES = (
+    "",
+    ".tsx",
+    ".ts",
+    ".jsx",
+    ".js",
+    ".mjs",
+    ".vue",
+    ".svelte",
+    ".css",
+    ".scss",
+    ".py",
+    "/index.tsx",
+    "/index.ts",
+    "/index.jsx",
+    "/index.js",
+)
+
+ROOT_BASENAMES = {
+    "index.html": 1.0,
+    "main.tsx": 1.0,
+    "main.ts": 1.0,
+    "main.jsx": 1.0,
+    "main.js": 0.8,
+    "index.tsx": 0.9,
+    "index.jsx": 0.9,
+    "index.js": 0.6,
+    "App.tsx": 0.9,
+    "App.jsx": 0.9,
+    "App.js": 0.9,
+    "App.vue": 0.9,
+    "App.svelte": 0.9,
+    "_app.tsx": 0.9,
+    "_app.js": 0.9,
+    "layout.tsx": 0.8,
+    "page.tsx": 0.8,
+    "streamlit_app.py": 1.0,
+    "app.py": 0.6,
+}
+
+# How "visual" a file type is; breaks ties between equally reachable files.
+SUFFIX_WEIGHTS = {
+    ".html": 0.3,
+    ".tsx": 0.3,
+    ".jsx": 0.3,
+    ".vue": 0.3,
+    ".svelte": 0.3,
+    ".css": 0.25,
+    ".scss": 0.25,
+    ".jinja": 0.25,
+    ".jinja2": 0.25,
+    ".j2": 0.25,
+    ".py": 0.2,
+    ".js": 0.15,
+    ".ts": 0.1,
+}
+
+EXCLUDED_PATTERN = re.compile(
+    r"(^|/)(package(-lock)?\.json|tsconfig[^/]*\.json|[^/]*\.config\.[^/]+|[^/]*\.d\.ts"
+    r"|[^/]*\.(test|spec|stories)\.[^/]+|__tests__/.*|__mocks__/.*)$"
+)
+
+JS_IMPORT_PATTERN = re.compile(
+    r"""(?:import\s+(?:[\w*{}\s,$]+\s+from\s+)?|export\s+[\w*{}\s,$]+\s+from\s+|require\s*\(\s*|import\s*\(\s*)["']([^"']+)["']"""
+)
+HTML_REF_PATTERN = re.compile(
+    r"""<(?:script|link|img|iframe)\b[^>]*?\b(?:src|href)\s*=\s*["']([^"'#?]+)""", re.IGNORECASE
+)
+CSS_IMPORT_PATTERN = re.compile(r"""@import\s+(?:url\()?\s*["']?([^"')\s;]+)""")
+PY_IMPORT_PATTERN = re.compile(r"^\s*(?:from\s+([\w.]+)\s+import|import\s+([\w.]+))", re.MULTILINE)
+ROUTE_PATTERN = re.compile(r"<Route\b|createBrowserRouter|RouterModule\.for|createRouter\s*\(|routes\s*[:=]\s*\[")
+
+
+def extract_references(path: str, content: str) -> list[str]:
+    """Returns the raw import/asset specifiers found in a source file."""
+    suffix = posixpath.splitext(path)[1].lower()
+    if suffix in (".html", ".htm", ".jinja", ".jinja2", ".j2"):
+        refs = HTML_REF_PATTERN.findall(content)
+        # Inline module scripts and Vue/Svelte style blocks can import too
+        refs += JS_IMPORT_PATTERN.findall(content)
+        return refs
+    if suffix in (".css", ".scss", ".sass", ".less"):
+        return CSS_IMPORT_PATTERN.findall(content)
+    if suffix == ".py":
+        return ["py:" + (a or b).replace(".", "/") for a, b in PY_IMPORT_PATTERN.findall(content)]
+    return JS_IMPORT_PATTERN.findall(content)
+
+
+def resolve_reference(source: str, spec: str, known: set[str]) -> str | None:
+    """Resolves an import specifier from `source` to a repository path in `known`."""
+    if spec.startswith(("http:", "https:", "//", "data:")):
+        return None
+    if spec.startswith("py:"):
+        # Python modules resolve from the repository root or the importing file's package
+        module = spec[3:]
+        for base in (module, posixpath.join(posixpath.dirname(source), module)):
+            for suffix in (".py", "/__init__.py"):
+                if base + suffix in known:
+                    return base + suffix
+        return None
+    if spec.startswith("@/"):
+        base = "src/" + spec[2:]
+    elif spec.startswith("/"):
+        base = spec.lstrip("/")
+    elif spec.startswith("."):
+        base = posixpath.normpath(posixpath.join(posixpath.dirname(source), spec))
+    elif posixpath.splitext(source)[1] in (".html", ".htm", ".css", ".scss"):
+        base = posixpath.normpath(posixpath.join(posixpath.dirname(source), spec))
+    else:
+        return None  # Bare package import
+    for suffix in RESOLVE_SUFFIXES:
+        candidate = base + suffix
+        if candidate in known:
+            return candidate
+    return None
+
+
+def package_entry_points(package_json: str, content: str, known: set[str]) -> list[str]:
+    """Returns the files named by a package.json's entry point fields."""
+    try:
+        manifest = json.loads(content)
+    except json.JSONDecodeError:
+        return []
+    entries = []
+    for field in ("source", "main", "module", "browser"):
+        value = manifest.get(field)
+        if isinstance(value, str):
+            spec = value if value.startswith(".") else "./" + value
+            resolved = resolve_reference(package_json, spec, known)
+            if resolved:
+                entries.append(resolved)
+    return entries
+
+
+def make_disk_reader(repo_dir: Path, before_read: Callable[[list[str]], None] | None = None):
+    """Returns a batch reader for files under `repo_dir` that skips large or unreadable files."""
+    repo_dir = Path(repo_dir)
+
+    def read_many(paths: list[str]) -> dict[str, str]:
+        if before_read is not None:
+            before_read(paths)
+        contents = {}
+        for path in paths:
+            full_path = repo_dir / path
+            try:
+                if full_path.stat().st_size > MAX_FILE_BYTES:
+                    continue
+                contents[path] = full_path.read_text(encoding="utf-8", errors="ignore")
+            except OSError:
+                continue
+        return contents
+
+    return read_many
+
+
+def rank_ui_files(
+    candidates: list[str],
+    all_files: list[str],
+    read_many: Callable[[list[str]], dict[str, str]],
+    max_files: int = MAX_UI_FILES,
+) -> list[dict]:
+    """
+    Ranks UI files by importance. Starting from the app's entry points (package.json
+    fields, index.html, main/App files), imports, asset references and route tables
+    are followed breadth-first, one batch read per level; files closer to the root,
+    imported more often or containing routes score higher. Returns the top
+    `max_files` as {"path", "score"} dicts, best first.
+    """
+    known = set(all_files)
+    candidate_set = {c for c in candidates if not EXCLUDED_PATTERN.search(c)}
+    if not candidate_set:
+        return []
+
+    roots = {}
+    for path in candidate_set:
+        weight = ROOT_BASENAMES.get(posixpath.basename(path))
+        if weight:
+            # Prefer shallow entry points over nested ones with the same name
+            roots[path] = weight / (1 + path.count("/") * 0.25)
+
+    # Top-level HTML shells load the bundle even when they are not candidates themselves
+    for path in all_files:
+        if path.count("/") <= 1 and posixpath.basename(path) == "index.html":
+            roots.setdefault(path, ROOT_BASENAMES["index.html"])
+
+    package_jsons = [p for p in candidates if posixpath.basename(p) == "package.json"]
+    for path, content in read_many(package_jsons).items():
+        for entry in package_entry_points(path, content, known):
+            roots[entry] = max(roots.get(entry, 0), 1.0)
+
+    depth = {path: 0 for path in roots}
+    in_degree = {}
+    edges = {}
+    has_routes = set()
+    frontier = sorted(roots, key=roots.get, reverse=True)
+    files_read = 0
+    level = 0
+    while frontier and level < MAX_DEPTH and files_read < MAX_FILES_READ:
+        batch = frontier[: MAX_FILES_READ - files_read]
+        files_read += len(batch)
+        contents = read_many(batch)
+        next_frontier = []
+        for source in batch:
+            content = contents.get(source)
+            if content is None:
+                continue
+            if ROUTE_PATTERN.search(content):
+                has_routes.add(source)
+            for spec in extract_references(source, content):
+                target = resolve_reference(source, spec, known)
+                if target is None or target == source:
+                    continue
+                in_degree[target] = in_degree.get(target, 0) + 1
+                edges.setdefault(source, set()).add(target)
+                if target not in depth:
+                    depth[target] = level + 1
+                    next_frontier.append(target)
+        frontier = next_frontier
+        level += 1
+
+    # Files imported by a route table are pages, the most visible UI units
+    routed = set()
+    for source in has_routes:
+        routed.update(edges.get(source, ()))
+
+    scores = []
+    for path in candidate_set:
+        score = SUFFIX_WEIGHTS.get(posixpath.splitext(path)[1].lower(), 0.0)
+        score += 0.3 * math.log1p(in_degree.get(path, 0))
+        if path in depth:
+            score += 1.0 / (1 + depth[path]) + roots.get(path, 0.0)
+        if path in has_routes:
+            score += 0.3
+        if path in routed:
+            score += 0.2
+        scores.append({"path": path, "score": round(score, 3)})
+
+    scores.sort(key=lambda s: (-s["score"], s["path"]))
+    logging.info(
+        f"Ranked {len(scores)} UI files ({len(depth)} reachable from {len(roots)} entry points); "
+        f"keeping top {max_files}"
+    )
+    return scores[:max_files]
+
+
+def _stem(path: str) -> str:
+    """The path without directory and every suffix: "ui/Button.module.css" -> "ui/Button"."""
+    directory, name = posixpath.split(path)
+    return posixpath.join(directory, name.split(".", 1)[0])
+
+
+def group_ui_files(
+    paths: list[str],
+    read_many: Callable[[list[str]], dict[str, str]],
+    max_group_size: int = MAX_GROUP_FILES,
+) -> list[list[str]]:
+    """
+    Splits UI files into groups improved together: a page with the stylesheets
+    and scripts it references, a component with the stylesheet it imports or
+    that shares its name. Relations are taken best-ranked file first, and a group
+    never grows beyond `max_group_size` files. Groups and their files keep the
+    order of `paths`; a file without relatives is a group of its own.
+    """
+    order = {path: i for i, path in enumerate(paths)}
+    known = set(paths)
+    contents = read_many(list(paths))
+    related = []
+    for path in paths:
+        content = contents.get(path)
+        if content is not None:
+            for spec in extract_references(path, content):
+                target = resolve_reference(path, spec, known)
+                if target is not None and target != path:
+                    related.append((path, target))
+        related += [(path, other) for other in paths if other != path and _stem(other) == _stem(path)]
+
+    group_of = {path: [path] for path in paths}
+    for source, target in related:
+        first, second = group_of[source], group_of[target]
+        if first is second or len(first) + len(second) > max_group_size:
+            continue
+        first.extend(second)
+        for path in second:
+            group_of[path] = first
+
+    groups = []
+    seen = set()
+    for path in paths:
+        group = group_of[path]
+        if id(group) not in seen:
+            seen.add(id(group))
+            groups.append(sorted(group, key=order.get))
+    return groups
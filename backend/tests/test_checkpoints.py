@@ -0,0 +1,75 @@
+import hashlib
+
+from src.checkpoints import Checkpoints, input_key
+from src.overlay import Overlay
+from src.results_store import ResultsStore
+
+
+def test_input_key_depends_on_every_part_and_their_order():
+    key = input_key("detect", {"b": 1, "a": [1, 2]})
+    assert key == input_key("detect", {"a": [1, 2], "b": 1})
+    assert key != input_key("detect", {"a": [2, 1], "b": 1})
+    assert input_key("a", "b") != input_key("b", "a")
+    assert len(key) == 64
+
+
+def test_a_unit_only_counts_as_done_with_its_key(tmp_path):
+    checkpoints = Checkpoints(tmp_path / "checkpoints.json")
+    assert checkpoints.get("fetch", "k1") is None
+    checkpoints.record("fetch", "k1", {"files": 3})
+    assert checkpoints.get("fetch", "k1") == {"files": 3}
+    assert checkpoints.get("fetch", "k2") is None
+    checkpoints.record("detect", "k3")
+    assert checkpoints.get("detect", "k3") == {}
+
+
+def test_records_survive_a_restart(tmp_path):
+    path = tmp_path / "checkpoints.json"
+    Checkpoints(path).record("fetch", "k1", {"files": 3})
+    assert Checkpoints(path).get("fetch", "k1") == {"files": 3}
+
+
+def test_a_corrupt_file_starts_over(tmp_path):
+    path = tmp_path / "checkpoints.json"
+    path.write_text('{"fetch": ')
+    checkpoints = Checkpoints(path)
+    assert checkpoints.get("fetch", "k1") is None
+    checkpoints.record("fetch", "k1")
+    assert Checkpoints(path).get("fetch", "k1") == {}
+
+
+def test_completed_units_come_back_in_recording_order(tmp_path):
+    checkpoints = Checkpoints(tmp_path / "checkpoints.json")
+    checkpoints.record("ui:b.html", "kb", {"n": 1})
+    checkpoints.record("ui:a.html", "ka", {"n": 2})
+    checkpoints.record("ui:c.html", "old", {"n": 3})
+    # Rerecording a unit moves it to the end
+    checkpoints.record("ui:b.html", "kb", {"n": 4})
+    keys = {"ui:a.html": "ka", "ui:b.html": "kb", "ui:c.html": "kc", "ui:d.html": "kd"}
+    assert checkpoints.completed(keys) == [("ui:a.html", {"n": 2}), ("ui:b.html", {"n": 4})]
+
+
+def test_invalidate_forgets_a_unit(tmp_path):
+    path = tmp_path / "checkpoints.json"
+    checkpoints = Checkpoints(path)
+    checkpoints.record("fetch", "k1")
+    checkpoints.invalidate("fetch")
+    checkpoints.invalidate("never-recorded")
+    assert checkpoints.get("fetch", "k1") is None
+    assert Checkpoints(path).get("fetch", "k1") is None
+
+
+def test_every_version_an_overlay_writes_can_be_replayed(tmp_path):
+    # A unit's manifest only holds hashes; the overlay stores what they point at,
+    # even a version that a later unit patched over
+    store = ResultsStore(tmp_path / "blobs")
+    overlay = Overlay(tmp_path / "repo", on_write=store.put)
+    overlay.write("index.html", "<h1>first</h1>")
+    digest = hashlib.sha256(b"<h1>first</h1>").hexdigest()
+    manifest = [{"path": "index.html", "after_sha256": digest}]
+    overlay.write("index.html", "<h1>second</h1>")
+
+    checkpoints = Checkpoints(tmp_path / "checkpoints.json")
+    checkpoints.record("ui:index.html", "k1", {"manifest": manifest})
+    [(_, output)] = checkpoints.completed({"ui:index.html": "k1"})
+    assert store.get(output["manifest"][0]["after_sha256"]) == "<h1>first</h1>"
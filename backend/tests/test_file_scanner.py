@@ -0,0 +1,104 @@
+import shutil
+import subprocess
+
+import pytest
+
+import src.file_scanner
+from src.file_scanner import GitIgnore, scan_directory, scan_git_files
+
+
+def gitignore(tmp_path, text, directory=""):
+    path = tmp_path / directory / ".gitignore"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+    return GitIgnore().extend(directory, str(path))
+
+
+def test_leading_slash_anchors_to_the_gitignore_directory(tmp_path):
+    ignore = gitignore(tmp_path, "/build/\n")
+    assert ignore.ignored("build", True)
+    assert not ignore.ignored("src/build", True)
+    # Directory-only patterns never match files
+    assert not ignore.ignored("build", False)
+
+
+def test_middle_slash_anchors_and_plain_names_match_anywhere(tmp_path):
+    ignore = gitignore(tmp_path, "docs/*.md\n*.log\n")
+    assert ignore.ignored("docs/readme.md", False)
+    assert not ignore.ignored("src/docs/readme.md", False)
+    assert ignore.ignored("debug.log", False)
+    assert ignore.ignored("src/deep/debug.log", False)
+
+
+def test_negation_re_includes_later_matches(tmp_path):
+    ignore = gitignore(tmp_path, "# generated\n*.js\n!keep.js\n\n")
+    assert ignore.ignored("app.js", False)
+    assert not ignore.ignored("src/keep.js", False)
+
+
+def test_nested_gitignore_only_applies_below_its_directory(tmp_path):
+    ignore = gitignore(tmp_path, "/out\n", "web")
+    assert ignore.ignored("web/out", True)
+    assert not ignore.ignored("out", True)
+    assert not ignore.ignored("web/src/out", True)
+
+
+def test_missing_gitignore_changes_nothing(tmp_path):
+    ignore = GitIgnore()
+    assert ignore.extend("", str(tmp_path / ".gitignore")) is ignore
+
+
+@pytest.fixture
+def repo(tmp_path):
+    files = [
+        "index.html",
+        "assets/bundle.js",
+        "src/assets/page.js",
+        "src/app.js",
+        "src/app.log",
+        "node_modules/lib/index.js",
+        "web/.gitignore",
+        "web/out/page.html",
+        "web/src/out/page.html",
+    ] + [f"pages/page{i}.html" for i in range(30)]
+    for name in files:
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(name)
+    (tmp_path / ".gitignore").write_text("/assets/\n*.log\n")
+    (tmp_path / "web" / ".gitignore").write_text("/out/\n")
+    return tmp_path
+
+
+def paths(entries):
+    return sorted(entry["path"] for entry in entries)
+
+
+def test_scan_honors_gitignore_files(repo):
+    found = paths(scan_directory(repo, workers=1))
+    assert "src/assets/page.js" in found and "web/src/out/page.html" in found
+    assert not {"assets/bundle.js", "src/app.log", "web/out/page.html"} & set(found)
+    assert not any(path.startswith("node_modules/") for path in found)
+
+
+def test_parallel_scan_matches_the_serial_one(monkeypatch, repo):
+    # Small batches and buffers make the walks hand over entries many times
+    monkeypatch.setattr(src.file_scanner, "SCAN_BATCH", 3)
+    monkeypatch.setattr(src.file_scanner, "SCAN_BUFFER", 1)
+    serial = sorted(scan_directory(repo, workers=1), key=lambda entry: entry["path"])
+    assert sorted(scan_directory(repo, workers=4), key=lambda entry: entry["path"]) == serial
+
+
+def test_parallel_scan_can_stop_early(monkeypatch, repo):
+    monkeypatch.setattr(src.file_scanner, "SCAN_BATCH", 1)
+    monkeypatch.setattr(src.file_scanner, "SCAN_BUFFER", 1)
+    entries = scan_directory(repo, workers=2)
+    first = [next(entries) for _ in range(5)]
+    entries.close()
+    assert len(first) == 5
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="git is not installed")
+def test_git_scan_matches_the_directory_scan(repo):
+    subprocess.run(["git", "init", "-q", str(repo)], check=True)
+    assert paths(scan_git_files(repo)) == paths(scan_directory(repo))
@@ -0,0 +1,70 @@
+import pytest
+
+import src.llm_cache
+from models.models import LLMConfig
+from src.llm_cache import LLMCache, create_llm
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return LLMCache(tmp_path / "responses.sqlite")
+
+
+def test_get_returns_what_was_put(cache):
+    cache.put("key", "model", "an answer")
+    assert cache.get("key") == "an answer"
+    assert cache.get("other") is None
+    stats = cache.stats()
+    assert (stats["stores"], stats["hits"], stats["misses"]) == (1, 1, 1)
+
+
+def test_count_is_reported_in_stats(cache):
+    cache.count("bypassed")
+    cache.count("bypassed", 2)
+    assert cache.stats()["bypassed"] == 3
+
+
+def test_create_llm_copies_the_pooled_llm(monkeypatch, cache):
+    pytest.importorskip("crewai")
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setattr(src.llm_cache, "_base_llms", {})
+    config = LLMConfig(model_name="openai/gpt-4o-mini", temperature=0.1)
+
+    base = src.llm_cache.get_base_llm(config)
+    llm = create_llm(config, cache=cache)
+    assert llm is not base
+    assert src.llm_cache.get_base_llm(config) is base
+    # The copy shares the SDK client but not the token usage
+    assert llm._client is base._client
+    assert llm._token_usage is not base._token_usage
+    assert llm.call != base.call
+
+
+class FakeLLM:
+    """A stand-in that is not a pydantic model."""
+
+    def __init__(self):
+        # Copies share the list, as crewai's copies share their client
+        self.calls = []
+
+    def call(self, messages, **kwargs):
+        self.calls.append(messages)
+        return f"answer {len(self.calls)}"
+
+
+def test_bypass_calls_the_model_and_stores_the_answer(monkeypatch, cache):
+    base = FakeLLM()
+    monkeypatch.setattr(src.llm_cache, "get_base_llm", lambda config: base)
+    config = LLMConfig(model_name="fake", temperature=0)
+    messages = [{"role": "user", "content": "hello"}]
+
+    cached = create_llm(config, cache=cache)
+    assert cached is not base
+    assert cached.call(messages) == "answer 1"
+    assert cached.call(messages) == "answer 1"
+
+    bypassing = create_llm(config, cache=cache, use_cache=False)
+    assert bypassing.call(messages) == "answer 2"
+    stats = cache.stats()
+    assert (stats["bypassed"], stats["hits"], stats["stores"]) == (1, 1, 2)
+    assert cached.call(messages) == "answer 2"
@@ -0,0 +1,119 @@
+import pytest
+
+from src.patching import (
+    PatchError,
+    apply_edit_blocks,
+    apply_generation,
+    parse_edit_blocks,
+    parse_unified_diff,
+    split_by_file,
+    validate,
+)
+
+ORIGINAL = """def greet(name):
+    return "Hello " + name
+
+
+def farewell(name):
+    return "Bye " + name
+"""
+
+
+def edit_block(search, replace, indent=""):
+    lines = [
+        "<<<<<<< SEARCH",
+        *search.splitlines(),
+        "=======",
+        *replace.splitlines(),
+        ">>>>>>> REPLACE",
+    ]
+    return "".join(indent + line + "\n" for line in lines)
+
+
+def test_edit_blocks_replace_the_matching_text():
+    output = "Here is the change:\n" + edit_block(
+        '    return "Hello " + name', '    return f"Hello {name}!"'
+    )
+    content, mode = apply_generation("app.py", ORIGINAL, output)
+    assert mode == "edit_blocks"
+    assert content == ORIGINAL.replace('"Hello " + name', 'f"Hello {name}!"')
+
+
+def test_indented_markers_are_dedented():
+    output = edit_block(
+        'def farewell(name):\n    return "Bye " + name',
+        'def farewell(name):\n    return "See you"',
+        "    ",
+    )
+    assert parse_edit_blocks(output) == [
+        (
+            'def farewell(name):\n    return "Bye " + name\n',
+            'def farewell(name):\n    return "See you"\n',
+        )
+    ]
+    content, _ = apply_generation("app.py", ORIGINAL, output)
+    assert 'return "See you"' in content and '"Bye "' not in content
+
+
+def test_search_text_must_match_exactly_once():
+    with pytest.raises(PatchError, match="not found"):
+        apply_edit_blocks(ORIGINAL, [("return 42\n", "return 0\n")])
+    with pytest.raises(PatchError, match="matches 2 places"):
+        apply_edit_blocks(ORIGINAL, [("return ", "yield ")])
+
+
+def test_trailing_whitespace_is_tolerated():
+    content = apply_edit_blocks(ORIGINAL, [("def greet(name):   \n", "def greet(person):\n")])
+    assert content.startswith("def greet(person):\n")
+
+
+def test_empty_search_appends():
+    assert apply_edit_blocks("a = 1", [("", "b = 2\n")]) == "a = 1\nb = 2\n"
+
+
+def test_unified_diff_is_applied_by_context():
+    diff = """--- a/app.py
++++ b/app.py
+@@ -40,2 +40,2 @@
+ def farewell(name):
+-    return "Bye " + name
++    return "Goodbye " + name
+"""
+    assert parse_unified_diff(diff) == [
+        (
+            40,
+            ["def farewell(name):", '    return "Bye " + name'],
+            ["def farewell(name):", '    return "Goodbye " + name'],
+        )
+    ]
+    content, mode = apply_generation("app.py", ORIGINAL, diff)
+    assert mode == "unified_diff"
+    assert content == ORIGINAL.replace('"Bye "', '"Goodbye "')
+
+
+def test_full_file_needs_a_code_block():
+    output = "The file now reads:\n```python\nprint('hi')\n```\nThat should do it."
+    assert apply_generation("app.py", ORIGINAL, output) == ("print('hi')\n", "full_file")
+    with pytest.raises(PatchError):
+        apply_generation("app.py", ORIGINAL, "I could not find anything to improve.")
+    with pytest.raises(PatchError):
+        apply_generation("app.py", ORIGINAL, output, allow_full_file=False)
+
+
+def test_edits_that_break_the_syntax_are_rejected():
+    output = edit_block("def greet(name):", "def greet(name")
+    with pytest.raises(PatchError, match="does not parse"):
+        apply_generation("app.py", ORIGINAL, output)
+    with pytest.raises(PatchError):
+        validate("data.json", "{")
+    validate("style.css", "not checked {")
+
+
+def test_split_by_file_matches_headers_to_paths():
+    output = (
+        "FILE: /repo/src/app.py\nfirst\n**FILE: `src/style.css`**\nsecond\nFILE: other.js\nthird\n"
+    )
+    sections = split_by_file(output, ["src/app.py", "src/style.css"])
+    assert sections == {"src/app.py": "\nfirst\n", "src/style.css": "\nsecond\n"}
+    assert split_by_file("no headers", ["only.py"]) == {"only.py": "no headers"}
+    assert split_by_file("no headers", ["a.py", "b.py"]) == {}
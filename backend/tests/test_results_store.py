@@ -0,0 +1,52 @@
+import gzip
+import hashlib
+
+import pytest
+
+from src.results_store import ResultsStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ResultsStore(tmp_path / "blobs")
+
+
+def test_put_returns_the_sha256_and_get_reads_it_back(store):
+    content = "<h1>héllo</h1>\n" * 100
+    digest = store.put(content)
+    assert digest == hashlib.sha256(content.encode("utf-8")).hexdigest()
+    assert store.get(digest) == content
+    assert gzip.decompress(store.get_compressed(digest)) == content.encode("utf-8")
+
+
+def test_identical_contents_are_stored_once(store):
+    assert store.put("same") == store.put("same")
+    assert [path.name for path in store.blobs_dir.iterdir()] == [store.put("same") + ".gz"]
+
+
+@pytest.mark.parametrize("digest", ["", "abc", "../" + "0" * 61, "A" * 64, "g" * 64])
+def test_malformed_digests_are_rejected(store, digest):
+    with pytest.raises(FileNotFoundError):
+        store.get_compressed(digest)
+
+
+def test_unknown_digests_raise(store):
+    with pytest.raises(FileNotFoundError):
+        store.get("0" * 64)
+
+
+def test_add_file_describes_both_versions(store):
+    entry = store.add_file(2, "src/app.js", "let a = 1;\n", "const a = 1;\n")
+    assert entry == {
+        "index": 2,
+        "path": "src/app.js",
+        "before_sha256": hashlib.sha256(b"let a = 1;\n").hexdigest(),
+        "after_sha256": hashlib.sha256(b"const a = 1;\n").hexdigest(),
+        "before_bytes": 11,
+        "after_bytes": 13,
+        "changed": True,
+    }
+    assert store.get(entry["before_sha256"]) == "let a = 1;\n"
+    unchanged = store.add_file(3, "index.html", "x", "x")
+    assert not unchanged["changed"]
+    assert unchanged["before_sha256"] == unchanged["after_sha256"]
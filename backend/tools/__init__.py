@@ -1 +1 @@
-from .tools import read_file, write_file
+from .tools import WriteTracker, make_context_tools, make_file_tools, read_file, write_file
@@ -1,53 +1,282 @@
+import hashlib
+import threading
 from pathlib import Path
 from crewai.tools import tool
 
+from src.context_packer import READ_TOKEN_BUDGET, outline, pack_file, read_range
+from utils import telemetry
+
 REPO_ROOT_PATH = Path(__file__).parent.parent.parent.joinpath("repo").resolve()
 
 
-@tool("file_reader")
-def read_file(file_path: str) -> str:
+def _digest(content: str | None) -> str | None:
+    if content is None:
+        return None
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+class WriteTracker:
     """
-    Reads the content of a file, but only if it is within the repository's root directory.
-    The file_path should be relative to the repository root.
+    Coordinates the file writes of crews that share one checkout. Writes to the
+    same path are serialized, the content each path had before its first write is
+    kept, and a write from a crew that has not seen the latest version written by
+    another crew is rejected and recorded as a conflict.
     """
-    try:
-        # Construct the full path from the root and the relative file_path.
-        full_path = REPO_ROOT_PATH.joinpath(file_path).resolve()
 
-        # Security Check: Ensure the resolved path is still within the repo_root.
-        if REPO_ROOT_PATH not in full_path.parents and full_path != REPO_ROOT_PATH:
-            return f"Error: Access denied. Attempted to read a file outside of the repository root: {file_path}"
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._path_locks = {}
+        self._seen = {}
+        self.originals = {}
+        self.writers = {}
+        self.conflicts = []
+        self._revoked = set()
+
+    def path_lock(self, path: str) -> threading.Lock:
+        with self._lock:
+            return self._path_locks.setdefault(path, threading.Lock())
+
+    def saw(self, owner: str, path: str, content: str | None) -> None:
+        """Records the version of `path` that `owner` last read or wrote."""
+        with self._lock:
+            self._seen[(owner, path)] = _digest(content)
+
+    def check_write(self, owner: str, path: str, current: str | None) -> str | None:
+        """
+        Called with the path lock held before `owner` writes `path`. Returns the
+        crew whose changes would be lost, or None if the write may proceed.
+        """
+        with self._lock:
+            if owner in self._revoked:
+                return owner
+            others = [w for w in self.writers.get(path, ()) if w != owner]
+            if others and self._seen.get((owner, path)) != _digest(current):
+                self.conflicts.append({"path": path, "owner": owner, "overwrites": others[-1]})
+                return others[-1]
+            self.originals.setdefault(path, current)
+            return None
+
+    def revoke(self, owner: str) -> None:
+        """Rejects every further write from `owner`, e.g. after its task timed out."""
+        with self._lock:
+            self._revoked.add(owner)
+
+    def paths_written_by(self, owner: str) -> list[str]:
+        with self._lock:
+            return [path for path, writers in self.writers.items() if owner in writers]
+
+    def wrote(self, owner: str, path: str, content: str) -> None:
+        with self._lock:
+            self.writers.setdefault(path, []).append(owner)
+            self._seen[(owner, path)] = _digest(content)
+
+
+class FileAccessError(Exception):
+    """Raised when a repository file is outside the root or does not exist."""
+
+
+def read_repo_file(
+    repo_root: Path, file_path: str, on_missing=None, tracker=None, owner=None, overlay=None
+) -> tuple[str, str]:
+    """
+    Reads `file_path` under `repo_root`, through the overlay if there is one, and
+    returns its repository-relative path and content. Raises FileAccessError,
+    or whatever reading the file raised.
+    """
+    # Construct the full path from the root and the relative file_path.
+    full_path = repo_root.joinpath(file_path).resolve()
+
+    # Security Check: Ensure the resolved path is still within the repo_root.
+    if repo_root not in full_path.parents and full_path != repo_root:
+        raise FileAccessError(
+            f"Access denied. Attempted to read a file outside of the repository root: {file_path}"
+        )
+
+    relative_path = full_path.relative_to(repo_root).as_posix()
+    if overlay is not None:
+        # The overlay holds this run's changes and materializes missing files itself
+        content = overlay.read(relative_path)
+        if content is None:
+            raise FileAccessError(f"File not found at path: {file_path}")
+    else:
+        # Sparse checkouts only materialize files when they are first needed.
+        if not full_path.is_file() and on_missing is not None:
+            on_missing([relative_path])
 
         if not full_path.is_file():
-            return f"Error: File not found at path: {file_path}"
+            raise FileAccessError(f"File not found at path: {file_path}")
 
         with open(full_path, "r", encoding="utf-8") as f:
             content = f.read()
+    telemetry.add("bytes_read", len(content.encode("utf-8")))
+    if tracker is not None:
+        tracker.saw(owner, relative_path, content)
+    return relative_path, content
+
+
+def _read(
+    repo_root: Path,
+    file_path: str,
+    on_missing=None,
+    tracker=None,
+    owner=None,
+    transform=None,
+    overlay=None,
+) -> str:
+    """Reads a file for a tool; failures are reported to the agent as text."""
+    try:
+        relative_path, content = read_repo_file(
+            repo_root, file_path, on_missing, tracker, owner, overlay
+        )
+        if transform is not None:
+            return transform(relative_path, content)
         return content
+    except FileAccessError as e:
+        return f"Error: {e}"
     except Exception as e:
         return f"An error occurred while trying to read the file: {e}"
 
 
-@tool("file_writer")
-def write_file(file_path: str, content: str) -> str:
-    """
-    Writes content to a file, but only if it is within the repository's root directory.
-    The file_path should be relative to the repository root.
-    """
+def _write(
+    repo_root: Path, file_path: str, content: str, tracker=None, owner=None, overlay=None
+) -> str:
     try:
         # Construct the full path from the root and the relative file_path.
-        full_path = REPO_ROOT_PATH.joinpath(file_path).resolve()
+        full_path = repo_root.joinpath(file_path).resolve()
 
         # Security Check: Ensure the resolved path is still within the repo_root.
-        if REPO_ROOT_PATH not in full_path.parents and full_path != REPO_ROOT_PATH:
+        if repo_root not in full_path.parents and full_path != repo_root:
             return f"Error: Access denied. Attempted to write to a file outside of the repository root: {file_path}"
 
-        # Create parent directories if they don't exist
-        full_path.parent.mkdir(parents=True, exist_ok=True)
+        relative_path = full_path.relative_to(repo_root).as_posix()
+        if overlay is not None:
+            store = lambda: overlay.write(relative_path, content)
+            load = lambda: overlay.read(relative_path)
+        else:
+            # Create parent directories if they don't exist
+            full_path.parent.mkdir(parents=True, exist_ok=True)
+            store = lambda: full_path.write_text(content, encoding="utf-8")
+            load = lambda: full_path.read_text(encoding="utf-8") if full_path.is_file() else None
 
-        with open(full_path, "w", encoding="utf-8") as f:
-            f.write(content)
+        if tracker is None:
+            store()
+            return f"File '{file_path}' has been written successfully."
+
+        with tracker.path_lock(relative_path):
+            current = load()
+            other = tracker.check_write(owner, relative_path, current)
+            if other == owner:
+                return f"Error: This task was cancelled; '{file_path}' was not written."
+            if other is not None:
+                return (
+                    f"Error: '{file_path}' was changed by another task ({other}) since you last read it. "
+                    "Read it again with the 'file_reader' tool and re-apply your changes to the new content."
+                )
+            store()
+            tracker.wrote(owner, relative_path, content)
         return f"File '{file_path}' has been written successfully."
 
     except Exception as e:
         return f"An error occurred while trying to write the file: {e}"
+
+
+def make_file_tools(
+    repo_root: Path,
+    on_missing=None,
+    tracker: WriteTracker | None = None,
+    owner: str = "",
+    overlay=None,
+):
+    """
+    Builds a `file_reader`/`file_writer` tool pair confined to `repo_root`, so
+    crews working in different workspaces never see each other's files.
+    `on_missing` is called with a list of relative paths before reporting a
+    file as not found, giving sparse checkouts a chance to materialize it.
+    Crews running concurrently in one checkout share a `tracker`, each under
+    its own `owner` name, to serialize their writes and detect conflicts.
+    With an `overlay` (see src/overlay.py) reads and writes go through it and
+    the checkout is left untouched until the overlay is flushed.
+    """
+    repo_root = Path(repo_root).resolve()
+
+    @tool("file_reader")
+    def read_file(file_path: str) -> str:
+        """
+        Reads the content of a file, but only if it is within the repository's root directory.
+        The file_path should be relative to the repository root.
+        """
+        return _read(repo_root, file_path, on_missing, tracker, owner, overlay=overlay)
+
+    @tool("file_writer")
+    def write_file(file_path: str, content: str) -> str:
+        """
+        Writes content to a file, but only if it is within the repository's root directory.
+        The file_path should be relative to the repository root.
+        """
+        return _write(repo_root, file_path, content, tracker, owner, overlay)
+
+    return read_file, write_file
+
+
+def make_context_tools(
+    repo_root: Path,
+    on_missing=None,
+    budget: int = READ_TOKEN_BUDGET,
+    model: str | None = None,
+    overlay=None,
+):
+    """
+    Builds read-only tools that keep prompts small: a `file_reader` that packs
+    files above `budget` tokens into an outline plus leading sections, and
+    `file_outline`/`file_range_reader` to navigate the rest. Meant for agents
+    that analyze code; agents that rewrite whole files need the full reader.
+    """
+    repo_root = Path(repo_root).resolve()
+
+    @tool("file_reader")
+    def read_packed_file(file_path: str) -> str:
+        """
+        Reads a file within the repository root. The file_path should be relative to the repository root.
+        Large files are returned as an outline with line ranges followed by their first sections;
+        use 'file_range_reader' to read any other part.
+        """
+        return _read(
+            repo_root,
+            file_path,
+            on_missing,
+            transform=lambda path, content: pack_file(path, content, budget, model),
+            overlay=overlay,
+        )
+
+    @tool("file_outline")
+    def outline_file(file_path: str) -> str:
+        """
+        Lists the functions, classes, components, CSS rules or HTML sections of a file
+        with their line ranges and sizes. The file_path should be relative to the repository root.
+        """
+        return _read(
+            repo_root,
+            file_path,
+            on_missing,
+            transform=lambda path, content: outline(path, content, model),
+            overlay=overlay,
+        )
+
+    @tool("file_range_reader")
+    def read_file_range(file_path: str, start_line: int, end_line: int) -> str:
+        """
+        Reads lines start_line to end_line (1-based, inclusive) of a file, each prefixed
+        with its line number. The file_path should be relative to the repository root.
+        """
+        return _read(
+            repo_root,
+            file_path,
+            on_missing,
+            transform=lambda _path, content: read_range(content, start_line, end_line),
+            overlay=overlay,
+        )
+
+    return read_packed_file, outline_file, read_file_range
+
+
+read_file, write_file = make_file_tools(REPO_ROOT_PATH)
@@ -1,2 +1,2 @@
-from .utils import read_json_file, setup_logging, write_json_file
-
+from .utils import read_json_file, setup_logging, write_json_file, write_json_stream
+from .workspace import Workspace
@@ -0,0 +1,333 @@
+"""
+Spans and metrics for the pipeline. A span times one unit of work (the run, a
+phase, a UI file, a model call) and is the parent of the spans started inside
+it; counters added while it is open (tokens, bytes, cache hits, retries) count
+for it and every span around it. Finished spans feed the process-wide metrics,
+served in the Prometheus text format by `render_prometheus`, and are written as
+OpenTelemetry (OTLP/JSON) traces to FRONTFREND_TRACE_FILE when that is set.
+"""
+
+import contextvars
+import functools
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+TRACE_FILE = os.environ.get("FRONTFREND_TRACE_FILE", "")
+SERVICE_NAME = os.environ.get("FRONTFREND_SERVICE_NAME", "frontfrend")
+
+# Upper bounds in seconds; spans range from file reads to whole runs
+DURATION_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+COUNTER_HELP = {
+    "tokens_in": "Estimated prompt tokens sent to the model.",
+    "tokens_out": "Estimated completion tokens received from the model.",
+    "cache_hits": "Model calls answered from the response cache.",
+    "model_calls": "Model calls that were not answered from the response cache.",
+    "retries": "Model calls retried after rate limiting or a transient error.",
+    "queued_seconds": "Seconds model calls waited for the scheduler's quotas.",
+    "bytes_read": "Bytes of repository files read by the crews.",
+    "bytes_written": "Bytes of files written by the crews.",
+}
+
+_current = contextvars.ContextVar("frontfrend_span", default=None)
+# Spans on several threads add to the counters of a shared parent
+_counters_lock = threading.Lock()
+
+
+class Span:
+    """One timed unit of work; create it with `span` or `traced`, not directly."""
+
+    def __init__(self, name: str, parent: "Span | None", attributes: dict):
+        self.name = name
+        self.parent = parent
+        self.root = parent.root if parent is not None else self
+        self.trace_id = parent.trace_id if parent is not None else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.attributes = dict(attributes)
+        self.counters = {}
+        self.error = None
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self._started = time.perf_counter()
+        self.duration = None
+
+    def set(self, **attributes) -> None:
+        self.attributes.update(attributes)
+
+    def end(self, error: BaseException | None = None) -> None:
+        self.duration = time.perf_counter() - self._started
+        self.end_ns = time.time_ns()
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+        metrics.observe(self)
+        if TRACE_FILE:
+            _exporter.finished(self)
+
+
+def current_span() -> Span | None:
+    return _current.get()
+
+
+class span:
+    """
+    Context manager timing the code it wraps as a child of the current span:
+
+        with span("phase.fetch", clone_mode=clone_mode):
+            ...
+
+    Names are few and fixed (they label metrics); per-item detail such as a
+    path goes into the attributes. An exception marks the span as failed.
+    """
+
+    def __init__(self, name: str, **attributes):
+        self.name = name
+        self.attributes = attributes
+
+    def __enter__(self) -> Span:
+        self._span = Span(self.name, _current.get(), self.attributes)
+        self._token = _current.set(self._span)
+        return self._span
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        _current.reset(self._token)
+        self._span.end(exc)
+
+
+def traced(name: str):
+    """Decorator running every call of a function in a span called `name`."""
+
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+def add(counter: str, amount: float = 1) -> None:
+    """Adds to `counter` of the current span and the spans around it, and to its metric."""
+    current = _current.get()
+    metrics.count(counter, current.name if current is not None else "", amount)
+    with _counters_lock:
+        while current is not None:
+            current.counters[counter] = current.counters.get(counter, 0) + amount
+            current = current.parent
+
+
+def in_context(function):
+    """
+    Binds `function` to a copy of the caller's context, so spans it starts on
+    another thread (an executor or a plain Thread) keep their parent. Bind once
+    per submitted call; a context cannot be entered by two threads at once.
+    """
+    context = contextvars.copy_context()
+    return functools.partial(context.run, function)
+
+
+class Metrics:
+    """Counters, span duration histograms and gauges of this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._durations = {}
+        self._errors = {}
+        self._gauges = {}
+
+    def count(self, counter: str, span_name: str, amount: float) -> None:
+        with self._lock:
+            key = (counter, span_name)
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, finished: Span) -> None:
+        with self._lock:
+            buckets = self._durations.setdefault(finished.name, [0] * (len(DURATION_BUCKETS) + 2))
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if finished.duration <= bound:
+                    buckets[i] += 1
+            buckets[-2] += 1
+            buckets[-1] += finished.duration
+            if finished.error is not None:
+                self._errors[finished.name] = self._errors.get(finished.name, 0) + 1
+
+    def register_gauge(self, name: str, help_text: str, read, label: str | None = None) -> None:
+        """
+        Adds a gauge that is read when the metrics are rendered. `read()` returns
+        a number, or with a `label`, a {label value: number} dict.
+        """
+        with self._lock:
+            self._gauges[name] = (help_text, read, label)
+
+    def render(self) -> str:
+        with self._lock:
+            counters = dict(self._counters)
+            durations = {name: list(buckets) for name, buckets in self._durations.items()}
+            errors = dict(self._errors)
+            gauges = dict(self._gauges)
+
+        lines = []
+        for counter in sorted({counter for counter, _span in counters}):
+            name = f"frontfrend_{counter}_total"
+            lines += [f"# HELP {name} {COUNTER_HELP.get(counter, counter)}", f"# TYPE {name} counter"]
+            for (other, span_name), value in sorted(counters.items()):
+                if other == counter:
+                    lines.append(f"{name}{_labels(span=span_name)} {_number(value)}")
+
+        name = "frontfrend_span_duration_seconds"
+        lines += [f"# HELP {name} Duration of pipeline spans.", f"# TYPE {name} histogram"]
+        for span_name, buckets in sorted(durations.items()):
+            for bound, count in zip(DURATION_BUCKETS, buckets):
+                lines.append(f"{name}_bucket{_labels(span=span_name, le=_number(bound))} {count}")
+            lines.append(f'{name}_bucket{_labels(span=span_name, le="+Inf")} {buckets[-2]}')
+            lines.append(f"{name}_sum{_labels(span=span_name)} {_number(buckets[-1])}")
+            lines.append(f"{name}_count{_labels(span=span_name)} {buckets[-2]}")
+
+        name = "frontfrend_span_errors_total"
+        lines += [f"# HELP {name} Pipeline spans that ended with an error.", f"# TYPE {name} counter"]
+        for span_name, count in sorted(errors.items()):
+            lines.append(f"{name}{_labels(span=span_name)} {count}")
+
+        for name, (help_text, read, label) in sorted(gauges.items()):
+            try:
+                value = read()
+            except Exception:
+                logging.exception(f"Reading gauge {name} failed")
+                continue
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+            if label is None:
+                lines.append(f"{name} {_number(value)}")
+                continue
+            for sample, number in sorted(value.items()):
+                lines.append(f"{name}{_labels(**{label: sample})} {_number(number)}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(**labels) -> str:
+    def escape(value) -> str:
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+    return "{" + ",".join(f'{key}="{escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _number(value: float) -> str:
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+metrics = Metrics()
+
+
+def render_prometheus() -> str:
+    """The metrics of this process in the Prometheus text exposition format."""
+    return metrics.render()
+
+
+def register_gauge(name: str, help_text: str, read, label: str | None = None) -> None:
+    metrics.register_gauge(name, help_text, read, label)
+
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", PROMETHEUS_CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """Serves `/metrics` on `port` from a daemon thread, for processes without a web app."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
+
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    if isinstance(value, (list, tuple)):
+        return {"arrayValue": {"values": [_otlp_value(item) for item in value]}}
+    return {"stringValue": str(value)}
+
+
+def _otlp_span(finished: Span) -> dict:
+    with _counters_lock:
+        attributes = {**finished.attributes, **finished.counters}
+    encoded = {
+        "traceId": finished.trace_id,
+        "spanId": finished.span_id,
+        "name": finished.name,
+        "kind": 1,  # SPAN_KIND_INTERNAL
+        "startTimeUnixNano": str(finished.start_ns),
+        "endTimeUnixNano": str(finished.end_ns),
+        "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items()],
+        # STATUS_CODE_ERROR, or STATUS_CODE_UNSET
+        "status": {"code": 2, "message": finished.error} if finished.error is not None else {},
+    }
+    if finished.parent is not None:
+        encoded["parentSpanId"] = finished.parent.span_id
+    return encoded
+
+
+class TraceExporter:
+    """
+    Collects the finished spans of each trace and appends the trace to `path`
+    as one OTLP/JSON line once its root span ends (the format of the
+    OpenTelemetry Collector's file exporter). Spans ending after their root,
+    such as those of an abandoned crew, are appended on their own.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._pending = {}
+
+    def finished(self, finished: Span) -> None:
+        with self._lock:
+            spans = self._pending.setdefault(finished.trace_id, [])
+            spans.append(_otlp_span(finished))
+            if finished.root is not finished and finished.root.end_ns is None:
+                return
+            del self._pending[finished.trace_id]
+            line = json.dumps(
+                {
+                    "resourceSpans": [
+                        {
+                            "resource": {
+                                "attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]
+                            },
+                            "scopeSpans": [{"scope": {"name": "frontfrend"}, "spans": spans}],
+                        }
+                    ]
+                },
+                separators=(",", ":"),
+            )
+            try:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+            except OSError as e:
+                logging.warning(f"Could not write trace to {self.path}: {e}")
+
+
+_exporter = TraceExporter(TRACE_FILE)
@@ -29,14 +29,39 @@ def read_json_file(file_name: str) -> dict:
         logging.error(f"Error decoding JSON from {data_file_path}. Ensure it's a valid JSON file.")
         raise
 
-def write_json_file(data: dict, file_name: str):
-    """Writes a dictionary to a JSON file in the 'data' directory."""
+def write_json_file(data: dict, file_name: str, indent: int | None = 2):
+    """Writes a dictionary to a JSON file in the 'data' directory; indent=None writes it compactly."""
     data_dir = Path(__file__).parent.parent.parent / "data"
     data_dir.mkdir(parents=True, exist_ok=True)
     data_file_path = data_dir / file_name
     try:
         with open(data_file_path, "w") as f:
-            json.dump(data, f, indent=2)
+            if indent is None:
+                json.dump(data, f, separators=(",", ":"))
+            else:
+                json.dump(data, f, indent=indent)
     except Exception as e:
         logging.error(f"Error writing JSON to {data_file_path}: {e}")
         raise
+
+def write_json_stream(items, file_name: str, key: str = "files") -> int:
+    """
+    Writes `{key: [...items]}` to a JSON file in the 'data' directory one item at a
+    time, so arbitrarily long iterables are never held in memory. Returns the item count.
+    """
+    data_dir = Path(__file__).parent.parent.parent / "data"
+    data_dir.mkdir(parents=True, exist_ok=True)
+    data_file_path = data_dir / file_name
+    count = 0
+    try:
+        with open(data_file_path, "w") as f:
+            f.write(f"{{{json.dumps(key)}: [")
+            for item in items:
+                f.write(",\n" if count else "\n")
+                f.write(json.dumps(item, separators=(",", ":")))
+                count += 1
+            f.write("\n]}\n")
+    except Exception as e:
+        logging.error(f"Error writing JSON to {data_file_path}: {e}")
+        raise
+    return count
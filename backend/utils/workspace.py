@@ -0,0 +1,82 @@
+import logging
+import os
+import shutil
+import stat
+import uuid
+from pathlib import Path
+
+WORKSPACES_DIR = Path(__file__).parent.parent.parent / "workspaces"
+
+
+def _remove_readonly(func, path, _exc_info):
+    """Clears the read-only bit (set on git objects on Windows) and retries."""
+    os.chmod(path, stat.S_IWRITE)
+    func(path)
+
+
+class Workspace:
+    """
+    An isolated directory for a single workflow run, holding the repository
+    checkout and every artifact the pipeline phases read and write.
+    """
+
+    def __init__(self, workspace_id: str | None = None, base_dir: Path = WORKSPACES_DIR):
+        self.id = workspace_id or uuid.uuid4().hex
+        self.root = Path(base_dir) / self.id
+        self.repo_dir = self.root / "repo"
+        self.data_dir = self.root / "data"
+
+    @property
+    def file_tree_path(self) -> Path:
+        return self.data_dir / "file_tree.json"
+
+    @property
+    def ui_detection_path(self) -> Path:
+        return self.data_dir / "ui_detection_output.json"
+
+    @property
+    def results_path(self) -> Path:
+        return self.data_dir / "workflow_results.json"
+
+    @property
+    def blobs_dir(self) -> Path:
+        return self.data_dir / "blobs"
+
+    @property
+    def preview_dir(self) -> Path:
+        return self.data_dir / "preview"
+
+    @property
+    def patch_path(self) -> Path:
+        return self.data_dir / "changes.patch"
+
+    @property
+    def checkpoints_path(self) -> Path:
+        return self.data_dir / "checkpoints.json"
+
+    def create(self) -> "Workspace":
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        return self
+
+    def cleanup(self) -> None:
+        """Removes the workspace directory and everything in it."""
+        if self.root.exists():
+            shutil.rmtree(self.root, onerror=_remove_readonly)
+            logging.info(f"Removed workspace {self.root}")
+
+    def __enter__(self) -> "Workspace":
+        return self.create()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.cleanup()
+
+    @staticmethod
+    def sweep(base_dir: Path = WORKSPACES_DIR) -> None:
+        """Removes every workspace left behind under `base_dir` by a previous process."""
+        base_dir = Path(base_dir)
+        if not base_dir.exists():
+            return
+        for path in base_dir.iterdir():
+            if path.is_dir():
+                shutil.rmtree(path, onerror=_remove_readonly)
+                logging.info(f"Removed stale workspace {path}")
@@ -0,0 +1,159 @@
+"""
+Pipeline worker process. Claims queued jobs from the shared job store and runs
+the workflow for them, so heavy runs never share a process with API requests:
+
+    python worker.py --processes 2 --concurrency 4
+
+Every process runs up to `--concurrency` jobs at once and keeps renewing the
+leases of its jobs; when a worker dies, another one claims its jobs once the
+leases expire and resumes them from their checkpoints. The LLM rate limits of
+src/llm_scheduler.py apply per process, so divide the provider quota by the
+number of processes.
+"""
+
+import argparse
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.job_manager import run_job
+from src.job_store import JOB_STORE_PATH, LEASE_SECONDS, POLL_SECONDS, JobStore
+from src.llm_scheduler import DEFAULT_PRIORITY
+from src.repo_cache import DEFAULT_CLONE_MODE
+from utils import telemetry
+from utils.workspace import Workspace
+
+# Jobs each worker process runs at the same time
+MAX_CONCURRENT_JOBS = int(os.environ.get("FRONTFREND_MAX_WORKERS", "4"))
+
+
+def workflow_runner(
+    job, clone_mode=DEFAULT_CLONE_MODE, use_llm_cache=True, priority=DEFAULT_PRIORITY
+):
+    """Runs workflow.main for a single job in its own workspace and returns its results."""
+    # Imported on the first job, so starting a worker does not wait for the crew stacks
+    from workflow import main as run_workflow_main
+
+    job.workspace = Workspace(job.id).create()
+    results = run_workflow_main(
+        job.repo_url,
+        job.user_preferences,
+        job.workspace,
+        clone_mode=clone_mode,
+        use_llm_cache=use_llm_cache,
+        on_event=job.emit,
+        priority=priority,
+    )
+    if results:
+        results = dict(results)
+        results["message"] = "Workflow finished successfully."
+    else:
+        results = {"message": "Workflow finished, but no results were produced."}
+    results["status"] = "completed"
+    results["job_id"] = job.id
+    return results
+
+
+def work(
+    store: JobStore,
+    concurrency: int = MAX_CONCURRENT_JOBS,
+    stop: threading.Event | None = None,
+    runner=workflow_runner,
+) -> None:
+    """Claims and runs jobs until `stop` is set, then waits for the running ones."""
+    stop = stop or threading.Event()
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    slots = threading.BoundedSemaphore(concurrency)
+    running = set()
+    running_lock = threading.Lock()
+
+    def heartbeat():
+        # Runs until the pool has drained, so leases outlive `stop`
+        while not (stop.is_set() and not running):
+            with running_lock:
+                job_ids = list(running)
+            if job_ids:
+                store.renew(job_ids, worker_id)
+            time.sleep(LEASE_SECONDS / 3)
+
+    def finished(job_id):
+        with running_lock:
+            running.discard(job_id)
+        slots.release()
+
+    threading.Thread(target=heartbeat, name="lease-heartbeat", daemon=True).start()
+    telemetry.register_gauge(
+        "frontfrend_jobs_running", "Jobs running in this worker.", lambda: len(running)
+    )
+    logging.info(f"Worker {worker_id} polling {store.db_path} for jobs")
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="workflow") as pool:
+        while not stop.is_set():
+            if not slots.acquire(timeout=POLL_SECONDS):
+                continue
+            job = store.claim(worker_id)
+            if job is None:
+                slots.release()
+                stop.wait(POLL_SECONDS)
+                continue
+            logging.info(f"Worker {worker_id} claimed job {job.id}")
+            with running_lock:
+                running.add(job.id)
+            future = pool.submit(run_job, job, runner)
+            future.add_done_callback(lambda _future, job_id=job.id: finished(job_id))
+
+
+def _serve(db_path: str, concurrency: int, metrics_port: int | None = None) -> None:
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s - %(process)d - %(levelname)s - %(message)s"
+    )
+    if metrics_port is not None:
+        telemetry.start_metrics_server(metrics_port)
+        logging.info(f"Serving metrics on port {metrics_port}")
+    stop = threading.Event()
+    # Finish the running jobs on SIGTERM/SIGINT instead of abandoning them
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda *_args: stop.set())
+    work(JobStore(db_path), concurrency, stop)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run FrontFrEND pipeline workers.")
+    parser.add_argument("--store", default=str(JOB_STORE_PATH), help="Job store database path")
+    parser.add_argument("--processes", type=int, default=1, help="Worker processes to start")
+    parser.add_argument(
+        "--concurrency", type=int, default=MAX_CONCURRENT_JOBS, help="Jobs per process"
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=None,
+        help="Serve Prometheus metrics on this port; process N uses the port plus N",
+    )
+    args = parser.parse_args()
+
+    def metrics_port(index: int) -> int | None:
+        return None if args.metrics_port is None else args.metrics_port + index
+
+    if args.processes == 1:
+        _serve(args.store, args.concurrency, metrics_port(0))
+    else:
+        processes = [
+            multiprocessing.Process(
+                target=_serve, args=(args.store, args.concurrency, metrics_port(index))
+            )
+            for index in range(args.processes)
+        ]
+        for process in processes:
+            process.start()
+        # Children see Ctrl+C themselves; a SIGTERM to the parent is passed on
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(
+            signal.SIGTERM, lambda *_args: [process.terminate() for process in processes]
+        )
+        for process in processes:
+            process.join()
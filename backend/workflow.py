@@ -1,33 +1,38 @@
+import hashlib
 import os
 import sys
 import json
 import subprocess
 import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from pathlib import Path
-
-# Ensure the src directory is in the Python path
-sys.path.append(str(Path(__file__).parent / "src"))
+from typing import Callable
 
 from src.git_details import main as git_details_main
+from src.repo_cache import DEFAULT_CLONE_MODE, materialize
 from src.ui_detector import main as ui_detector_main
-from src.ui_advisor import UIAdvisorCrew
-from src.backend_integrator import BackendIntegration
+from src.ui_ranker import MAX_UI_FILES, make_disk_reader, rank_ui_files
+from src.checkpoints import Checkpoints, input_key
+from src.llm_scheduler import DEFAULT_PRIORITY
+from src.overlay import Overlay
+from src.patching import GENERATION_MODE
+from src.results_store import ResultsStore
 
-from tools.tools import read_file, write_file
 from utils.utils import write_json_file
 
-import time
-from litellm.exceptions import InternalServerError
-
+from utils.telemetry import current_span, in_context, span, traced
 from utils.utils import read_json_file, setup_logging
-from models.models import LLMConfig
+from utils.workspace import Workspace
+from models.models import default_llm_config
 
 # --- Configuration ---
 REPO_URL = "https://github.com/priyank766/RAG-vs-Fine-Tuning"
 PROJECT_ROOT = Path(__file__).parent.parent
-REPO_DIR = PROJECT_ROOT / "repo"
-DATA_DIR = PROJECT_ROOT / "data"
 LOGS_DIR = PROJECT_ROOT / "logs"
+# Backend integrations running at once, and how long each UI file may take
+MAX_PARALLEL_FILES = int(os.environ.get("FRONTFREND_MAX_PARALLEL_FILES", "4"))
+FILE_TIMEOUT_SECONDS = float(os.environ.get("FRONTFREND_FILE_TIMEOUT", "900"))
 
 
 # --- Main Workflow Logic ---
@@ -65,256 +70,540 @@ def run_command(command: list[str], description: str, logger: logging.Logger) ->
         raise e
 
 
-def main(repo_url: str, user_preferences: dict):
+def _file_sha256(path: Path) -> str | None:
+    """Returns the SHA-256 of a file's bytes, or None if it does not exist."""
+    try:
+        return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+    except FileNotFoundError:
+        return None
+
+
+@traced("workflow")
+def main(
+    repo_url: str,
+    user_preferences: dict,
+    workspace: Workspace | None = None,
+    clone_mode: str = DEFAULT_CLONE_MODE,
+    max_ui_files: int = MAX_UI_FILES,
+    use_llm_cache: bool = True,
+    on_event: Callable[..., None] | None = None,
+    max_parallel_files: int = MAX_PARALLEL_FILES,
+    file_timeout: float = FILE_TIMEOUT_SECONDS,
+    priority: str = DEFAULT_PRIORITY,
+    resume: bool = True,
+) -> dict | None:
     """
-    Main function to orchestrate the entire Front FrEND workflow.
+    Runs the Front FrEND pipeline on `repo_url` in `workspace` (a fresh one if
+    not given): fetch the repository, detect and rank its UI files, improve them
+    with the UI advisor crew, and adapt the backend for each changed UI file.
+
+    Crews stage their changes in an overlay, which is flushed to the checkout
+    and saved as a patch only once every phase succeeded. Each phase, advisor
+    group and UI file is checkpointed, so with `resume` a rerun in the same
+    workspace only redoes what did not complete. Progress is reported through
+    `on_event(event_type, message=..., **data)`.
+
+    Returns the aggregated results (changed files by blob hash, the write
+    manifest, and any errors or conflicts), or None when no UI was detected.
     """
+    aggregated_results = None
+    overlay = None
+
     # --- Setup ---
     # Set stdout to utf-8
     sys.stdout.reconfigure(encoding="utf-8")
-    DATA_DIR.mkdir(parents=True, exist_ok=True)
+    workspace = (workspace or Workspace()).create()
+    repo_dir = workspace.repo_dir
+    current_span().set(repo_url=repo_url, workspace=workspace.id, clone_mode=clone_mode)
+    if not resume:
+        workspace.checkpoints_path.unlink(missing_ok=True)
+    checkpoints = Checkpoints(workspace.checkpoints_path)
+    results_store = ResultsStore(workspace.blobs_dir)
+
+    def materialize_files(paths: list[str]) -> None:
+        materialize(repo_dir, paths)
+
+    def emit(event_type: str, message: str, **data) -> None:
+        workflow_logger.info(message)
+        if on_event is not None:
+            on_event(event_type, message=message, **data)
+
+    def skip_phase(name: str, phase: str, progress: int) -> None:
+        emit(
+            "phase_completed",
+            f"--- Skipped: {name} (completed in an earlier attempt) ---",
+            phase=phase,
+            progress=progress,
+            resumed=True,
+        )
+
+    def record_unit(unit: str, key: str, manifest: list[dict]) -> None:
+        """
+        Checkpoints a crew's unit of work. The overlay already stored every version
+        it wrote as a blob, including ones another crew has patched since.
+        """
+        checkpoints.record(unit, key, {"manifest": manifest})
+
+    def replay_units(keys: dict[str, str], owners: dict[str, str]) -> dict[str, list]:
+        """
+        Writes the changes of the units in `keys` that already completed back into
+        the overlay, in the order they were made, and returns their manifests.
+        A unit whose blobs are gone is invalidated and runs again.
+        """
+        replayed = {}
+        for unit, output in checkpoints.completed(keys):
+            try:
+                contents = [
+                    (entry["path"], results_store.get(entry["after_sha256"]))
+                    for entry in output["manifest"]
+                ]
+            except (OSError, KeyError):
+                workflow_logger.warning(
+                    f"Checkpoint of {unit} is incomplete; rerunning it."
+                )
+                checkpoints.invalidate(unit)
+                continue
+            for path, content in contents:
+                overlay.write(path, content)
+                write_tracker.wrote(owners[unit], path, content)
+            replayed[unit] = output["manifest"]
+        return replayed
+
     LOGS_DIR.mkdir(parents=True, exist_ok=True)
     workflow_log_path = LOGS_DIR / "workflow.log"
     setup_logging(str(workflow_log_path))
     workflow_logger = logging.getLogger()
 
     # Force LiteLLM to use the model defined in LLMConfig
-    os.environ["LITELLM_MODEL"] = LLMConfig().model_name
+    model_name = default_llm_config().model_name
+    os.environ["LITELLM_MODEL"] = model_name
     workflow_logger.info(
         f"Configured LiteLLM to use model: {os.environ['LITELLM_MODEL']}"
     )
 
-    workflow_logger.info(f"Starting workflow for repository: {repo_url}")
-
-    file_tree_json_path = DATA_DIR / "file_tree.json"
-    print("--- Starting: Phase 1: Fetching Git Tree ---")
-    workflow_logger.info("--- Starting: Phase 1: Fetching Git Tree ---")
-    try:
-        git_details_main(repo_url, str(file_tree_json_path))
-        workflow_logger.info("--- Completed: Phase 1: Fetching Git Tree ---")
-        print("--- Completed: Phase 1: Fetching Git Tree ---")
-    except Exception as e:
-        workflow_logger.exception("ERROR during Fetching Git Tree.")
-        raise e
-
-    ui_detection_json_path = DATA_DIR / "ui_detection_output.json"
-    print("--- Starting: Phase 2: UI Detection and Analysis ---")
-    workflow_logger.info("--- Starting: Phase 2: UI Detection and Analysis ---")
-    try:
-        ui_detector_main(str(file_tree_json_path), str(ui_detection_json_path))
-        workflow_logger.info("--- Completed: Phase 2: UI Detection and Analysis ---")
-        print("--- Completed: Phase 2: UI Detection and Analysis ---")
-    except Exception as e:
-        workflow_logger.exception("ERROR during UI Detection and Analysis.")
-        raise e
+    workflow_logger.info(
+        f"Starting workflow for repository: {repo_url} in workspace {workspace.root}"
+    )
 
-    print("--- Starting: Phase 3.1: UI Advisor ---")
-    workflow_logger.info("--- Starting: Phase 3.1: UI Advisor ---")
+    run_key = input_key(
+        "run",
+        repo_url,
+        user_preferences,
+        clone_mode,
+        max_ui_files,
+        model_name,
+        GENERATION_MODE,
+    )
+    finished = checkpoints.get("run", run_key)
+    if finished is not None:
+        emit(
+            "phase_completed",
+            "--- Workflow already completed in an earlier attempt ---",
+            phase="done",
+            progress=100,
+            resumed=True,
+        )
+        if not finished["has_results"]:
+            return None
+        return read_json_file(workspace.results_path)
+
+    file_tree_json_path = workspace.file_tree_path
+    fetch_key = input_key("fetch", repo_url, clone_mode)
+    fetched = checkpoints.get("fetch", fetch_key)
+    if (
+        fetched is not None
+        and repo_dir.is_dir()
+        and _file_sha256(file_tree_json_path) == fetched["tree_sha256"]
+    ):
+        skip_phase("Phase 1: Fetching Git Tree", "fetch", 15)
+    else:
+        emit(
+            "phase_started",
+            "--- Starting: Phase 1: Fetching Git Tree ---",
+            phase="fetch",
+            progress=0,
+        )
+        try:
+            with span("phase.fetch", clone_mode=clone_mode):
+                git_details_main(
+                    repo_url, str(file_tree_json_path), repo_dir, clone_mode=clone_mode
+                )
+            fetched = {"tree_sha256": _file_sha256(file_tree_json_path)}
+            checkpoints.record("fetch", fetch_key, fetched)
+            emit(
+                "phase_completed",
+                "--- Completed: Phase 1: Fetching Git Tree ---",
+                phase="fetch",
+                progress=15,
+            )
+        except Exception as e:
+            workflow_logger.exception("ERROR during Fetching Git Tree.")
+            raise e
+
+    ui_detection_json_path = workspace.ui_detection_path
+    # Ranking rewrites the detection output in place, so detection is only
+    # skipped together with a ranking that completed for the same detection
+    detect_key = input_key("detect", fetched["tree_sha256"])
+    detected = checkpoints.get("detect", detect_key)
+    ranked = None
+    if detected is not None:
+        rank_key = input_key("rank", detected, max_ui_files)
+        ranked = checkpoints.get("rank", rank_key)
+    if ranked is not None and _file_sha256(ui_detection_json_path) == ranked["sha256"]:
+        skip_phase("Phase 2: UI Detection and Analysis", "detect", 20)
+        skip_phase("Phase 2.1: UI Entry-Point Ranking", "rank", 25)
+    else:
+        emit(
+            "phase_started",
+            "--- Starting: Phase 2: UI Detection and Analysis ---",
+            phase="detect",
+            progress=15,
+        )
+        try:
+            with span("phase.detect"):
+                ui_detector_main(str(file_tree_json_path), str(ui_detection_json_path))
+            detected = {"sha256": _file_sha256(ui_detection_json_path)}
+            checkpoints.record("detect", detect_key, detected)
+            emit(
+                "phase_completed",
+                "--- Completed: Phase 2: UI Detection and Analysis ---",
+                phase="detect",
+                progress=20,
+            )
+        except Exception as e:
+            workflow_logger.exception("ERROR during UI Detection and Analysis.")
+            raise e
+
+        emit(
+            "phase_started",
+            "--- Starting: Phase 2.1: UI Entry-Point Ranking ---",
+            phase="rank",
+            progress=20,
+        )
+        try:
+            with span("phase.rank"):
+                ui_detection_output = read_json_file(ui_detection_json_path)
+                if ui_detection_output.get("exists"):
+                    candidates = ui_detection_output.get("examples", [])
+                    all_files = [
+                        f["path"] for f in read_json_file(file_tree_json_path)["files"]
+                    ]
+                    ranking = rank_ui_files(
+                        candidates,
+                        all_files,
+                        make_disk_reader(repo_dir, before_read=materialize_files),
+                        max_files=max_ui_files,
+                    )
+                    ui_detection_output["candidate_count"] = len(candidates)
+                    ui_detection_output["ranking"] = ranking
+                    ui_detection_output["examples"] = (
+                        [r["path"] for r in ranking]
+                        if ranking
+                        else candidates[:max_ui_files]
+                    )
+                    write_json_file(ui_detection_output, str(ui_detection_json_path))
+                    workflow_logger.info(
+                        f"Selected {len(ui_detection_output['examples'])} of {len(candidates)} UI files: "
+                        f"{ui_detection_output['examples']}"
+                    )
+            ranked = {"sha256": _file_sha256(ui_detection_json_path)}
+            checkpoints.record(
+                "rank", input_key("rank", detected, max_ui_files), ranked
+            )
+            emit(
+                "phase_completed",
+                "--- Completed: Phase 2.1: UI Entry-Point Ranking ---",
+                phase="rank",
+                progress=25,
+            )
+        except Exception as e:
+            workflow_logger.exception("ERROR during UI Entry-Point Ranking.")
+            raise e
+
+    emit(
+        "phase_started",
+        "--- Starting: Phase 3.1: UI Advisor ---",
+        phase="advise",
+        progress=25,
+    )
     try:
         ui_detection_output = read_json_file(ui_detection_json_path)
-        workflow_logger.info(
-            f"Content of ui_detection_output.json: {ui_detection_output}"
-        )
-
         if ui_detection_output.get("exists"):
             workflow_logger.info(f"UI detected: {ui_detection_output.get('tech')}")
             workflow_logger.info(
                 f"Example UI files: {ui_detection_output.get('examples')}"
             )
 
+            # Sparse checkouts only hold top-level files until the UI files are requested
+            materialize_files(ui_detection_output.get("examples", []))
+
+            # The crew stacks (crewai, litellm) load here, on first use, so importing
+            # this module and the phases before the advisor stay fast
+            from src.backend_integrator import BackendIntegration
+            from src.ui_advisor import UIAdvisorCrew
+            from tools.tools import WriteTracker
+
+            # Crews write into an overlay, flushed to the checkout once at the end;
+            # the tracker keeps concurrent crews from overwriting each other
+            write_tracker = WriteTracker()
+            overlay = Overlay(
+                repo_dir, on_missing=materialize_files, on_write=results_store.put
+            )
+
             # Use user preferences directly from argument
             workflow_logger.info(f"User preferences: {user_preferences}")
 
-            # Instantiate and run the UIAdvisorCrew
+            # Determine the UI files for the advisor and for Phase 4
+            examples = ui_detection_output.get("examples", [])
+            if not examples:
+                raise ValueError("UI detection found no example files to process.")
+
+            # Instantiate the UIAdvisorCrew; each group of related UI files is a unit
             advisor_crew = UIAdvisorCrew(
-                repo_path=REPO_DIR,
+                repo_path=repo_dir,
                 ui_detection_output=ui_detection_output,
                 user_preferences=user_preferences,
+                materialize=materialize_files,
+                use_llm_cache=use_llm_cache,
+                write_tracker=write_tracker,
+                priority=priority,
+                overlay=overlay,
             )
-
-            print(
-                "🚀 Kicking off the UI Advisor & Generator Crew... this may take a few moments."
+            groups = advisor_crew.file_groups()
+            advise_key = input_key(
+                "advise", ranked, user_preferences, model_name, GENERATION_MODE
             )
-
-            workflow_logger.info("--- Kicking off UI Advisor Crew ---")
-            result = None
-            max_retries = 2
-            retry_delay = 15  # seconds
-            for attempt in range(max_retries):
-                try:
-                    result = advisor_crew.run()
-                    workflow_logger.info(
-                        f"--- UI Advisor Crew Finished. Result: {result} ---"
-                    )
-                    break  # Success, exit loop
-                except InternalServerError as e:
-                    workflow_logger.warning(
-                        f"Attempt {attempt + 1}/{max_retries} failed with model overload error: {e}"
+            group_units = {
+                tuple(group): "advise:" + "+".join(group) for group in groups
+            }
+            group_keys = {
+                unit: input_key("advise", advise_key, list(group))
+                for group, unit in group_units.items()
+            }
+            advisor_manifests = replay_units(
+                group_keys, dict.fromkeys(group_keys, "ui_advisor")
+            )
+            pending_groups = [
+                group
+                for group in groups
+                if group_units[tuple(group)] not in advisor_manifests
+            ]
+            if not pending_groups:
+                skip_phase("UI Advisor and Generator Crew", "advise", 50)
+            else:
+
+                def group_done(group: list[str], manifest: list[dict]) -> None:
+                    unit = group_units[tuple(group)]
+                    record_unit(unit, group_keys[unit], manifest)
+                    advisor_manifests[unit] = manifest
+                    emit(
+                        "message",
+                        f"--- UI Advisor finished {', '.join(group)} ---",
+                        phase="advise",
                     )
-                    if attempt + 1 < max_retries:
-                        workflow_logger.info(f"Retrying in {retry_delay} seconds...")
-                        time.sleep(retry_delay)
-                        retry_delay *= 2  # Exponential backoff
-                    else:
-                        workflow_logger.error("Max retries reached. Failing.")
-                        raise e
-
-            print("--- ✅ UI Advisor, Generator, and Writer Crew Finished ---")
-            print("Final Result:")
-            print(result)
-
-            # Determine the path to the modified UI file for Phase 4
-            examples = ui_detection_output.get("examples", [])
-            if not examples:
-                raise ValueError("UI detection found no example files to process.")
 
-            all_code_changes = []
+                emit(
+                    "message",
+                    f"🚀 Kicking off the UI Advisor & Generator Crew for {len(pending_groups)} "
+                    f"group(s) of UI files... this may take a few moments.",
+                    phase="advise",
+                )
+                with span("phase.advise", groups=len(pending_groups)):
+                    advisor_crew.run(pending_groups, on_group_done=group_done)
+                for error in advisor_crew.errors:
+                    emit(
+                        "file_failed",
+                        f"The UI Advisor failed for {error['path']}: {error['error']}",
+                        path=error["path"],
+                    )
 
-            for ui_file_for_backend_analysis in examples:
-                workflow_logger.info(
-                    f"--- Processing UI file: {ui_file_for_backend_analysis} ---"
+                emit(
+                    "phase_completed",
+                    "--- ✅ UI Advisor and Generator Crew Finished ---",
+                    phase="advise",
+                    progress=50,
                 )
-                print(f"--- Processing UI file: {ui_file_for_backend_analysis} ---")
+            # In ranking order, whichever group finished first
+            advisor_manifest = [
+                entry
+                for group in groups
+                for entry in advisor_manifests.get(group_units[tuple(group)], ())
+            ]
+            workflow_logger.info(
+                f"--- UI Advisor Crew Finished. Wrote {len(advisor_manifest)} file(s) ---"
+            )
+            manifests = {}
 
-                full_ui_file_path = REPO_DIR / ui_file_for_backend_analysis
-                try:
-                    with open(full_ui_file_path, "r", encoding="utf-8") as f:
-                        original_ui_content = f.read()
-                except Exception as e:
-                    workflow_logger.error(
-                        f"Error reading UI file for backend analysis: {e}"
-                    )
-                    original_ui_content = ""  # Or handle as appropriate
-                file_changes_tracker = {
-                    ui_file_for_backend_analysis: {
-                        "before": original_ui_content,
-                        "after": "",  # Will be filled after UI Advisor
-                    }
-                }
+            # Each UI file is a unit of its own; its key covers what the advisor wrote
+            file_keys = {
+                f"integrate:{ui_file}": input_key(
+                    "integrate", advise_key, advisor_manifest, ui_file
+                )
+                for ui_file in examples
+            }
+            replayed = replay_units(
+                file_keys, {f"integrate:{ui_file}": ui_file for ui_file in examples}
+            )
 
-                print("--- Starting: Phase 4: Backend Code Generation ---")
+            def integrate_ui_file(ui_file: str) -> list[str]:
+                """Runs Phase 4/5 for one UI file and returns the paths it changed."""
+                emit(
+                    "file_started",
+                    f"--- Processing UI file: {ui_file} ---",
+                    path=ui_file,
+                )
+                emit(
+                    "phase_started",
+                    "--- Starting: Phase 4: Backend Code Generation ---",
+                    phase="integrate",
+                    path=ui_file,
+                )
+                backend_integration_crew = BackendIntegration(
+                    repo_path=repo_dir,
+                    frontend_changes_output_path=ui_file,
+                    file_tree_path=file_tree_json_path,
+                    user_preferences=user_preferences,
+                    materialize=materialize_files,
+                    use_llm_cache=use_llm_cache,
+                    write_tracker=write_tracker,
+                    priority=priority,
+                    overlay=overlay,
+                )
+                emit(
+                    "message",
+                    "🚀 Kicking off the Backend Integration Crew... this may take a few moments.",
+                    phase="integrate",
+                    path=ui_file,
+                )
+                with span("phase.integrate", path=ui_file):
+                    backend_manifest = backend_integration_crew.run()
                 workflow_logger.info(
-                    "--- Starting: Phase 4: Backend Code Generation ---"
+                    f"--- Backend Integration Crew for {ui_file} Finished. "
+                    f"Wrote {len(backend_manifest)} file(s) ---"
+                )
+                emit(
+                    "phase_completed",
+                    "--- ✅ Backend Integration Crew Finished ---",
+                    phase="integrate",
+                    path=ui_file,
                 )
+
+                emit(
+                    "phase_started",
+                    "--- Starting: Phase 5: Design Validation ---",
+                    phase="validate",
+                    path=ui_file,
+                )
+                manifests[ui_file] = backend_manifest
+                return [ui_file] + [entry["path"] for entry in backend_manifest]
+
+            def run_with_timeout(ui_file: str) -> list[str]:
+                # A crew cannot be interrupted, so it runs on a daemon thread that is
+                # abandoned on timeout; its later writes are refused by the tracker.
+                future = Future()
+
+                def target():
+                    try:
+                        with span("file", path=ui_file):
+                            paths = integrate_ui_file(ui_file)
+                        future.set_result(paths)
+                    except BaseException as e:
+                        future.set_exception(e)
+
+                threading.Thread(target=in_context(target), daemon=True).start()
                 try:
-                    backend_integration_crew = BackendIntegration(
-                        repo_path=REPO_DIR,
-                        frontend_changes_output_path=ui_file_for_backend_analysis,
-                        file_tree_path=file_tree_json_path,
-                        user_preferences=user_preferences,
-                    )
-                    print(
-                        "\n🚀 Kicking off the Backend Integration Crew... this may take a few moments.\n"
+                    paths = future.result(timeout=file_timeout)
+                except TimeoutError:
+                    write_tracker.revoke(ui_file)
+                    raise TimeoutError(
+                        f"Processing {ui_file} took longer than {file_timeout} seconds"
                     )
-                    workflow_logger.info("--- Kicking off Backend Integration Crew ---")
-                    backend_result = backend_integration_crew.run()
-                    workflow_logger.info(
-                        f"--- Backend Integration Crew Finished. Result: {backend_result} ---"
-                    )
-                    print("--- ✅ Backend Integration Crew Finished ---")
-                    print("Final Result:\n")
-                    print(backend_result)
-
+                unit = f"integrate:{ui_file}"
+                record_unit(unit, file_keys[unit], manifests[ui_file])
+                return paths
+
+            changed_paths = {}
+            # Backend changes for UI files the advisor could not improve are skipped
+            errors = list(advisor_crew.errors)
+            failed_files = {error["path"] for error in errors}
+            completed = 0
+            pending = []
+            for ui_file in examples:
+                if ui_file in failed_files:
+                    completed += 1
+                    continue
+                manifest = replayed.get(f"integrate:{ui_file}")
+                if manifest is None:
+                    pending.append(ui_file)
+                    continue
+                manifests[ui_file] = manifest
+                changed_paths[ui_file] = [ui_file] + [
+                    entry["path"] for entry in manifest
+                ]
+                completed += 1
+                emit(
+                    "file_completed",
+                    f"--- Skipped UI file: {ui_file} (completed in an earlier attempt) ---",
+                    path=ui_file,
+                    progress=50 + 45 * completed // len(examples),
+                    resumed=True,
+                )
+            with ThreadPoolExecutor(
+                max_workers=max(1, min(max_parallel_files, len(pending))),
+                thread_name_prefix="ui-file",
+            ) as executor:
+                futures = {
+                    executor.submit(in_context(run_with_timeout), ui_file): ui_file
+                    for ui_file in pending
+                }
+                for future in as_completed(futures):
+                    ui_file = futures[future]
+                    completed += 1
+                    progress = 50 + 45 * completed // len(examples)
                     try:
-                        with open(full_ui_file_path, "r", encoding="utf-8") as f:
-                            modified_ui_content = f.read()
+                        changed_paths[ui_file] = future.result()
                     except Exception as e:
-                        workflow_logger.error(
-                            f"Error reading modified UI file for backend analysis: {e}"
+                        workflow_logger.exception(f"ERROR while processing {ui_file}.")
+                        errors.append({"path": ui_file, "error": str(e)})
+                        emit(
+                            "file_failed",
+                            f"An unexpected error occurred while processing {ui_file}: {e}",
+                            path=ui_file,
+                            progress=progress,
                         )
-                        modified_ui_content = ""  # Or handle as appropriate
-                    file_changes_tracker[ui_file_for_backend_analysis]["after"] = (
-                        modified_ui_content
+                        continue
+                    emit(
+                        "file_completed",
+                        f"--- Completed UI file: {ui_file} ---",
+                        path=ui_file,
+                        progress=progress,
                     )
 
-                    print("--- Starting: Phase 5: Design Validation ---")
-                    workflow_logger.info("--- Starting: Phase 5: Design Validation ---")
-                    try:
-                        modified_files = [ui_file_for_backend_analysis]
-                        if (
-                            backend_result
-                            and "Successfully modified:" in backend_result
-                        ):
-                            modified_backend_files = (
-                                backend_result.replace("Successfully modified:", "")
-                                .strip()
-                                .split(", ")
-                            )
-                            modified_files.extend(modified_backend_files)
-                            # Capture before/after for backend files too
-                            for f_path in modified_backend_files:
-                                try:
-                                    with open(
-                                        REPO_DIR / f_path, "r", encoding="utf-8"
-                                    ) as f:
-                                        original_backend_content = f.read()
-                                except Exception as e:
-                                    workflow_logger.error(
-                                        f"Error reading backend file {f_path}: {e}"
-                                    )
-                                    original_backend_content = ""
-                                file_changes_tracker[f_path] = {
-                                    "before": original_backend_content,
-                                    "after": "",
-                                }
-
-                        # --- Capture content after Design Validation for all modified files ---
-                        for f_path in modified_files:
-                            try:
-                                with open(
-                                    REPO_DIR / f_path, "r", encoding="utf-8"
-                                ) as f:
-                                    final_content = f.read()
-                            except Exception as e:
-                                workflow_logger.error(
-                                    f"Error reading final content of {f_path}: {e}"
-                                )
-                                final_content = ""
-                            if f_path in file_changes_tracker:
-                                file_changes_tracker[f_path]["after"] = final_content
-                            else:  # Case where Design Validator might modify a file not touched by UI Advisor/Backend Integrator
-                                try:
-                                    with open(
-                                        REPO_DIR / f_path, "r", encoding="utf-8"
-                                    ) as f:
-                                        before_content = f.read()
-                                except Exception as e:
-                                    workflow_logger.error(
-                                        f"Error reading before content of {f_path}: {e}"
-                                    )
-                                    before_content = ""
-                                file_changes_tracker[f_path] = {
-                                    "before": before_content,
-                                    "after": final_content,
-                                }
-
-                        # --- Construct codeChanges object ---
-                        for path, contents in file_changes_tracker.items():
-                            all_code_changes.append(
-                                {
-                                    "path": path,
-                                    "before": contents["before"],
-                                    "after": contents["after"],
-                                }
-                            )
+            if not changed_paths:
+                raise RuntimeError(
+                    f"Every UI file failed during backend integration: {errors}"
+                )
 
-                    except Exception as e:
-                        workflow_logger.exception(
-                            "ERROR during Design Validation execution."
-                        )
-                        print(
-                            f"An unexpected error occurred during the Design Validation phase: {e}"
+            # Aggregate in ranking order, whichever file finished first
+            all_code_changes = []
+            seen_paths = set()
+            for ui_file in examples:
+                for f_path in changed_paths.get(ui_file, ()):
+                    if f_path in seen_paths:
+                        continue
+                    seen_paths.add(f_path)
+                    # Both versions come from the overlay, not from disk, and are
+                    # stored as blobs; the results only list their hashes
+                    final_content = overlay.read(f_path) or ""
+                    before = overlay.original(f_path)
+                    all_code_changes.append(
+                        results_store.add_file(
+                            len(all_code_changes),
+                            f_path,
+                            before if before is not None else final_content,
+                            final_content,
                         )
-                        raise
-
-                except Exception as e:
-                    workflow_logger.exception(
-                        "ERROR during Backend Integration execution."
-                    )
-                    print(
-                        f"An unexpected error occurred during the Backend Integration phase: {e}"
                     )
-                    raise
 
             # --- Save aggregated codeChanges to JSON ---
             aggregated_results = {
@@ -323,29 +612,62 @@ def main(repo_url: str, user_preferences: dict):
                     "Backend integration adjustments made.",
                 ],
                 "files": all_code_changes,
+                # Every write with its content hashes, UI advisor first
+                "manifest": advisor_manifest
+                + [
+                    entry
+                    for ui_file in examples
+                    for entry in manifests.get(ui_file, ())
+                ],
             }
+            if write_tracker.conflicts:
+                aggregated_results["conflicts"] = write_tracker.conflicts
+            if errors:
+                aggregated_results["errors"] = errors
             write_json_file(
                 aggregated_results,
-                str(DATA_DIR / "workflow_results.json"),
+                str(workspace.results_path),
+                indent=None,
+            )
+            workflow_logger.info(
+                f"Aggregated code changes saved to {workspace.results_path}"
             )
+            # The run succeeded, so its changes reach the checkout in one pass
+            with span("phase.flush"):
+                overlay.export_patch(workspace.patch_path)
+                flushed = overlay.flush()
             workflow_logger.info(
-                f"Aggregated code changes saved to {DATA_DIR / 'workflow_results.json'}"
+                f"Wrote {len(flushed)} changed files; patch saved to {workspace.patch_path}"
             )
+            # Now the checkout holds this run's changes, so a run with other inputs
+            # fetches again. A resume before this point replays the units' full
+            # contents, which writes the same files again
+            checkpoints.invalidate("fetch")
+            checkpoints.record("run", run_key, {"has_results": True})
 
         else:
-            workflow_logger.info(
-                "No UI detected. Skipping UI Advisor and Backend Integration phases."
+            emit(
+                "message",
+                "No UI detected. Skipping UI Advisor and Backend Integration phases.",
+                phase="advise",
             )
-            print("No UI detected. The next step would be to generate a new one.")
             # In a complete application, this would trigger the UI Generator agent.
+            checkpoints.record("run", run_key, {"has_results": False})
 
     except Exception as e:
+        # A failed run leaves the checkout untouched
+        if overlay is not None:
+            overlay.discard()
         workflow_logger.exception("ERROR during UI Advisor execution.")
-        print(f"An unexpected error occurred during the UI Advisor phase: {e}")
+        emit(
+            "phase_failed",
+            f"An unexpected error occurred during the UI Advisor phase: {e}",
+            phase="advise",
+        )
         raise
 
-    workflow_logger.info("--- Workflow Complete ---")
-    print("\nWorkflow finished successfully. Check logs for details.")
+    emit("phase_completed", "--- Workflow Complete ---", phase="done", progress=100)
+    return aggregated_results
 
 
 if __name__ == "__main__":
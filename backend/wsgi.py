@@ -0,0 +1,18 @@
+"""
+Production entry point. API processes serve requests from the shared job
+store; the pipeline runs in separate worker processes:
+
+    gunicorn --workers 4 --threads 8 --bind 0.0.0.0:5001 wsgi:app
+    python worker.py
+
+Event streams hold a thread for as long as a client listens, so use threaded
+Gunicorn workers. Both commands must see the same FRONTFREND_JOB_STORE.
+"""
+
+import os
+
+from src.job_store import JOB_STORE_PATH
+
+os.environ.setdefault("FRONTFREND_JOB_STORE", str(JOB_STORE_PATH))
+
+from app import app  # noqa: E402
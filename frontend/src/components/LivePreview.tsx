@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react';
+import { useState } from 'react';
 import { Button } from './ui/button';
 import {
   Dialog,
@@ -9,16 +9,8 @@ import {
 } from './ui/dialog';
 
 export const LivePreview = () => {
-  const [previewContent, setPreviewContent] = useState('');
   const [isModalOpen, setIsModalOpen] = useState(false);
 
-  useEffect(() => {
-    fetch('http://localhost:5001/api/live_preview')
-      .then((response) => response.text())
-      .then((data) => setPreviewContent(data))
-      .catch((error) => console.error('Error fetching preview:', error));
-  }, []);
-
   return (
     <div>
       <Button onClick={() => setIsModalOpen(true)}>Live Preview</Button>
@@ -28,7 +20,7 @@ export const LivePreview = () => {
             <DialogTitle>Live Preview</DialogTitle>
           </DialogHeader>
           <iframe
-            srcDoc={previewContent}
+            src="http://localhost:5001/api/live_preview"
             title="preview"
             sandbox="allow-scripts allow-same-origin"
             width="100%"
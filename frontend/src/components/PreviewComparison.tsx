@@ -29,9 +29,11 @@ interface PreviewComparisonProps {
 
 export const PreviewComparison = ({ onCreatePR, onBack, repoUrl, codeChanges }: PreviewComparisonProps) => {
   const [isFullScreen, setIsFullScreen] = useState(false);
-  const [previewHtml, setPreviewHtml] = useState<string | null>(null);
+  const [previewUrl, setPreviewUrl] = useState<string | null>(null);
   const [isLoadingPreview, setIsLoadingPreview] = useState(false);
   const [selectedFileIndex, setSelectedFileIndex] = useState<number | null>(null);
+  // File contents are fetched when a file is first selected, not with the results
+  const [fileContents, setFileContents] = useState<Record<number, { before: string; after: string }>>({});
 
   // Handle ESC key to close preview
   useEffect(() => {
@@ -43,6 +45,9 @@ export const PreviewComparison = ({ onCreatePR, onBack, repoUrl, codeChanges }:
 
     if (isFullScreen) {
       document.addEventListener('keydown', handleEscKey);
+    } else {
+      // Closed before the preview finished loading
+      setIsLoadingPreview(false);
     }
 
     return () => {
@@ -50,29 +55,39 @@ export const PreviewComparison = ({ onCreatePR, onBack, repoUrl, codeChanges }:
     };
   }, [isFullScreen]);
 
-  const handleOpenPreview = async () => {
+  const handleOpenPreview = () => {
+    // The backend builds the preview once and serves its files with cache validators,
+    // so the iframe loads it directly and repeat opens are answered with 304s
     setIsLoadingPreview(true);
+    setPreviewUrl(`http://127.0.0.1:5001/api/workflow/${codeChanges.job_id}/preview/after/`);
+    setIsFullScreen(true);
+  };
+  
+  const handleSelectFile = async (index: number) => {
+    setSelectedFileIndex(index);
+    if (fileContents[index]) {
+      return;
+    }
     try {
-      console.log("Fetching preview from backend...");
-      const response = await fetch("http://127.0.0.1:5001/api/live_preview");
-      console.log("Preview response status:", response.status);
-      
+      const response = await fetch(`http://127.0.0.1:5001/api/workflow/${codeChanges.job_id}/files/${index}`);
       if (!response.ok) {
         throw new Error(`HTTP error! status: ${response.status}`);
       }
-      
-      const html = await response.text();
-      console.log("Preview HTML received, length:", html.length);
-      setPreviewHtml(html);
-      setIsFullScreen(true);
+      const { before, after } = await response.json();
+      setFileContents((current) => ({ ...current, [index]: { before, after } }));
     } catch (error) {
-      console.error("Failed to load live preview:", error);
-      alert("Failed to load live preview. Please check if the backend server is running.");
-    } finally {
-      setIsLoadingPreview(false);
+      console.error("Failed to load file changes:", error);
+      setFileContents((current) => ({
+        ...current,
+        [index]: { before: "Failed to load this file.", after: "Failed to load this file." },
+      }));
     }
   };
-  
+
+  const selectedFile = selectedFileIndex !== null ? fileContents[selectedFileIndex] : undefined;
+  const fileText = (side: "before" | "after") =>
+    selectedFileIndex === null ? 'Select a file to view changes' : selectedFile ? selectedFile[side] : 'Loading...';
+
   const repoName = repoUrl.split("/").pop() || "repository";
 
   if (!codeChanges) {
@@ -148,13 +163,13 @@ export const PreviewComparison = ({ onCreatePR, onBack, repoUrl, codeChanges }:
                 <div className="space-y-2">
                   {files.map((file, index) => (
                     <div 
-                      key={index}
+                      key={file.index ?? index}
                       className={`flex items-center gap-2 p-2 rounded cursor-pointer text-sm transition-colors ${
-                        selectedFileIndex === index 
+                        selectedFileIndex === (file.index ?? index) 
                           ? 'bg-[#FF7A2B]/20 border border-[#FF7A2B]/30' 
                           : 'hover:bg-white/5 border border-white/5'
                       }`}
-                      onClick={() => setSelectedFileIndex(index)}
+                      onClick={() => handleSelectFile(file.index ?? index)}
                     >
                       <Code className="w-4 h-4 text-[#FF7A2B]" />
                       <span className="font-mono text-headline-dark">{file.path}</span>
@@ -173,7 +188,7 @@ export const PreviewComparison = ({ onCreatePR, onBack, repoUrl, codeChanges }:
                     </div>
                     <div className="p-4 flex-grow overflow-y-auto">
                       <pre className="text-xs text-body-dark whitespace-pre-wrap">
-                        {selectedFileIndex !== null ? files[selectedFileIndex]?.before : 'Select a file to view changes'}
+                        {fileText("before")}
                       </pre>
                     </div>
                   </div>
@@ -185,7 +200,7 @@ export const PreviewComparison = ({ onCreatePR, onBack, repoUrl, codeChanges }:
                     </div>
                     <div className="p-4 flex-grow overflow-y-auto">
                       <pre className="text-xs text-body-dark whitespace-pre-wrap">
-                        {selectedFileIndex !== null ? files[selectedFileIndex]?.after : 'Select a file to view changes'}
+                        {fileText("after")}
                       </pre>
                     </div>
                   </div>
@@ -226,7 +241,7 @@ export const PreviewComparison = ({ onCreatePR, onBack, repoUrl, codeChanges }:
               </div>
       </div>
       
-      {isFullScreen && previewHtml && (
+      {isFullScreen && previewUrl && (
         <div className="fixed inset-0 z-50 bg-black/90 backdrop-blur-sm flex flex-col items-center justify-center p-4">
           <div className="w-full h-full max-w-6xl max-h-[95vh] bg-white rounded-xl shadow-2xl overflow-hidden relative">
             {/* Close Button */}
@@ -243,7 +258,8 @@ export const PreviewComparison = ({ onCreatePR, onBack, repoUrl, codeChanges }:
             {/* Preview Content */}
             <div className="h-full">
               <iframe
-                srcDoc={previewHtml}
+                src={previewUrl}
+                onLoad={() => setIsLoadingPreview(false)}
                 title="Live Preview"
                 className="w-full h-full border-0"
                 sandbox="allow-scripts allow-same-origin allow-forms allow-popups"
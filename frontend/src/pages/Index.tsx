@@ -1,4 +1,4 @@
-import { useState } from "react";
+import { useRef, useState } from "react";
 import { HeroSection } from "@/components/HeroSection";
 import { RepoInput } from "@/components/RepoInput";
 import { PreferencesForm, UserPreferences } from "@/components/PreferencesForm";
@@ -18,6 +18,7 @@ const Index = () => {
   const [repoUrl, setRepoUrl] = useState("");
   const [userPreferences, setUserPreferences] = useState<UserPreferences | null>(null);
   const [codeChanges, setCodeChanges] = useState(null);
+  const jobIdRef = useRef<string | null>(null);
 
   const handleGetStarted = () => {
     setCurrentStep("repo-input");
@@ -58,50 +59,59 @@ const Index = () => {
         throw new Error(`HTTP error! status: ${startResponse.status}`);
       }
 
-      // Start polling for status
-      const pollInterval = setInterval(async () => {
-        try {
-          const statusResponse = await fetch("http://127.0.0.1:5001/api/workflow/status");
-          if (!statusResponse.ok) {
-            throw new Error(`HTTP error! status: ${statusResponse.status}`);
-          }
-          const statusData = await statusResponse.json();
-          console.log("Workflow status:", statusData);
-
-          setProcessingMessages(statusData.messages || []);
-          // Update progress based on status or messages if available
-          if (statusData.status === "processing") {
-            // You might want more granular progress updates from backend
-            // For now, a simple increment or based on message count
-            setProcessingProgress(prev => Math.min(prev + 5, 95)); 
-          } else if (statusData.status === "completed") {
+      const { job_id: jobId } = await startResponse.json();
+      jobIdRef.current = jobId;
+
+      // Follow the job's progress events; the browser resumes from the last
+      // event id on its own if the connection drops.
+      const events = new EventSource(`http://127.0.0.1:5001/api/workflow/${jobId}/events`);
+
+      events.onmessage = async (e: MessageEvent) => {
+        const event = JSON.parse(e.data);
+        console.log("Workflow event:", event);
+
+        if (event.type === "done") {
+          events.close();
+          if (event.status === "completed") {
             setProcessingProgress(100);
-            clearInterval(pollInterval);
             toast({
               title: "Analysis Complete",
               description: "Your repository has been analyzed.",
             });
             await handleProcessingComplete();
-          } else if (statusData.status === "error") {
-            clearInterval(pollInterval);
+          } else {
             toast({
               title: "Analysis Failed",
-              description: statusData.message || "An unknown error occurred during analysis.",
+              description: event.message || "An unknown error occurred during analysis.",
               variant: "destructive",
             });
             setCurrentStep("preferences");
           }
-        } catch (error) {
-          console.error("Error polling workflow status:", error);
-          clearInterval(pollInterval);
-          toast({
-            title: "Analysis Failed",
-            description: "Failed to get workflow status. Please try again.",
-            variant: "destructive",
-          });
-          setCurrentStep("preferences");
+          return;
+        }
+
+        if (event.message) {
+          setProcessingMessages(prev => [...prev, event.message]);
+        }
+        if (typeof event.progress === "number") {
+          // Stay below 100 until the results are in
+          setProcessingProgress(Math.min(event.progress, 95));
+        }
+      };
+
+      events.onerror = () => {
+        // Transient errors reconnect automatically; a closed stream does not
+        if (events.readyState !== EventSource.CLOSED) {
+          return;
         }
-      }, 2000); // Poll every 2 seconds
+        console.error("Workflow event stream closed unexpectedly.");
+        toast({
+          title: "Analysis Failed",
+          description: "Lost connection to the workflow. Please try again.",
+          variant: "destructive",
+        });
+        setCurrentStep("preferences");
+      };
 
     } catch (error) {
       console.error("Error starting workflow:", error);
@@ -117,7 +127,7 @@ const Index = () => {
   const handleProcessingComplete = async () => {
     try {
       console.log("Fetching workflow results...");
-      const response = await fetch("http://127.0.0.1:5001/api/workflow/results");
+      const response = await fetch(`http://127.0.0.1:5001/api/workflow/${jobIdRef.current}/results`);
       console.log("Response status:", response.status);
       
       if (!response.ok) {